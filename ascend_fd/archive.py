@@ -0,0 +1,285 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import io
+import os
+import gzip
+import time
+import tarfile
+import zipfile
+from collections import namedtuple
+
+from ascend_fd.tool import safe_open, MAX_SIZE, MB_SHIFT
+from ascend_fd.status import FileOpenError, FileNotExistError
+
+
+# The archive member is addressed by a virtual path: "{archive_path}::{member_name}".
+ARCHIVE_SEP = "::"
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+ZIP_SUFFIXES = (".zip",)
+GZIP_SUFFIX = ".gz"
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_READ_SIZE = 1024 * 1024
+
+LogStat = namedtuple("LogStat", ["st_ino", "st_size", "st_mtime"])
+MemberInfo = namedtuple("MemberInfo", ["offset", "size", "mtime"])
+
+# the member index of each archive, {archive_path: {member_name: MemberInfo}}
+_ARCHIVE_INDEX = dict()
+# the archive stream opened by the current process, {archive_path: (pid, stream)}
+_ARCHIVE_STREAMS = dict()
+# the decompressed size of each gzip file, {file_path: (st_size, st_mtime_ns, decompressed size)}
+_GZIP_SIZES = dict()
+
+
+class _GzipReader(io.RawIOBase):
+    """
+    Read the gzip file, and raise FileOpenError once the decompressed position passes MAX_SIZE.
+    The size in the gzip trailer is not used, because it is the decompressed size modulo 2^32.
+    """
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        self.file_stream = safe_open(file_path, "rb")
+        self.gzip_stream = gzip.GzipFile(fileobj=self.file_stream)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.gzip_stream.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        position = self.gzip_stream.seek(offset, whence)
+        _check_size(self.file_path, position)
+        return position
+
+    def readinto(self, buffer):
+        length = self.gzip_stream.readinto(buffer)
+        _check_size(self.file_path, self.gzip_stream.tell())
+        return length
+
+    def close(self):
+        try:
+            self.gzip_stream.close()
+        finally:
+            self.file_stream.close()
+            super().close()
+
+
+class _MemberReader(io.RawIOBase):
+    """
+    Read a tar member from the shared archive stream by its data offset and size.
+    The shared stream is only repositioned when another member was read in between,
+    so the members of a gzip archive read in archive order are decompressed only once.
+    """
+    def __init__(self, archive_stream, offset, size):
+        super().__init__()
+        self.archive_stream = archive_stream
+        self.offset = offset
+        self.size = size
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.pos
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.pos = max(0, min(offset, self.size))
+        return self.pos
+
+    def readinto(self, buffer):
+        length = min(len(buffer), self.size - self.pos)
+        if length <= 0:
+            return 0
+        if self.archive_stream.tell() != self.offset + self.pos:
+            self.archive_stream.seek(self.offset + self.pos)
+        data = self.archive_stream.read(length)
+        buffer[:len(data)] = data
+        self.pos += len(data)
+        return len(data)
+
+
+def is_archive(file_path):
+    return file_path.endswith(TAR_SUFFIXES + ZIP_SUFFIXES)
+
+
+def is_gzip_log(file_path):
+    return file_path.endswith(GZIP_SUFFIX) and not file_path.endswith(TAR_SUFFIXES)
+
+
+def split_path(file_path):
+    """
+    split the virtual path into the archive path and member name.
+    :param file_path: the file path or virtual path of archive member
+    :return: (archive_path, member_name), the member_name is empty for a normal file
+    """
+    archive_path, _, member_name = file_path.partition(ARCHIVE_SEP)
+    return archive_path, member_name
+
+
+def list_archive(archive_path):
+    """
+    list the regular file members of the archive and index them.
+    :param archive_path: the archive path
+    :return: the virtual path list of the members
+    """
+    return [f"{archive_path}{ARCHIVE_SEP}{member_name}" for member_name in _get_archive_index(archive_path)]
+
+
+def walk_logs(input_path):
+    """
+    walk the input path and yield each file path. The archives are not extracted,
+    but the virtual paths of their members are yielded instead.
+    :param input_path: the input dir path or archive path
+    :return: the file path generator
+    """
+    if os.path.isfile(input_path):
+        file_paths = [input_path]
+    else:
+        file_paths = (os.path.join(root, file) for root, _, files in os.walk(input_path) for file in files)
+    for file_path in file_paths:
+        if is_archive(file_path):
+            yield from list_archive(file_path)
+        else:
+            yield file_path
+
+
+def log_exists(file_path):
+    archive_path, member_name = split_path(file_path)
+    if not member_name:
+        return os.path.isfile(file_path)
+    return os.path.isfile(archive_path) and member_name in _get_archive_index(archive_path)
+
+
+def log_stat(file_path):
+    """
+    get the stat of the log file. The archive member uses the inode of its archive and its own size and mtime,
+    the gzip file uses its decompressed size, which is counted by decompressing it.
+    :param file_path: the file path or virtual path of archive member
+    :return: LogStat
+    """
+    archive_path, member_name = split_path(file_path)
+    file_info = os.stat(archive_path)
+    if member_name:
+        member_info = _get_archive_index(archive_path).get(member_name)
+        return LogStat(file_info.st_ino, member_info.size, member_info.mtime)
+    if is_gzip_log(file_path):
+        return LogStat(file_info.st_ino, _get_gzip_size(file_path), file_info.st_mtime)
+    return LogStat(file_info.st_ino, file_info.st_size, file_info.st_mtime)
+
+
+def open_log(file_path):
+    """
+    open the log file in binary mode. The archive member and gzip file are decompressed while reading,
+    without being extracted to the disk.
+    :param file_path: the file path or virtual path of archive member
+    :return: the binary stream
+    """
+    archive_path, member_name = split_path(file_path)
+    if not member_name:
+        if not is_gzip_log(file_path):
+            return safe_open(file_path, "rb")
+        return io.BufferedReader(_GzipReader(file_path))
+
+    member_info = _get_archive_index(archive_path).get(member_name)
+    if not member_info:
+        raise FileNotExistError(f"{os.path.basename(member_name)} does not exist in the archive.")
+    archive_stream = _get_archive_stream(archive_path)
+    if isinstance(archive_stream, zipfile.ZipFile):
+        return archive_stream.open(member_name)
+    return io.BufferedReader(_MemberReader(archive_stream, member_info.offset, member_info.size))
+
+
+def close_archives():
+    """
+    close the archive streams opened by the current process.
+    """
+    for pid, archive_stream, file_stream in _ARCHIVE_STREAMS.values():
+        if pid == os.getpid():
+            archive_stream.close()
+            file_stream.close()
+    _ARCHIVE_STREAMS.clear()
+
+
+def _check_size(name, size):
+    if size > MAX_SIZE:
+        raise FileOpenError(f"the size of {os.path.basename(name)} should be less than {MAX_SIZE >> MB_SHIFT} MB.")
+
+
+def _get_gzip_size(file_path):
+    """
+    get the decompressed size of the gzip file by reading it through, FileOpenError is raised if it is larger
+    than MAX_SIZE. The size is cached until the gzip file changes.
+    """
+    file_info = os.stat(file_path)
+    st_size, st_mtime_ns, size = _GZIP_SIZES.get(file_path, (None, None, None))
+    if (st_size, st_mtime_ns) == (file_info.st_size, file_info.st_mtime_ns):
+        return size
+    size = 0
+    with _GzipReader(file_path) as gzip_reader:
+        buffer = bytearray(GZIP_READ_SIZE)
+        length = gzip_reader.readinto(buffer)
+        while length:
+            size += length
+            length = gzip_reader.readinto(buffer)
+    _GZIP_SIZES[file_path] = (file_info.st_size, file_info.st_mtime_ns, size)
+    return size
+
+
+def _get_archive_stream(archive_path):
+    """
+    get the archive stream of the current process. The stream inherited from the parent process is not reused,
+    because the processes share the file offset.
+    """
+    pid, archive_stream, _ = _ARCHIVE_STREAMS.get(archive_path, (None, None, None))
+    if pid == os.getpid():
+        return archive_stream
+
+    file_stream = safe_open(archive_path, "rb")
+    is_gzip = file_stream.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    file_stream.seek(0)
+    if archive_path.endswith(ZIP_SUFFIXES):
+        archive_stream = zipfile.ZipFile(file_stream)
+    elif is_gzip:
+        archive_stream = gzip.GzipFile(fileobj=file_stream)
+    else:
+        archive_stream = file_stream
+    _ARCHIVE_STREAMS[archive_path] = (os.getpid(), archive_stream, file_stream)
+    return archive_stream
+
+
+def _get_archive_index(archive_path):
+    if archive_path in _ARCHIVE_INDEX:
+        return _ARCHIVE_INDEX.get(archive_path)
+
+    member_index = dict()
+    with safe_open(archive_path, "rb") as file_stream:
+        if archive_path.endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(file_stream) as zip_file:
+                for member in zip_file.infolist():
+                    if member.is_dir():
+                        continue
+                    _check_size(member.filename, member.file_size)
+                    mtime = time.mktime(member.date_time + (0, 0, -1))
+                    member_index[member.filename] = MemberInfo(0, member.file_size, mtime)
+        else:
+            with tarfile.open(fileobj=file_stream, mode="r:*") as tar_file:
+                for member in tar_file:
+                    if not member.isfile():
+                        continue
+                    _check_size(member.name, member.size)
+                    member_index[member.name] = MemberInfo(member.offset_data, member.size, member.mtime)
+    _ARCHIVE_INDEX[archive_path] = member_index
+    return member_index
@@ -15,11 +15,14 @@ def command_line():
     2. parse
       -i, --input_path, the input path of origin data file
       -o, --output_path, the output path of parsed data file
+      --incremental, parse only the data appended since the last parse
+      --compact, write the parsed data file without indent
     3. diag
       -i, --input_path, the input path of parsed data file
       -o, --output_path, the output path of diag result file
       -m, --mode, indicate whether a force-kill scenario is used
       -p, --print, indicate whether to print the result
+      --compact, write the diag result file without indent
     """
     args = argparse.ArgumentParser(add_help=True, description="Ascend Fault Diag")
     sub_arg = args.add_subparsers(dest="cmd", required=True)
@@ -31,6 +34,11 @@ def command_line():
                            help="the input path of origin data file")
     parse_cmd.add_argument("-o", "--output_path", type=str, required=True,
                            help="the output path of parsed data file")
+    parse_cmd.add_argument("--incremental", action="store_true",
+                           help="parse only the data appended since the last parse, and merge the results into "
+                                "the existing parsed data files.")
+    parse_cmd.add_argument("--compact", action="store_true",
+                           help="write the parsed data file without indent, which is smaller and faster to write.")
 
     diag_cmd = sub_arg.add_parser("diag", help="diag parsed log files")
     diag_cmd.add_argument("-i", "--input_path", type=str, required=True,
@@ -43,6 +51,8 @@ def command_line():
     diag_cmd.add_argument("-p", "--print", action="store_true",
                           help="indicate whether to print the result. "
                                "If no parameter is specified, the result is not printed.")
+    diag_cmd.add_argument("--compact", action="store_true",
+                          help="write the diag result file without indent, which is smaller and faster to write.")
 
     return args.parse_args()
 
@@ -3,14 +3,15 @@
 import os
 import re
 import heapq
-import json
-import multiprocessing
 from dataclasses import dataclass
 
-from ascend_fd.tool import safe_open
+from ascend_fd.tool import safe_open, dump_json
+from ascend_fd.manifest import ParseManifest
+from ascend_fd.scheduler import TaskScheduler
+from ascend_fd.archive import walk_logs, close_archives
 from ascend_fd import regular_rule
 from ascend_fd.status import BaseError, PathError
-from ascend_fd.log import init_main_logger, LOG_WIDTH
+from ascend_fd.log import init_main_logger, init_job_logger, LOG_WIDTH
 from ascend_fd.controller.job_worker import RcParser, KgParser, KgDiagnoser
 
 
@@ -19,23 +20,28 @@ class ParseCFG:
     plog_path: dict
     npu_info_path: list
     worker_id: str
+    incremental: bool = False
+    compact: bool = False
 
 
 @dataclass
 class DiagCFG:
     mode: int
     parse_data: dict
+    compact: bool = False
 
 
 class ParseController:
     """
     The parse job controller.
     """
-    PARSE_CATEGORY = ["Rc"]
+    PARSE_CATEGORY = ["Rc", "Kg"]
     OUT_DIR = "fault_diag_data"
 
     def __init__(self, args):
         self.cfg = self.init_cfg(args.input_path)
+        self.cfg.incremental = getattr(args, "incremental", False)
+        self.cfg.compact = getattr(args, "compact", False)
         self.input_path = args.input_path
         self.output_path = self.generate_output_path(args.output_path)
         self.logger = init_main_logger(self.output_path)
@@ -48,52 +54,52 @@ class ParseController:
         plog_path: {PID: [[], []]}, (each PID corresponds to two lists of plogs--debug folder and run folder)
         npu_info_path: [],
         worker_id: "",
+        The input path can be a dir or an archive (tar/tar.gz/zip), and the archives in the dir are walked too.
+        The archive members are addressed by virtual paths, see ascend_fd.archive.
         :param input_path: the origin log data path
         :return: parse config dict
         """
         plog_path = dict()
         npu_info_path = list()
         worker_id = "0"
-        for root, _, files in os.walk(input_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if re.match(regular_rule.PLOG_ORIGIN_RE, file) and os.path.basename(root) == "plog":
-                    pid = re.match(regular_rule.PLOG_ORIGIN_RE, file)[1]
-                    if os.path.basename(os.path.dirname(root)) == "debug":
-                        heapq.heappush(plog_path.setdefault(pid, [[], []])[0], file_path)
-                    elif os.path.basename(os.path.dirname(root)) == "run":
-                        heapq.heappush(plog_path.setdefault(pid, [[], []])[1], file_path)
-                    continue
+        for file_path in walk_logs(input_path):
+            root, file = os.path.split(file_path)
+            if re.match(regular_rule.PLOG_ORIGIN_RE, file) and os.path.basename(root) == "plog":
+                pid = re.match(regular_rule.PLOG_ORIGIN_RE, file)[1]
+                if os.path.basename(os.path.dirname(root)) == "debug":
+                    heapq.heappush(plog_path.setdefault(pid, [[], []])[0], file_path)
+                elif os.path.basename(os.path.dirname(root)) == "run":
+                    heapq.heappush(plog_path.setdefault(pid, [[], []])[1], file_path)
+                continue
 
-                if re.match(regular_rule.NPU_INFO_RE, file) and \
-                        re.match(regular_rule.WORKER_DIR_RE, os.path.basename(root)) \
-                        and os.path.basename(os.path.dirname(root)) == "environment_check":
-                    npu_info_path.append(file_path)
-                    continue
+            if re.match(regular_rule.NPU_INFO_RE, file) and \
+                    re.match(regular_rule.WORKER_DIR_RE, os.path.basename(root)) \
+                    and os.path.basename(os.path.dirname(root)) == "environment_check":
+                npu_info_path.append(file_path)
+                continue
 
-                worker_re = re.match(regular_rule.MODEL_ARTS_WORKER_RE, file)
-                if worker_re:
-                    worker_id = worker_re[1]
+            worker_re = re.match(regular_rule.MODEL_ARTS_WORKER_RE, file)
+            if worker_re:
+                worker_id = worker_re[1]
 
         return ParseCFG(plog_path, npu_info_path, worker_id)
 
     def start_job(self):
         """
-        use multiprocessing to start parse tasks.
+        start parse tasks. The files of all the parse jobs are parsed on one process pool.
         Now the component contains two parse tasks:
         1. RC parse job; 2. KG parse job.
         """
         self.logger.info("Start the log-parse job.".center(LOG_WIDTH, "-"))
-        pool = multiprocessing.Pool(len(self.PARSE_CATEGORY))
+        # Each parse job adds the DAG of its file tasks into the same scheduler, so the RC and KG tasks
+        # share the process pool, which is started by the main process only once.
+        init_job_logger(self.output_path, "scheduler")
+        scheduler = TaskScheduler()
+        last_tasks = {name: self.parsers.get(name).schedule(scheduler) for name in self.PARSE_CATEGORY}
+        scheduler.run()
         for name in self.PARSE_CATEGORY:
-            pool.apply_async(self.parsers.get(name).work, callback=self.log_callback)
-        pool.close()
-
-        # The knowledge graph uses multiprocess parsing. But the child process cannot be started new child process.
-        # So only the main process can be used to start the knowledge graph parse task.
-        self.log_callback(self.parsers.get("Kg").work())
-
-        pool.join()
+            self.log_callback(self.parsers.get(name).collect(last_tasks.get(name)))
+        close_archives()
         self.logger.info("The log-parse job is complete.".center(LOG_WIDTH, "-"))
 
     def log_callback(self, result):
@@ -121,15 +127,21 @@ class ParseController:
         """
         generate the output_path.
         The parse job have a format output path:<pararm_output_path>/fault_diag_data/worker-{id}/
+        In the incremental mode, the existing worker dir is reused if it has the parse manifest.
         :param output_path: the specified output path
         :return: the final output dir path
         """
         worker_id = self.cfg.worker_id
         output_path = os.path.join(output_path, self.OUT_DIR)
-        if os.path.exists(output_path) and os.listdir(output_path):
+        worker_path = os.path.join(output_path, f"worker-{worker_id}")
+        if self.cfg.incremental:
+            if os.path.exists(worker_path) and os.listdir(worker_path) and not ParseManifest.exists(worker_path):
+                raise PathError(f"the worker-{worker_id} folder is not empty but has no parse manifest, "
+                                f"so it cannot be parsed incrementally.")
+        elif os.path.exists(output_path) and os.listdir(output_path):
             raise PathError("the output path already has a fault_diag_data folder that is not empty.")
 
-        output_path = os.path.join(output_path, f"worker-{worker_id}")
+        output_path = worker_path
         os.makedirs(output_path, 0o700, exist_ok=True)
         return output_path
 
@@ -145,6 +157,7 @@ class DiagController:
 
     def __init__(self, args):
         self.cfg = self.init_cfg(args.input_path, args.mode)
+        self.cfg.compact = getattr(args, "compact", False)
         self.input_path = args.input_path
         self.output_path = os.path.join(args.output_path, self.OUT_DIR)
         os.makedirs(self.output_path, 0o700, exist_ok=True)
@@ -164,6 +177,7 @@ class DiagController:
             {worker_id:
                 {
                 plog_parser_path: [],
+                rc_summary_path: "",
                 kg_parse_path: "",
                 },
             },
@@ -177,6 +191,7 @@ class DiagController:
             if not worker_dir.startswith("worker-"):
                 continue
             plog_parser_path = list()
+            rc_summary_path = ""
             kg_parse_path = ""
 
             worker_path = os.path.join(input_path, worker_dir)
@@ -186,12 +201,16 @@ class DiagController:
                 if re.match(regular_rule.PLOG_PARSE_RE, file):
                     plog_parser_path.append(file_path)
                     continue
+                if file == "rc-parse-summary.json":
+                    rc_summary_path = file_path
+                    continue
                 if file == "ascend-kg-parser.json":
                     kg_parse_path = file_path
                     continue
             parse_data.update({
                 worker_dir: {
                     "plog_parser_path": plog_parser_path,
+                    "rc_summary_path": rc_summary_path,
                     "kg_parse_path": kg_parse_path
                 }
             })
@@ -200,16 +219,15 @@ class DiagController:
 
     def start_job(self):
         """
-        use multiprocessing to start diag tasks.
+        start diag tasks.
         Now the component contains one diag task:
         1. KG parse job.
         """
         self.logger.info("Start the falt-diag job.".center(LOG_WIDTH, "-"))
-        pool = multiprocessing.Pool(len(self.diag_task))
+        # The RC diag job loads the plog facts on its own process pool, but the child process cannot be started
+        # new child process. So the main process is used to start the diag jobs.
         for name in self.diag_task:
-            pool.apply_async(self.diagnosers.get(name).work, callback=self.log_callback)
-        pool.close()
-        pool.join()
+            self.log_callback(self.diagnosers.get(name).work())
         self.logger.info("The falt-diag job is complete.".center(LOG_WIDTH, "-"))
 
         self.export_results()
@@ -228,9 +246,10 @@ class DiagController:
         }
 
         with safe_open(out_file, "w+", encoding="utf-8") as file_stream:
-            file_stream.write(json.dumps(save_result, ensure_ascii=False, indent=4))
-        if self.is_print:
-            self.logger.info(json.dumps(save_result, ensure_ascii=False, indent=4))
+            dump_json(save_result, file_stream, self.cfg.compact)
+            if self.is_print:
+                file_stream.seek(0)
+                self.logger.info(file_stream.read())
 
     def log_callback(self, result):
         """
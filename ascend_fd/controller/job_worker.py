@@ -2,7 +2,8 @@
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
 from ascend_fd.log import init_job_logger
 from ascend_fd.status import BaseError, SuccessRet, InnerError
-from ascend_fd.pkg import (start_rc_parse_job, start_kg_parse_job,
+from ascend_fd.scheduler import Task
+from ascend_fd.pkg import (start_rc_parse_job, start_kg_parse_job, schedule_rc_parse_job, schedule_kg_parse_job,
                            start_rc_diag_job, start_kg_diag_job)
 
 
@@ -25,8 +26,30 @@ class BaseWorker:
         :return: err or success, job name, job result
         """
         self.log.info(f"The {self.JOB_NAME} start.")
+        return self._collect(self._job)
+
+    def schedule(self, scheduler):
+        """
+        add the job tasks into the scheduler shared by the jobs, the job result is collected after it runs.
+        :param scheduler: the TaskScheduler
+        :return: the last task of the job
+        """
+        self.log.info(f"The {self.JOB_NAME} start.")
+        try:
+            return self._schedule(scheduler)
+        except Exception as err:
+            return Task.failed(self.JOB_NAME, err)
+
+    def collect(self, task):
+        """
+        :param task: the done last task of the job
+        :return: err or success, job name, job result
+        """
+        return self._collect(task.get)
+
+    def _collect(self, job):
         try:
-            result = self._job()
+            result = job()
         except BaseError as err:
             return err, self.JOB_NAME, self.err_result
         except Exception as err:
@@ -45,6 +68,13 @@ class BaseWorker:
         """
         return self.err_result
 
+    def _schedule(self, scheduler):
+        """
+        Use to add the specific tasks, the job runs in one local task by default.
+        :return: the last task, its result is the job result
+        """
+        return scheduler.add_task(self.JOB_NAME, self._job, local=True)
+
 
 class RcParser(BaseWorker):
     """
@@ -56,6 +86,9 @@ class RcParser(BaseWorker):
         start_rc_parse_job(self.output, self.cfg)
         return
 
+    def _schedule(self, scheduler):
+        return schedule_rc_parse_job(scheduler, self.output, self.cfg)
+
 
 class KgParser(BaseWorker):
     """
@@ -67,6 +100,9 @@ class KgParser(BaseWorker):
         start_kg_parse_job(self.output, self.cfg)
         return
 
+    def _schedule(self, scheduler):
+        return schedule_kg_parse_job(scheduler, self.output, self.cfg)
+
 
 class KgDiagnoser(BaseWorker):
     """
@@ -0,0 +1,83 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import json
+import os
+
+from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.archive import log_stat
+
+
+MANIFEST_SUFFIX = "-manifest.json"
+
+
+class ParseManifest:
+    """
+    The byte-offset checkpoint manifest of a parse job. It is saved in the worker output dir, and each parsed input
+    file has an entry:
+    {file_path: {"inode": int, "size": int, "mtime": float, "offset": int, "state": {}}}
+    The "offset" is the position up to which the file has been parsed, and the "state" is the parser state to be
+    restored when the parse resumes.
+    """
+    def __init__(self, output_path, job_name):
+        self.manifest_file = os.path.join(output_path, f"{job_name}{MANIFEST_SUFFIX}")
+        self.entries = self.load()
+
+    @staticmethod
+    def exists(output_path):
+        """
+        check if any parse manifest exists in the worker output dir.
+        :param output_path: the worker output dir
+        :return: bool
+        """
+        return any(file.endswith(MANIFEST_SUFFIX) for file in os.listdir(output_path))
+
+    def load(self):
+        if not os.path.isfile(self.manifest_file):
+            return dict()
+        with safe_open(self.manifest_file, "r", encoding="utf-8") as file_stream:
+            return json.load(file_stream)
+
+    def save(self):
+        """
+        save the manifest. The content is written to a temp file first, so an interrupted run keeps the last one.
+        """
+        temp_file = f"{self.manifest_file}.tmp"
+        with safe_open(temp_file, "w", encoding="utf-8") as file_stream:
+            json.dump(self.entries, file_stream, ensure_ascii=False)
+        os.replace(temp_file, self.manifest_file)
+        safe_chmod(self.manifest_file, 0o640)
+
+    def get_offset(self, file):
+        """
+        get the offset from which the file should be parsed. If the file is new, replaced or truncated, the whole
+        file should be parsed again.
+        :param file: the input file path
+        :return: the offset
+        """
+        entry = self.entries.get(file)
+        if not entry:
+            return 0
+        file_info = log_stat(file)
+        if file_info.st_ino != entry.get("inode") or file_info.st_size < entry.get("offset", 0):
+            return 0
+        return entry.get("offset", 0)
+
+    def get_state(self, file):
+        """
+        get the parser state of the file. If the file should be parsed again, the state is dropped.
+        :param file: the input file path
+        :return: the parser state dict
+        """
+        if not self.get_offset(file):
+            return dict()
+        return self.entries.get(file, {}).get("state", {})
+
+    def update(self, file, offset, state=None):
+        file_info = log_stat(file)
+        self.entries[file] = {
+            "inode": file_info.st_ino,
+            "size": file_info.st_size,
+            "mtime": file_info.st_mtime,
+            "offset": offset,
+            "state": state or dict()
+        }
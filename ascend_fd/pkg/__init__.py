@@ -3,5 +3,5 @@
 from ascend_fd.pkg.rc_diag import start_rc_diag_job
 from ascend_fd.pkg.kg_diag import start_kg_diag_job
 
-from ascend_fd.pkg.rc_parse import start_rc_parse_job
-from ascend_fd.pkg.kg_parse import start_kg_parse_job
+from ascend_fd.pkg.rc_parse import start_rc_parse_job, schedule_rc_parse_job
+from ascend_fd.pkg.kg_parse import start_kg_parse_job, schedule_kg_parse_job
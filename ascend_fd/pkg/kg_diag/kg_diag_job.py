@@ -6,53 +6,270 @@ import logging
 import re
 import subprocess
 import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 
-from ascend_fd.status import FileNotExistError, JavaError, InfoNotFoundError, FileOpenError
-from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.status import FileNotExistError, JavaError, InfoNotFoundError, FileOpenError, TaskTimeoutError
+from ascend_fd.tool import safe_open, safe_chmod, dump_json, get_cache_dir
 from ascend_fd.pkg.kg_diag.root_cause_zh import RootCauseZhTranslater
+from ascend_fd.pkg.kg_diag.result_cache import KgResultCache, get_engine_digest
 
 kg_logger = logging.getLogger("kg_diag")
 PWD_PATH = os.path.dirname(os.path.realpath(__file__))
 KG_JAR_PATH = os.path.join(PWD_PATH, "kginfer.jar")
 KG_REPO = os.path.join(PWD_PATH, "knowledge-repository")
 MAX_WORKER_NUM = 5
+# the deadline of the whole kg diag job, shared by all its engine processes, in seconds
+KG_DIAG_TIMEOUT = 300
+# the engine prints one result line for each input
+KG_RESULT_RE = re.compile(r"{.*?analyze_success.*?}$", re.MULTILINE)
+# the key of the batch result which names its input zip file
+KG_RESULT_INPUT_KEY = "input"
+# the bundled kg-engine diagnoses only its first input, the batch mode is used only if this variable is "1"
+KG_BATCH_ENV = "ASCEND_FD_KG_BATCH"
 
 
 def start_kg_diag_job(output_path, worker_list, cfg):
     kg_result = dict()
     kg_relation = dict()
     parsed_data = cfg.parse_data
-    for worker_id in worker_list:
-        result_json, relation_json = kg_diag_job(worker_id, parsed_data)
+    result_cache = get_kg_result_cache()
+    engines = KgEngineGroup()
+    for result_json, relation_json in batch_kg_diag_job(worker_list, parsed_data, result_cache, engines):
         kg_result.update(result_json)
         kg_relation.update(relation_json)
 
     kg_result = {"Ascend-Knowledge-Graph-Fault-Diag Result": kg_result}
     kg_out_file = os.path.join(output_path, "kg_diag_report.json")
     with safe_open(kg_out_file, 'w+', encoding='utf8') as file_stream:
-        file_stream.write(json.dumps(kg_result, ensure_ascii=False, indent=4))
+        dump_json(kg_result, file_stream, cfg.compact)
     safe_chmod(kg_out_file, 0o640)
 
     return kg_result
 
 
-def kg_diag_job(worker_id, parsed_data):
+def get_kg_result_cache():
+    """
+    get the kg result cache in the cache dir, the key includes the digest of the engine and the knowledge repository.
+    :return: the cache, None if the cache is disabled
+    """
+    cache_dir = get_cache_dir()
+    if not cache_dir:
+        return None
+    try:
+        engine_digest = get_engine_digest(KG_JAR_PATH, KG_REPO)
+    except (OSError, FileOpenError) as err:
+        kg_logger.warning(f"the kg result cache is disabled: {err}")
+        return None
+    return KgResultCache(cache_dir, engine_digest)
+
+
+def batch_kg_diag_job(worker_list, parsed_data, result_cache=None, engines=None):
+    """
+    diag all the workers by one engine process, so the JVM is started and the knowledge repository is loaded once.
+    The batch mode is used only if the engine supports it, see kg_engine_batch_enabled. The inputs of all the
+    workers are sent to the engine together, and each result names its input zip file by the "input" key,
+    see match_batch_results. The workers without a matched result are diagnosed alone concurrently in the time left,
+    they are reported as timed out if the batch engine process reaches the deadline. Without the batch mode, the workers are diagnosed alone directly.
+    The workers whose result is in the cache are not sent to the engine.
+    :param worker_list: the worker id list
+    :param parsed_data: the parsed data paths of each worker
+    :param result_cache: the kg result cache, None if the cache is disabled
+    :param engines: the engine processes of the diag job, a new KgEngineGroup if it is None
+    :return: the (result_json, relation_json) list, in the worker order
+    """
+    engines = engines or KgEngineGroup()
+    diag_results = dict()
+    cache_keys = dict()
+    for worker_id in worker_list:
+        cache_keys[worker_id], cached = load_cached_result(worker_id, parsed_data, result_cache)
+        if cached is not None:
+            diag_results[worker_id] = diag_json_wrapper(cached, worker_id)
+    miss_workers = [worker_id for worker_id in worker_list if worker_id not in diag_results]
+    if len(worker_list) > len(miss_workers):
+        kg_logger.info(f"the kg results of {len(worker_list) - len(miss_workers)} workers are read from the cache.")
+    if len(miss_workers) <= 1 or not kg_engine_batch_enabled():
+        diag_results.update(zip(miss_workers, concurrent_kg_diag_job(miss_workers, parsed_data, result_cache,
+                                                                     engines)))
+        return [diag_results.get(worker_id) for worker_id in worker_list]
+
+    kg_logger.info(f"start knowledge graph diagnosis task for {len(miss_workers)} workers in one engine process.")
+    engine_cmd = get_kg_engine_cmd()
+    input_json_zips = list()
+    try:
+        for worker_id in miss_workers:
+            input_json_zips.append(get_kg_input_zip(worker_id, parsed_data))
+        results, _ = engines.run(engine_cmd, input_json_zips)
+    except TaskTimeoutError as err:
+        kg_logger.warning(f"the batch kg-engine process failed. {err}")
+        results = list()
+    finally:
+        for input_json_zip in input_json_zips:
+            os.remove(input_json_zip)
+
+    matched_results = match_batch_results(results, input_json_zips)
+    rest_workers = list()
+    for worker_id, input_json_zip in zip(miss_workers, input_json_zips):
+        result_str = matched_results.get(input_json_zip)
+        if result_str is None:
+            rest_workers.append(worker_id)
+            continue
+        diag_results[worker_id] = diag_json_wrapper(result_str, worker_id)
+        if result_cache:
+            result_cache.put(cache_keys.get(worker_id), result_str)
+    rest_workers.extend(miss_workers[len(input_json_zips):])
+    if rest_workers:
+        kg_logger.warning(f"the kg-engine returns no result of worker {rest_workers} in the batch, "
+                          f"so they are diagnosed alone.")
+        diag_results.update(zip(rest_workers, concurrent_kg_diag_job(rest_workers, parsed_data, result_cache,
+                                                                     engines)))
+    return [diag_results.get(worker_id) for worker_id in worker_list]
+
+
+def kg_engine_batch_enabled():
+    """
+    whether the kg-engine diagnoses several inputs in one process. The bundled engine reads only its first input
+    and does not name its result, so the batch mode is enabled only by setting ASCEND_FD_KG_BATCH to "1"
+    for an engine which names the input of each result.
+    """
+    return os.getenv(KG_BATCH_ENV) == "1"
+
+
+def concurrent_kg_diag_job(worker_list, parsed_data, result_cache=None, engines=None):
+    """
+    diag each worker by its own engine process, at most MAX_WORKER_NUM processes run at the same time.
+    The engine processes are killed at the deadline of the diag job, and their workers are reported as timed out.
+    If a worker fails, the workers which are not started are cancelled, the running engine processes are killed
+    and the error is raised.
+    :param worker_list: the worker id list
+    :param parsed_data: the parsed data paths of each worker
+    :param result_cache: the kg result cache, None if the cache is disabled
+    :param engines: the engine processes of the diag job, a new KgEngineGroup if it is None
+    :return: the (result_json, relation_json) list, in the worker order
+    """
+    if not worker_list:
+        return list()
+    engines = engines or KgEngineGroup()
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKER_NUM, len(worker_list))) as executor:
+        futures = [executor.submit(kg_diag_job, worker_id, parsed_data, result_cache, engines)
+                   for worker_id in worker_list]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = [future for future in futures if future in done and future.exception()]
+        if failed:
+            for future in futures:
+                future.cancel()
+            engines.abort()
+            raise failed[0].exception()
+        return [future.result() for future in futures]
+
+
+def kg_diag_job(worker_id, parsed_data, result_cache=None, engines=None):
+    cache_key, cached = load_cached_result(worker_id, parsed_data, result_cache)
+    if cached is not None:
+        kg_logger.info(f"the kg result of worker-{worker_id} is read from the cache.")
+        return diag_json_wrapper(cached, worker_id)
+
     kg_logger.info(f"start knowledge graph diagnosis task for worker-{worker_id}.")
-    java_path = get_java_env()
+    engine_cmd = get_kg_engine_cmd()
     input_json_zip = get_kg_input_zip(worker_id, parsed_data)
+    try:
+        results, engine_err = (engines or KgEngineGroup()).run(engine_cmd, [input_json_zip])
+    except TaskTimeoutError as err:
+        kg_logger.error(f"the kg-engine analyze worker-{worker_id} failed. {err}")
+        return timeout_json_wrapper(worker_id)
+    finally:
+        os.remove(input_json_zip)
 
-    sub_res = subprocess.run([java_path, "-Xms128m", "-Xmx128m", "-jar", KG_JAR_PATH, KG_REPO, input_json_zip],
-                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False, encoding="utf-8")
-    result_find = re.compile(r"{.*?analyze_success.*?}$").findall(sub_res.stdout)
-    os.remove(input_json_zip)
-
-    if not result_find:
-        engine_err = sub_res.stderr
+    if not results:
         kg_logger.error(f"the kg-engine analyze worker-{worker_id} failed. The reason is: {engine_err}")
         raise InfoNotFoundError(f"the kg-engine analyze worker-{worker_id} failed. Please check the detail log.")
 
-    result_str = result_find[0]  # only match one reasoning result
-    return diag_json_wrapper(result_str, worker_id)
+    if result_cache:
+        result_cache.put(cache_key, results[0])
+    return diag_json_wrapper(results[0], worker_id)
+
+
+def load_cached_result(worker_id, parsed_data, result_cache):
+    """
+    :return: (the cache key of the worker, the cached result string or None if it is missed)
+    """
+    if not result_cache:
+        return None, None
+    cache_key = result_cache.get_key(get_kg_parse_path(worker_id, parsed_data))
+    return cache_key, result_cache.get(cache_key)
+
+
+def match_batch_results(results, input_json_zips):
+    """
+    match the batch results to the inputs by their "input" key. The result without a known input,
+    or of an input which already has a result, is dropped, so a result is never given to a wrong worker.
+    :param results: the result strings of the batch engine
+    :param input_json_zips: the input zip files
+    :return: {input zip file: result string}
+    """
+    inputs = set(input_json_zips)
+    matched_results = dict()
+    for result_str in results:
+        try:
+            input_json_zip = json.loads(result_str).get(KG_RESULT_INPUT_KEY)
+        except (ValueError, AttributeError):
+            continue
+        if input_json_zip in inputs:
+            matched_results.setdefault(input_json_zip, result_str)
+    if len(matched_results) < len(results):
+        kg_logger.warning(f"{len(results) - len(matched_results)} results of the kg-engine are not matched "
+                          f"to the inputs.")
+    return matched_results
+
+
+class KgEngineGroup:
+    """
+    The engine processes of one kg diag job. They share one deadline, KG_DIAG_TIMEOUT seconds after the group
+    is created, so the job is not longer than the deadline however many engine processes it runs.
+    The running processes are tracked, so they are killed when the job is aborted.
+    """
+    def __init__(self):
+        self.deadline = time.monotonic() + KG_DIAG_TIMEOUT
+        self.processes = set()
+        self.aborted = False
+        self.lock = threading.Lock()
+
+    def run(self, engine_cmd, input_json_zips):
+        """
+        run the engine process once for the inputs. The process is killed if it does not finish before the deadline.
+        :param engine_cmd: the engine command, the inputs are appended to it
+        :param input_json_zips: the input zip files
+        :return: (the result strings in the output order, the engine stderr)
+        """
+        with self.lock:
+            remaining = self.deadline - time.monotonic()
+            if self.aborted:
+                raise InfoNotFoundError("the kg diag job is aborted.")
+            if remaining <= 0:
+                raise TaskTimeoutError(f"the kg diag job is not finished in {KG_DIAG_TIMEOUT} seconds.")
+            process = subprocess.Popen(engine_cmd + input_json_zips, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       shell=False, encoding="utf-8")
+            self.processes.add(process)
+        try:
+            stdout, stderr = process.communicate(timeout=remaining)
+        except subprocess.TimeoutExpired as err:
+            process.kill()
+            process.communicate()
+            raise TaskTimeoutError(f"the kg diag job is not finished in {KG_DIAG_TIMEOUT} seconds.") from err
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+        return KG_RESULT_RE.findall(stdout), stderr
+
+    def abort(self):
+        """
+        kill the running engine processes, and no engine process is started after it.
+        """
+        with self.lock:
+            self.aborted = True
+            for process in self.processes:
+                process.kill()
 
 
 def diag_json_wrapper(result_str, worker_id):
@@ -87,7 +304,22 @@ def diag_json_wrapper(result_str, worker_id):
     return result_json, relation_json
 
 
-def get_kg_input_zip(rc_worker_id, parsed_data):
+def timeout_json_wrapper(worker_id):
+    """
+    the result of the worker whose engine process timed out.
+    """
+    result_json = {
+        "analyze_success": False,
+        "engine_ver": None,
+        "root_cause_zh_CN": "",
+        "root_cause_en_US": None,
+        "rlt_graph": None,
+        "error_info": f"the kg diag job is not finished in {KG_DIAG_TIMEOUT} seconds."
+    }
+    return {f"worker-{worker_id}": result_json}, {f"worker-{worker_id}": dict()}
+
+
+def get_kg_parse_path(rc_worker_id, parsed_data):
     worker_parse_data = parsed_data.get(f'worker-{rc_worker_id}')
     if not worker_parse_data:
         kg_logger.error(f'worker-{rc_worker_id} dir is not exist')
@@ -101,7 +333,11 @@ def get_kg_input_zip(rc_worker_id, parsed_data):
     if os.path.islink(file_name):
         kg_logger.error(f'ascend_kg_parser.json should not be a symbolic link file')
         raise FileOpenError(f'ascend_kg_parser.json should not be a symbolic link file')
+    return file_name
 
+
+def get_kg_input_zip(rc_worker_id, parsed_data):
+    file_name = get_kg_parse_path(rc_worker_id, parsed_data)
     dir_path = os.path.dirname(file_name)
     tarfile_name = os.path.join(dir_path, "ascend-kg-parser.tar.gz")
     with tarfile.open(tarfile_name, "w:gz") as tar_file:
@@ -109,6 +345,13 @@ def get_kg_input_zip(rc_worker_id, parsed_data):
     return tarfile_name
 
 
+def get_kg_engine_cmd():
+    """
+    get the kg-engine command, the knowledge repository is loaded by the engine.
+    """
+    return [get_java_env(), "-Xms128m", "-Xmx128m", "-jar", KG_JAR_PATH, KG_REPO]
+
+
 def get_java_env():
     """
     get java environment path
@@ -0,0 +1,142 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import os
+import re
+import json
+import logging
+import hashlib
+import threading
+
+from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.status import FileOpenError
+
+kg_logger = logging.getLogger("kg_diag")
+CACHE_PREFIX = "kg-result-"
+CACHE_SUFFIX = ".json"
+# the format of the cache file, the cache of another format is regarded as missed
+CACHE_FORMAT = 1
+MAX_CACHE_SIZE = 64 * 1024 * 1024
+HASH_BLOCK_SIZE = 1024 * 1024
+CACHE_FILE_RE = re.compile(rf"^{CACHE_PREFIX}[0-9a-f]{{64}}{re.escape(CACHE_SUFFIX)}$")
+
+
+def update_file_digest(digest, file_path):
+    with safe_open(file_path, "rb") as file_stream:
+        for block in iter(lambda: file_stream.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+
+def get_engine_digest(jar_path, repo_path):
+    """
+    the digest of the kg-engine and the knowledge repository. The result of the same parsed data changes
+    when either of them changes, so the digest is a part of the cache key.
+    :param jar_path: the kg-engine jar path
+    :param repo_path: the knowledge repository dir
+    :return: the sha256 hex digest
+    """
+    digest = hashlib.sha256()
+    update_file_digest(digest, jar_path)
+    repo_files = sorted(os.path.relpath(os.path.join(root, file), repo_path)
+                        for root, _, files in os.walk(repo_path) for file in files)
+    for repo_file in repo_files:
+        digest.update(repo_file.encode("utf-8") + b"\0")
+        update_file_digest(digest, os.path.join(repo_path, repo_file))
+    return digest.hexdigest()
+
+
+class KgResultCache:
+    """
+    The content-addressed cache of the kg-engine results. The key is the sha256 of the parsed data and the engine
+    digest, and each result is saved in its own file. The files are evicted in the least recently used order
+    when their total size exceeds max_size, a hit refreshes the file mtime.
+    """
+    def __init__(self, cache_dir, engine_digest, max_size=MAX_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.engine_digest = engine_digest
+        self.max_size = max_size
+
+    def get_key(self, kg_parse_path):
+        """
+        :param kg_parse_path: the ascend-kg-parser.json path
+        :return: the cache key, None if the file cannot be read
+        """
+        digest = hashlib.sha256(self.engine_digest.encode("utf-8"))
+        try:
+            update_file_digest(digest, kg_parse_path)
+        except (OSError, FileOpenError) as err:
+            kg_logger.warning(f"cannot compute the kg result cache key: {err}")
+            return None
+        return digest.hexdigest()
+
+    def get_cache_file(self, key):
+        return os.path.join(self.cache_dir, f"{CACHE_PREFIX}{key}{CACHE_SUFFIX}")
+
+    def get(self, key):
+        """
+        :param key: the cache key
+        :return: the cached result string, None if it is missed
+        """
+        if not key or not os.path.isfile(self.get_cache_file(key)):
+            return None
+        cache_file = self.get_cache_file(key)
+        try:
+            with safe_open(cache_file, "r", encoding="utf-8") as file_stream:
+                cached = json.load(file_stream)
+            os.utime(cache_file)
+        except (OSError, ValueError, FileOpenError) as err:
+            kg_logger.warning(f"cannot read the kg result cache: {err}")
+            return None
+        if not isinstance(cached, dict) or cached.get("format") != CACHE_FORMAT or cached.get("key") != key:
+            return None
+        return cached.get("result")
+
+    def put(self, key, result_str):
+        """
+        save the result, the failed result is not cached. Then the least recently used results are evicted.
+        :param key: the cache key
+        :param result_str: the result string of the kg-engine
+        """
+        try:
+            is_success = json.loads(result_str).get("analyze_success")
+        except (ValueError, AttributeError):
+            is_success = False
+        if not key or not is_success:
+            return
+        cache_file = self.get_cache_file(key)
+        # the content is written to a temp file first, so the concurrent jobs never read a partial cache
+        temp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with safe_open(temp_file, "w", encoding="utf-8") as file_stream:
+                json.dump({"format": CACHE_FORMAT, "key": key, "result": result_str}, file_stream,
+                          ensure_ascii=False)
+            os.replace(temp_file, cache_file)
+            safe_chmod(cache_file, 0o640)
+        except (OSError, FileOpenError) as err:
+            kg_logger.warning(f"cannot write the kg result cache: {err}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        remove the least recently used results until the total size is not more than max_size.
+        """
+        entries = list()
+        for file in os.listdir(self.cache_dir):
+            if not CACHE_FILE_RE.match(file):
+                continue
+            try:
+                file_stat = os.stat(os.path.join(self.cache_dir, file))
+            except OSError:
+                continue
+            entries.append((file_stat.st_mtime, file_stat.st_size, file))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, file in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, file))
+            except FileNotFoundError:
+                pass
+            total_size -= size
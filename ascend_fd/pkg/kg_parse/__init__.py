@@ -1,3 +1,3 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
-from ascend_fd.pkg.kg_parse.kg_parse_job import start_kg_parse_job
+from ascend_fd.pkg.kg_parse.kg_parse_job import start_kg_parse_job, schedule_kg_parse_job
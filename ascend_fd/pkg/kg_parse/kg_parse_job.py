@@ -1,25 +1,36 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
 from ascend_fd.status import FileNotExistError
+from ascend_fd.manifest import ParseManifest
+from ascend_fd.scheduler import run_tasks
+from ascend_fd.selector import select_plog_files
 from ascend_fd.pkg.kg_parse.utils import logger
 from ascend_fd.pkg.kg_parse.log_parser import SingleJsonFileProcessing
 
 
-PID_MAX_PLOG_NUM = 2
-
-
 def start_kg_parse_job(output_path, files_path_dict):
     """
     execute the knowledge graph parsing task and invoke the knowledge graph parsing code.
     """
+    run_tasks(schedule_kg_parse_job, output_path, files_path_dict)
+
+
+def schedule_kg_parse_job(scheduler, output_path, files_path_dict):
+    """
+    add the knowledge graph parsing tasks into the scheduler.
+    :return: the last task
+    """
     log_path = get_file_list(files_path_dict)
     if not log_path:
         raise FileNotExistError("no log file that meets the path specifications is found.")
 
     logger.info("init json file processing")
-    worker = SingleJsonFileProcessing(log_path)
+    # the manifest is only kept for the incremental parse
+    manifest = ParseManifest(output_path, "kg_parse") if files_path_dict.incremental else None
+    worker = SingleJsonFileProcessing(log_path, manifest, files_path_dict.incremental,
+                                      files_path_dict.compact)
     logger.info("start parse kg data")
-    worker.export_json_file(output_path)
+    return worker.schedule_export(scheduler, output_path)
 
 
 def get_file_list(files_path_dict):
@@ -31,10 +42,8 @@ def get_file_list(files_path_dict):
         plog_files_dict = files_path_dict.plog_path
         plog_path = []
         for plog_list in plog_files_dict.values():
-            for heap in plog_list:
-                if len(heap) > PID_MAX_PLOG_NUM:
-                    heap = heap[-2:]
-                plog_path.extend(heap)
+            for plog_files in select_plog_files(plog_list, keep_first_debug=False, logger=logger):
+                plog_path.extend(plog_files)
         log_file.update({
             "plog_path": plog_path
         })
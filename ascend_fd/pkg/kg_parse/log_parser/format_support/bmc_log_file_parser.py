@@ -1,5 +1,6 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import os
 from abc import ABC, abstractmethod
 
 
@@ -14,6 +15,19 @@ class BMCLogFileParser(ABC):
     def parse(self, file_path: str) -> dict:
         return dict()
 
+    def schedule_parse(self, scheduler, file_path, offset=0, complete_lines=False):
+        """
+        add the parse task of the file into the scheduler. The parser which cannot parse from an offset
+        parses the whole file in one task.
+        :param scheduler: the TaskScheduler
+        :param file_path: the file path
+        :param offset: the offset from which the file is parsed
+        :param complete_lines: whether to stop at the last complete line
+        :return: the task, its result is the desc dict
+        """
+        return scheduler.add_task(f"{self.__class__.__name__} {os.path.basename(file_path)}", self.parse,
+                                  (file_path,))
+
     def find_log(self, file_dict):
         files_list = []
         for target in self.TARGET_FILE_PATTERNS:
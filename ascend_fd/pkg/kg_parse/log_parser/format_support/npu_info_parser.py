@@ -1,142 +1,170 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import io
 import os
 import re
 import time
+import calendar
+from array import array
 
+from ascend_fd import regular_rule
 from ascend_fd.pkg.kg_parse.log_parser.format_support.bmc_log_file_parser import BMCLogFileParser
 from ascend_fd.pkg.kg_parse.utils.log_record import logger
-from ascend_fd.tool import safe_open
-from ascend_fd.status import FileNotExistError, InfoNotFoundError
-
-
-class NpuInfoLineParser:
-    """Line info parser for npu info."""
-    def __init__(self, name):
-        self.name = name
-        self.regex = re.compile(r".*?hccn_tool -i.*?-stat -g.*?")
-        self.npu_id_regex = re.compile(r"(hccn_tool -i \d+)")
-        self.npu_id_dict_func = lambda p: {"npu_id": p.split(" ")[2]}  # the "2" use to get the (\d+) in regex
-        self.rx_err_regex = re.compile(r"(roce_rx_err_pkt_num:\d+)")
-        self.rx_err_dict_func = lambda p: {"rx_err_num": p.split(":")[1]}  # the "1" use to get the (\d+) in regex
-        self.tx_err_regex = re.compile(r"(roce_tx_err_pkt_num:\d+)")
-        self.tx_err_dict_func = lambda p: {"tx_err_num": p.split(":")[1]}  # the "1" use to get the (\d+) in regex
-
-    def parse(self, desc):
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord
+from ascend_fd.archive import open_log, log_exists, log_stat
+from ascend_fd.status import FileNotExistError
+
+BEFORE_STAGE = "npu_info_before"
+AFTER_STAGE = "npu_info_after"
+# the hccn_tool stat command, eg. "/usr/local/Ascend/driver/tools/hccn_tool -i 5 -stat -g"
+STAT_CMD_RE = re.compile(r"hccn_tool -i (\d+)\b.*?-stat -g")
+# the counter line of the stat block, eg. "roce_rx_err_pkt_num:11"
+COUNTER_RE = re.compile(r"^(\w+)\s*:\s*(\d+)$")
+# the event reported when the counter increases, in the event order of one NPU
+COUNTER_EVENTS = {
+    "roce_rx_err_pkt_num": "NpuRxErrIncreased",
+    "roce_tx_err_pkt_num": "NpuTxErrIncreased",
+}
+MISSING_COUNTER = -1
+MAX_LOG_COUNTER_NUM = 50
+
+
+def read_stat_blocks(file_path):
+    """
+    read the hccn_tool stat blocks of the npu info file line by line. A block starts with the stat command line
+    and ends with a blank line. The blocks of the other commands are skipped.
+    :param file_path: the npu info file path
+    :return: the generator of (npu_id, command line, {counter name: value})
+    """
+    block = None
+    with io.TextIOWrapper(open_log(file_path), encoding='utf-8') as _log:
+        for line in _log:
+            line = line.strip()
+            if not line:
+                if block:
+                    yield block
+                block = None
+                continue
+            match = STAT_CMD_RE.search(line)
+            if match:
+                if block:
+                    yield block
+                block = (int(match[1]), line, dict())
+                continue
+            match = COUNTER_RE.match(line)
+            if block and match:
+                block[2][match[1]] = int(match[2])
+    if block:
+        yield block
+
+
+class NpuCounterTable:
+    """
+    The stat counters of all the NPUs of all the workers, stored in two int64 columns: the before and after values.
+    Each (worker id, npu id, counter name) has one position in the columns, so all the counters are diffed
+    in a single pass over the columns.
+    """
+    def __init__(self):
+        self.keys = list()
+        self.positions = dict()
+        self.before = array('q')
+        self.after = array('q')
+        self.key_info = dict()
+
+    def add_block(self, worker_id, stage, npu_id, command, counters):
+        column = self.before if stage == BEFORE_STAGE else self.after
+        if stage == AFTER_STAGE:
+            self.key_info[(worker_id, npu_id)] = command
+        for name, value in counters.items():
+            key = (worker_id, npu_id, name)
+            position = self.positions.get(key)
+            if position is None:
+                position = self.positions.setdefault(key, len(self.keys))
+                self.keys.append(key)
+                self.before.append(MISSING_COUNTER)
+                self.after.append(MISSING_COUNTER)
+            column[position] = value
+
+    def increased(self):
         """
-        parse each paragraph in npu info file.
-        :param desc: single paragraph
-        :return: evnet_dict: parsed event saved by dict
+        :return: {(worker id, npu id, counter name): increment} of the counters which have both values and increase
         """
-        event_dict = dict()
-        ret = self.regex.findall(desc)
-        if ret:
-            event_dict["key_info"] = desc.split("\n")[0]
-            event_dict["event_type"] = self.name
-            # Regular matches the NPU ID
-            ret = self.npu_id_regex.findall(desc)
-            if not ret:
-                logger.error("cannot find npu id in npu info file.")
-                raise InfoNotFoundError("cannot find npu id in npu info file.")
-            npu_id = self.npu_id_dict_func(ret[0])
-            event_dict.update(npu_id)
-
-            # Regular matches the RX Err NUM
-            ret = self.rx_err_regex.findall(desc)
-            if not ret:
-                logger.error("cannot find rx err num in npu info file.")
-                raise InfoNotFoundError("cannot find rx err num in npu info file.")
-            rx_err_num = self.rx_err_dict_func(ret[0])
-            event_dict.update(rx_err_num)
-
-            # Regular matches the TX Err NUM
-            ret = self.tx_err_regex.findall(desc)
-            if not ret:
-                logger.error("cannot find tx err num in npu info file.")
-                raise InfoNotFoundError("cannot find tx err num in npu info file.")
-            tx_err_num = self.tx_err_dict_func(ret[0])
-            event_dict.update(tx_err_num)
-        return event_dict
+        return {self.keys[position]: after - before
+                for position, (before, after) in enumerate(zip(self.before, self.after))
+                if before != MISSING_COUNTER and after > before}
 
 
 class NpuInfoParser(BMCLogFileParser):
     """The NPU Info parser."""
-    LINE_PARSERS = [
-        NpuInfoLineParser("NpuRxTxErrBefore"),   # npu info before lineparser
-        NpuInfoLineParser("NpuRxTxErrAfter")   # npu info after lineparser
-        ]
-
     VALID_PARAMS = {}
     TARGET_FILE_PATTERNS = ["npu_info_path"]
 
     def __init__(self):
         super().__init__()
 
-    @classmethod
-    def parse(cls, file_path_list: list):
+    @staticmethod
+    def group_worker_files(file_path_list):
         """
-        parse the npu_info_before.txt and npu_info_after.txt.
-        :param file_path_list: [npu_info_before.txt, npu_info_after.txt]
-        :return: the event_dict list: [event_dict, ...]
+        group the npu info files by their environment_check worker dir.
+        :param file_path_list: the npu info files of all the workers
+        :return: {worker_id: {stage: file_path}}
         """
-        desc = dict()
-        desc["events"] = list()
-        tmp_event_list_before = list()
-        tmp_event_list_after = list()
-
-        before_parse_flag = False
-        after_parse_flag = False
-
+        worker_files = dict()
         for file_path in file_path_list:
-            if not os.path.isfile(file_path):
-                logger.error(f"file {os.path.basename(file_path)} not exists.")
-                raise FileNotExistError(f"file {os.path.basename(file_path)} not exists.")
-            logger.info("start parse %s", file_path)
-            with safe_open(file_path, mode='r', encoding='utf-8') as _log:
-                content = _log.read()
-                # the hccn_tool command execution result is separated by '\n\n' in npu_info_{before/after}.txt file
-                event_message_list = content.split("\n\n")
-                for event_message in event_message_list:
-                    if "npu_info_before" in file_path:
-                        event_dict_before = cls.LINE_PARSERS[0].parse(event_message)
-                        if event_dict_before:
-                            tmp_event_list_before.append(event_dict_before)
-                        before_parse_flag = True
-                        continue
-                    if "npu_info_after" in file_path:
-                        file_time = time.strftime("%Y-%m-%d %H:%M:%S",
-                                                  time.localtime(float(os.path.getmtime(file_path))))
-                        event_dict_after = cls.LINE_PARSERS[1].parse(event_message)
-                        if event_dict_after:
-                            tmp_event_list_after.append(event_dict_after)
-                        after_parse_flag = True
-                        continue
-            logger.info("end parse %s", file_path)
+            worker_dir = os.path.basename(os.path.dirname(file_path))
+            worker_re = re.match(regular_rule.WORKER_DIR_RE, worker_dir)
+            worker_id = worker_re[1] if worker_re else worker_dir
+            for stage in (BEFORE_STAGE, AFTER_STAGE):
+                if stage in os.path.basename(file_path):
+                    worker_files.setdefault(worker_id, dict())[stage] = file_path
+        return worker_files
 
-        if not before_parse_flag:
+    @classmethod
+    def parse(cls, file_path_list: list):
+        """
+        parse the npu_info_before.txt and npu_info_after.txt of each worker. All the stat counters are read,
+        the increased counters in COUNTER_EVENTS are reported as the events of the worker.
+        :param file_path_list: the npu info files of all the workers
+        :return: the desc dict, the "events" is the EventRecord list
+        """
+        worker_files = cls.group_worker_files(file_path_list)
+        if not any(BEFORE_STAGE in files for files in worker_files.values()):
             logger.error("the npu_info_before.txt file is missing.")
             raise FileNotExistError("the npu_info_before.txt file is missing.")
-        if not after_parse_flag:
+        if not any(AFTER_STAGE in files for files in worker_files.values()):
             logger.error("the npu_info_after.txt file is missing.")
             raise FileNotExistError("the npu_info_after.txt file is missing.")
 
-        tmp_event_list_before.sort(key=lambda x: int(x.get("npu_id")), reverse=False)
-        tmp_event_list_after.sort(key=lambda x: int(x.get("npu_id")), reverse=False)
-        for err_before, err_after in zip(tmp_event_list_before, tmp_event_list_after):
-            event_dict = dict()
-            event_dict["time"] = file_time
-            event_dict["npu_id"] = err_after["npu_id"]
-            event_dict["key_info"] = err_after["key_info"]
-            if int(err_before["rx_err_num"]) < int(err_after["rx_err_num"]):  # add the NpuRxErrIncreased event
-                event_dict["event_type"] = "NpuRxErrIncreased"
-                event_dict["rx_err_num"] = err_after["rx_err_num"]
-                desc.setdefault("events", []).append(event_dict)
-            if int(err_before["tx_err_num"]) < int(err_after["tx_err_num"]):  # add the NpuTxErrIncreased event
-                event_dict["event_type"] = "NpuTxErrIncreased"
-                event_dict["tx_err_num"] = err_after["tx_err_num"]
-                desc.setdefault("events", []).append(event_dict)
-
-        if "events" in desc and len(desc.get("events", [])) > 0:
-            desc["parse_next"] = True
-            return desc
+        table = NpuCounterTable()
+        worker_times = dict()
+        for worker_id, files in worker_files.items():
+            if len(files) < 2:
+                logger.warning(f"the npu info files of worker {worker_id} are incomplete, skip it.")
+                continue
+            for stage, file_path in files.items():
+                if not log_exists(file_path):
+                    logger.error(f"file {os.path.basename(file_path)} not exists.")
+                    raise FileNotExistError(f"file {os.path.basename(file_path)} not exists.")
+                logger.info("start parse %s", file_path)
+                for npu_id, command, counters in read_stat_blocks(file_path):
+                    table.add_block(worker_id, stage, npu_id, command, counters)
+                logger.info("end parse %s", file_path)
+            # the event time is the local time of the after file, regarded as UTC like the log time
+            worker_times[worker_id] = calendar.timegm(time.localtime(log_stat(files.get(AFTER_STAGE)).st_mtime))
+
+        increased = table.increased()
+        if increased:
+            logger.info(f"{len(increased)} NPU counters increased: " +
+                        ", ".join(f"worker-{worker_id} npu {npu_id} {name} +{increment}"
+                                  for (worker_id, npu_id, name), increment
+                                  in list(increased.items())[:MAX_LOG_COUNTER_NUM]))
+        event_order = list(COUNTER_EVENTS)
+        event_keys = sorted((key for key in increased if key[2] in COUNTER_EVENTS),
+                            key=lambda key: (int(key[0]) if key[0].isdigit() else 0, key[0], key[1],
+                                             event_order.index(key[2])))
+        events = [EventRecord(COUNTER_EVENTS.get(name), worker_times.get(worker_id),
+                              table.key_info.get((worker_id, npu_id)))
+                  for worker_id, npu_id, name in event_keys]
+        if events:
+            return {"events": events, "parse_next": True}
         return {"parse_next": True}
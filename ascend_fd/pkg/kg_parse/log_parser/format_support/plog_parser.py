@@ -1,56 +1,81 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import io
 import os
 import re
-import math
-from multiprocessing import Pool
+import mmap
+from bisect import bisect_right
+from itertools import accumulate
 
+from ascend_fd.tool import safe_open, get_cache_dir
 from ascend_fd.status import FileNotExistError
-from ascend_fd.tool import safe_open
+from ascend_fd.archive import open_log, log_exists, split_path, is_gzip_log
 from ascend_fd.pkg.kg_parse.log_parser.format_support.bmc_log_file_parser import BMCLogFileParser
+from ascend_fd.pkg.kg_parse.log_parser.format_support.rule_pack import load_rule_pack
 from ascend_fd.pkg.kg_parse.utils.log_record import logger
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord, event_time_to_timestamp
 
-# 文件行数大于LINE_NUM则开启多进程解析
-LINE_NUM = 50000
-WARN_PROCESS_NUM = 10
+# the plog file is cut into the chunks of about CHUNK_SIZE bytes, which are parsed on the worker pool
+CHUNK_SIZE = 8 * 1024 * 1024
+# the line rules of the plog parser, a fault signature is added by adding a rule into the rule pack
+PLOG_RULE_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "plog-rules.json")
 
 
 class LineParser:
     """single line parse"""
-    def __init__(self, name, regex, file_filter=None,
-                 module_regex=None, module_dict_func=None,
-                 keywords=None):
+    def __init__(self, name, regex, file_filter=None, module=None, keywords=None):
         self.name = name
-        self.regex = regex
+        self.pattern = regex
         self.file_filter = file_filter
-        self.module_regex = module_regex
-        self.module_dict_func = module_dict_func
-        self.keywords = keywords
+        self.module_regex = re.compile(f"({module})") if module else None
+        self.keywords = keywords or []
+        self._regex = None
+
+    @property
+    def regex(self):
+        # the regex is compiled when it is first used, most rules are never run in one parse
+        if self._regex is None:
+            self._regex = re.compile(self.pattern)
+        return self._regex
+
+    @classmethod
+    def from_rule(cls, rule):
+        """
+        :param rule: the compiled rule, {"name", "regex", "file_filter", "module", "keywords"}
+        :return: the line parser
+        """
+        return cls(rule.get("name"), rule.get("regex"), rule.get("file_filter"), rule.get("module"),
+                   rule.get("keywords"))
 
     def parse(self, desc, file_path):
-        event_dict = dict()
+        """
+        :param desc: the stripped line
+        :param file_path: the plog file path
+        :return: the EventRecord, None if the line is not matched or its time is invalid
+        """
         if not self.line_check(desc) or (self.file_filter is not None and self.file_filter not in file_path):
-            return event_dict
-
-        ret = self.regex.findall(desc)
-        if ret:
-            # Log format, eg. "[ERROR] RUNTIME(python3):2023-02-08-14:03:57.xxx"
-            # Parsing "time" format, eg. "2023-02-08 14:03:57"
-            time = desc[desc.index(":") + 1:]
-            time = time[0:time.index(".")]
-            delete_char_index = time.rindex("-")
-            time = time[0:delete_char_index] + " " + time[delete_char_index + 1:]
-
-            event_dict["key_info"] = desc
-            event_dict["time"] = time
-
-            event_dict["event_type"] = self.name
-            if self.module_regex is not None:
-                ret = self.module_regex.findall(file_path)
-                if ret:
-                    module = self.module_dict_func(ret[0])
-                    event_dict["param0"] = module
-        return event_dict
+            return None
+
+        ret = self.regex.search(desc)
+        if not ret:
+            return None
+        # Log format, eg. "[ERROR] RUNTIME(python3):2023-02-08-14:03:57.xxx"
+        # Parsing "time" format, eg. "2023-02-08 14:03:57"
+        time = desc[desc.index(":") + 1:]
+        time = time[0:time.index(".")]
+        delete_char_index = time.rindex("-")
+        time = time[0:delete_char_index] + " " + time[delete_char_index + 1:]
+        timestamp = event_time_to_timestamp(time)
+        if timestamp is None:
+            logger.warning(f"the time of the {self.name} event is invalid: {time}")
+            return None
+
+        params = dict()
+        if self.module_regex is not None:
+            ret = self.module_regex.findall(file_path)
+            if ret:
+                params = {"module": ret[0].replace(" ", "")}
+        return EventRecord(self.name, timestamp, desc, params.items())
 
     def line_check(self, line):
         keyword_num = 0
@@ -62,115 +87,73 @@ class LineParser:
         return keyword_num == len(self.keywords)
 
 
+class LineParserMatcher:
+    """
+    Select the candidate lines and line parsers of a chunk in one keyword pass. The distinct keywords of all
+    the line parsers are searched over the whole chunk text, and a line parser is a candidate of a line only if
+    all its keywords are found in the line. The other lines are never stripped or checked line by line,
+    and the regex of the other line parsers is never run.
+    """
+    def __init__(self, keywords, rule_keyword_ids):
+        """
+        :param keywords: the distinct keyword list of all the line parsers
+        :param rule_keyword_ids: the keyword ids of each line parser
+        """
+        self.keywords = list(keywords)
+        self.keyword_indexes = [frozenset(keyword_ids) for keyword_ids in rule_keyword_ids]
+
+    @classmethod
+    def from_rule_pack(cls, compiled):
+        return cls(compiled.get("keywords"), [rule.get("keyword_ids") for rule in compiled.get("rules")])
+
+    def candidates(self, lines, parser_indexes):
+        """
+        :param lines: the lines of the chunk
+        :param parser_indexes: the indexes of the line parsers to be checked, in the line parser order
+        :return: [(line index, candidate line parser indexes in the line parser order)], in the line order
+        """
+        if any(not self.keyword_indexes[index] for index in parser_indexes):
+            # the line parser without keyword checks every line
+            return [(line_index, parser_indexes) for line_index in range(len(lines))]
+        text = "".join(lines)
+        line_starts = list(accumulate((len(line) for line in lines), initial=0))
+        line_keywords = dict()
+        for keyword_id, keyword in enumerate(self.keywords):
+            self._find_all(text, keyword, line_starts, lambda line_index: line_keywords.setdefault(
+                line_index, set()).add(keyword_id))
+        # '\00' is removed before parsing, so a keyword may be split by it
+        self._find_all(text, '\00', line_starts, lambda line_index: line_keywords.setdefault(line_index, set()))
+
+        results = list()
+        for line_index in sorted(line_keywords):
+            found = line_keywords.get(line_index)
+            if '\00' in lines[line_index]:
+                results.append((line_index, parser_indexes))
+                continue
+            indexes = [index for index in parser_indexes if self.keyword_indexes[index] <= found]
+            if indexes:
+                results.append((line_index, indexes))
+        return results
+
+    @staticmethod
+    def _find_all(text, keyword, line_starts, add_line):
+        """
+        call add_line with the index of each line which contains the keyword.
+        """
+        position = text.find(keyword)
+        while position != -1:
+            line_index = bisect_right(line_starts, position) - 1
+            add_line(line_index)
+            # the other occurrences in the same line are skipped
+            position = text.find(keyword, line_starts[line_index + 1])
+
+
 class PlogParser(BMCLogFileParser):
     """根据提供的正则表达式对文件每行数据进行解析及数据提取"""
-    """parm_regex， parm_dict_func 以文件路径作为输入获取device id；parm_regex1，parm_dict_func1以文本中参数匹配获取module"""
-    LINE_PARSERS = [
-        LineParser(name="RuntimeTaskException",
-                   regex=re.compile(
-                       r".*?(ReportExceptProc:task exception).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(RUNTIME)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["ReportExceptProc:task exception"],
-                   ),
-        LineParser(name="RuntimeAicoreError",
-                   regex=re.compile(
-                       r".*?(device\(\d+\)).*?(aicore error).*?(error code = 0x800000).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(RUNTIME)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["device", "aicore error", "error code = 0x800000"],
-                   ),
-        LineParser(name="RuntimeModelExecuteTaskFailed",
-                   regex=re.compile(
-                       r".*?(model execute task failed, device_id=\d+).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(RUNTIME)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["model execute task failed, device_id="],
-                   ),
-        LineParser(name="RuntimeAicoreKernelExecuteFailed",
-                   regex=re.compile(
-                       r".*?(aicore kernel execute failed, device_id=\d+).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(RUNTIME)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["aicore kernel execute failed, device_id="],
-                   ),
-        LineParser(name="RuntimeStreamSyncFailed",
-                   regex=re.compile(
-                       r".*?(Stream Synchronize failed).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(RUNTIME)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["Stream Synchronize failed"],
-                   ),
-        LineParser(name="GEModelStreamSyncFailed",
-                   regex=re.compile(
-                       r".*?(Model stream sync failed).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(GE)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["Model stream sync failed"],
-                   ),
-        LineParser(name="GERunModelFail",
-                   regex=re.compile(
-                       r".*?(Run model fail).*?"),
-                   file_filter="plog",
-                   module_regex=re.compile(r"(GE)"),
-                   module_dict_func=lambda p: {"module": p.replace(" ", "")},
-                   keywords=["Run model fail"],
-                   ),
-        LineParser(name="FailedToApplyForResources",
-                   regex=re.compile(
-                       r".*?halResourceIdAlloc.*?failed.*?"),
-                   file_filter="plog",
-                   keywords=["halResourceIdAlloc", "failed"],
-                   ),
-        LineParser(name="RegisteredResourcesExceedsTheMaximum",
-                   regex=re.compile(
-                       r".*?Program register failed.*?"),
-                   file_filter="plog",
-                   keywords=["Program register failed"],
-                   ),
-        LineParser(name="FailedToexecuteTheAICoreOperator",
-                   regex=re.compile(
-                       r".*?fault kernel_name.*?func_name.*?"),
-                   file_filter="plog",
-                   keywords=["fault kernel_name", "func_name"],
-                   ),
-        LineParser(name="ExecuteModelFailed",
-                   regex=re.compile(
-                       r".*?ModelExecute.*?Execute model failed.*?"),
-                   file_filter="plog",
-                   keywords=["ModelExecute", "Execute model failed"],
-                   ),
-        LineParser(name="FailedToexecuteTheAICpuOperator",
-                   regex=re.compile(
-                       r".*?PrintAicpuErrorInfo.*?"),
-                   file_filter="plog",
-                   keywords=["PrintAicpuErrorInfo"],
-                   ),
-        LineParser(name="MemoryAsyncCopyFailed",
-                   regex=re.compile(
-                       r".*?Memory async copy failed.*?"),
-                   file_filter="plog",
-                   keywords=["Memory async copy failed"],
-                   ),
-        LineParser(name="NotifyWaitExecuteFailed",
-                   regex=re.compile(
-                       r".*?Notify wait execute failed.*?"),
-                   file_filter="plog",
-                   keywords=["Notify wait execute failed"],
-                   ),
-        LineParser(name="TaskRunFailed",
-                   regex=re.compile(
-                       r".*?Task run failed.*?Notify Wait.*?"),
-                   file_filter="plog",
-                   keywords=["Task run failed", "Notify Wait"],
-                   ),
-    ]
+    """行解析规则从规则包 plog-rules.json 加载，module 以文件路径匹配获取"""
+    # the line rules are loaded on the first parse, see load_line_rules
+    LINE_PARSERS = None
+    LINE_MATCHER = None
 
     VALID_PARAMS = {}
     TARGET_FILE_PATTERNS = ["plog_path"]
@@ -178,54 +161,210 @@ class PlogParser(BMCLogFileParser):
     def __init__(self):
         super().__init__()
 
-    def parse(self, file_path: str):
-        desc = dict()
-        if not os.path.isfile(file_path):
+    @classmethod
+    def load_line_rules(cls):
+        """
+        load the line parsers and their matcher from the rule pack when they are first used,
+        so importing the parser reads no rule file and writes no cache.
+        :return: the line parsers
+        """
+        if cls.LINE_PARSERS is None:
+            rule_pack = load_rule_pack(PLOG_RULE_FILE, get_cache_dir())
+            cls.LINE_MATCHER = LineParserMatcher.from_rule_pack(rule_pack)
+            cls.LINE_PARSERS = [LineParser.from_rule(rule) for rule in rule_pack.get("rules")]
+        return cls.LINE_PARSERS
+
+    def parse(self, file_path: str, offset=0, complete_lines=False):
+        """
+        parse the plog file from the offset in the current process, the chunks are parsed one by one.
+        The parse job parses the plog files on its shared scheduler instead, see schedule_parse.
+        :param file_path: the plog file path
+        :param offset: the offset from which the file is parsed
+        :param complete_lines: whether to stop at the last complete line, the rest is left for the next parse
+        :return: the desc dict, the "end_offset" is the position up to which the file has been parsed
+        """
+        chunk_results = (func(*args) for func, args in self.chunk_jobs(file_path, offset, complete_lines))
+        return self.collect_events(file_path, offset, chunk_results)
+
+    def schedule_parse(self, scheduler, file_path, offset=0, complete_lines=False):
+        """
+        add the chunk tasks of the plog file into the scheduler, and the local task which merges their results.
+        :param scheduler: the TaskScheduler
+        :param file_path: the plog file path
+        :param offset: the offset from which the file is parsed
+        :param complete_lines: whether to stop at the last complete line, the rest is left for the next parse
+        :return: the task which merges the chunk results, its result is the desc dict
+        """
+        name = os.path.basename(file_path)
+        chunk_tasks = [scheduler.add_task(f"plog {name} chunk {index}", func, args)
+                       for index, (func, args) in enumerate(self.chunk_jobs(file_path, offset, complete_lines))]
+        return scheduler.add_task(f"plog {name} merge", self.collect_chunk_tasks, (file_path, offset, chunk_tasks),
+                                  deps=chunk_tasks, local=True)
+
+    @staticmethod
+    def chunk_jobs(file_path, offset=0, complete_lines=False):
+        """
+        cut the plog file into the chunk jobs. A normal file is cut into chunks at the line boundaries,
+        and only the byte range of each chunk is sent to the pool. The archive member and gzip file
+        cannot be read from the middle, so they are read as a stream of chunks by one job.
+        :param file_path: the plog file path
+        :param offset: the offset from which the file is parsed
+        :param complete_lines: whether to stop at the last complete line
+        :return: [(func, args)], the result of each job is (end offset, compact result)
+        """
+        if not log_exists(file_path):
             logger.error(f"file {os.path.basename(file_path)} not exists.")
             raise FileNotExistError(f"file {os.path.basename(file_path)} not exists.")
         logger.info("start parse %s", file_path)
-        with safe_open(file_path, mode='r', encoding='utf-8') as _log:
-            lines = _log.readlines()
-            results = list()
-            if len(lines) <= LINE_NUM:
-                pool = Pool(1)
-                results.append(pool.apply_async(self.handle_parse, args=(lines, file_path)))
-                pool.close()
-            else:
-                process_num = math.ceil(len(lines) / LINE_NUM)
-                if process_num > WARN_PROCESS_NUM:
-                    logger.warning(f"the {os.path.basename(file_path)} is too large and the number of open processes "
-                                   f"is {process_num}, exceeds the warning value {WARN_PROCESS_NUM}.")
-                pool = Pool(process_num)
-                for i in range(0, process_num):
-                    start_index = i * LINE_NUM
-                    end_index = min(start_index + LINE_NUM, len(lines))
-                    logger.info("start index: %d, end index: %d", start_index, end_index)
-                    results.append(pool.apply_async(self.handle_parse, args=(lines[start_index:end_index], file_path)))
-                pool.close()
-            for result in results:
-                rst = result.get()
-                if rst:
-                    desc.setdefault("events", []).extend(rst)
+        if split_path(file_path)[1] or is_gzip_log(file_path):
+            return [(parse_plog_stream, (file_path, offset, complete_lines))]
+        return [(parse_plog_range, (file_path, start, end))
+                for start, end in _split_file_ranges(file_path, offset, complete_lines)]
+
+    @classmethod
+    def collect_chunk_tasks(cls, file_path, offset, chunk_tasks):
+        """
+        merge the results of the done chunk tasks, see collect_events.
+        """
+        return cls.collect_events(file_path, offset, (task.get() for task in chunk_tasks))
+
+    @classmethod
+    def collect_events(cls, file_path, offset, chunk_results):
+        """
+        merge the results of the chunks in the chunk order.
+        :param file_path: the plog file path
+        :param offset: the offset from which the file is parsed
+        :param chunk_results: the chunk results, (end offset, compact result)
+        :return: the desc dict, the "events" is the EventRecord list grouped by the line parser order
+        """
+        parser_results = [[] for _ in cls.load_line_rules()]
+        end_offset = offset
+        for end_offset, compact_results in chunk_results:
+            for index, events in compact_results:
+                parser_results[index].extend(events)
+        events = [record for results in parser_results for record in results]
         logger.info("end parse %s", file_path)
 
-        if "events" in desc and len(desc.get("events", [])) > 0:
-            desc["parse_next"] = True
-            return desc
-        return {"parse_next": True}
-
-    def handle_parse(self, lines, file_path):
-        parser_results = []
-        matched = [False for _ in range(len(lines))]
-        for line_parser in self.LINE_PARSERS:
-            for index, line in enumerate(lines):
-                if matched[index]:
-                    continue
-                line = line.strip()
-                line = line.replace('\00', '')  # Txt log file may have \00, it will make the loop impossible to exit.
-
-                event_dict = line_parser.parse(line, file_path)
-                if event_dict:
-                    matched[index] = True
-                    parser_results.append(event_dict)
-        return parser_results
+        if events:
+            return {"events": events, "parse_next": True, "end_offset": end_offset}
+        return {"parse_next": True, "end_offset": end_offset}
+
+    @classmethod
+    def group_parse(cls, lines, file_path):
+        """
+        parse the lines in one pass. Only the candidate lines are cleaned, once, and only the candidate
+        line parsers selected by the keywords are run on them. The first matched line parser wins.
+        :param lines: the lines of the plog file
+        :param file_path: the plog file path
+        :return: the compact result, [(line parser index, EventRecord list)] of the line parsers which have events
+        """
+        parser_indexes = [index for index, line_parser in enumerate(cls.load_line_rules())
+                          if line_parser.file_filter is None or line_parser.file_filter in file_path]
+        parser_results = [[] for _ in cls.LINE_PARSERS]
+        for line_index, candidate_indexes in cls.LINE_MATCHER.candidates(lines, parser_indexes):
+            line = lines[line_index].strip()
+            line = line.replace('\00', '')  # Txt log file may have \00, it will make the loop impossible to exit.
+            for index in candidate_indexes:
+                record = cls.LINE_PARSERS[index].parse(line, file_path)
+                if record:
+                    parser_results[index].append(record)
+                    break
+        return [(index, events) for index, events in enumerate(parser_results) if events]
+
+    @classmethod
+    def handle_parse(cls, lines, file_path):
+        """
+        parse the lines, the events are returned grouped by the line parser order.
+        :param lines: the lines of the plog file
+        :param file_path: the plog file path
+        :return: the EventRecord list
+        """
+        return [record for _, records in cls.group_parse(lines, file_path) for record in records]
+
+
+def parse_plog_content(content, file_path):
+    """
+    parse a chunk of the plog file content, which ends at a line boundary.
+    :param content: the chunk bytes
+    :param file_path: the plog file path
+    :return: the compact result of PlogParser.group_parse
+    """
+    with io.TextIOWrapper(io.BytesIO(content), encoding='utf-8') as _log:
+        return PlogParser.group_parse(_log.readlines(), file_path)
+
+
+def parse_plog_range(file_path, start, end):
+    """
+    parse the byte range of the memory-mapped plog file.
+    :param file_path: the plog file path
+    :param start: the start offset of the chunk
+    :param end: the end offset of the chunk
+    :return: (end, the compact result of PlogParser.group_parse)
+    """
+    with safe_open(file_path, "rb") as file_stream, \
+            mmap.mmap(file_stream.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+        content = file_map[start:end]
+    return end, parse_plog_content(content, file_path)
+
+
+def parse_plog_stream(file_path, offset, complete_lines):
+    """
+    parse the archive member or gzip file from the offset chunk by chunk.
+    :param file_path: the plog file path
+    :param offset: the offset from which the file is parsed
+    :param complete_lines: whether to stop at the last complete line
+    :return: (end offset, the compact result of PlogParser.group_parse merged over the chunks)
+    """
+    end_offset = [offset]
+    parser_results = dict()
+    for content in _read_chunks(file_path, offset, complete_lines, end_offset):
+        for index, events in parse_plog_content(content, file_path):
+            parser_results.setdefault(index, []).extend(events)
+    return end_offset[0], sorted(parser_results.items())
+
+
+def _split_file_ranges(file_path, offset, complete_lines):
+    """
+    cut the file from the offset into the byte ranges of about CHUNK_SIZE, each range ends at a line boundary.
+    Only the line boundaries are searched in the memory-mapped file, the file is not read into memory.
+    :return: [(start, end)]
+    """
+    with safe_open(file_path, "rb") as file_stream:
+        file_size = os.fstat(file_stream.fileno()).st_size
+        if offset >= file_size:
+            return []
+        with mmap.mmap(file_stream.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+            end_offset = file_size
+            if complete_lines:
+                end_offset = file_map.rfind(b"\n", offset, file_size) + 1 or offset
+            ranges = list()
+            start = offset
+            while start < end_offset:
+                end = file_map.find(b"\n", min(start + CHUNK_SIZE, end_offset) - 1, end_offset) + 1 or end_offset
+                ranges.append((start, end))
+                start = end
+    return ranges
+
+
+def _read_chunks(file_path, offset, complete_lines, end_offset):
+    """
+    read the archive member or gzip file from the offset as a stream of chunks, each chunk ends at a line boundary.
+    :param end_offset: the one element list, which is updated to the end offset of the read chunks
+    :return: the chunk bytes generator
+    """
+    with open_log(file_path) as _log:
+        _log.seek(offset)
+        rest = b""
+        while True:
+            block = _log.read(CHUNK_SIZE)
+            if not block:
+                break
+            content = rest + block
+            cut = content.rfind(b"\n") + 1
+            rest = content[cut:]
+            if cut:
+                end_offset[0] += cut
+                yield content[:cut]
+        if rest and not complete_lines:
+            end_offset[0] += len(rest)
+            yield rest
@@ -0,0 +1,105 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import os
+import re
+import json
+import hashlib
+
+from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.status import InfoIncorrectError, FileOpenError
+from ascend_fd.pkg.kg_parse.utils.log_record import logger
+
+# the major version of the rule pack file which can be loaded
+RULE_PACK_MAJOR_VERSION = "1"
+# the format of the compiled rule pack, the cache of another format is compiled again
+COMPILED_FORMAT = 1
+CACHE_PREFIX = "rule-pack-"
+
+
+def compile_rule_pack(pack):
+    """
+    check the rule pack and compile it into the matcher structure: the distinct keyword list of all the rules,
+    and the keyword ids of each rule.
+    :param pack: the rule pack, {"version": "1.x", "rules": [{"name", "keywords", "regex", "file_filter", "module"}]}
+    :return: the compiled rule pack, {"format", "version", "keywords", "rules"}
+    """
+    version = str(pack.get("version", ""))
+    if version.split(".")[0] != RULE_PACK_MAJOR_VERSION:
+        raise InfoIncorrectError(f"the rule pack version {version} is not supported.")
+    keyword_ids = dict()
+    rules = list()
+    for rule in pack.get("rules", []):
+        name = rule.get("name")
+        keywords = rule.get("keywords", [])
+        if not name or not isinstance(keywords, list) or not all(isinstance(key, str) and key for key in keywords):
+            raise InfoIncorrectError(f"the name or keywords of the rule {name} is incorrect.")
+        for pattern in (rule.get("regex"), rule.get("module")):
+            try:
+                re.compile(pattern or "")
+            except re.error as err:
+                raise InfoIncorrectError(f"the regex of the rule {name} is incorrect: {err}") from err
+        rules.append({
+            "name": name,
+            "regex": rule.get("regex"),
+            "file_filter": rule.get("file_filter"),
+            "module": rule.get("module"),
+            "keywords": keywords,
+            "keyword_ids": sorted({keyword_ids.setdefault(keyword, len(keyword_ids)) for keyword in keywords}),
+        })
+    if not rules:
+        raise InfoIncorrectError("the rule pack has no rule.")
+    return {"format": COMPILED_FORMAT, "version": version, "keywords": list(keyword_ids), "rules": rules}
+
+
+def load_rule_pack(rule_file, cache_dir=None):
+    """
+    load the compiled rule pack. The compiled form is cached as a json file keyed by the sha256 of the rule pack
+    content, so it is only compiled when the rule pack changes.
+    :param rule_file: the rule pack file path
+    :param cache_dir: the cache dir, the compiled form is not cached if it is None
+    :return: the compiled rule pack
+    """
+    with safe_open(rule_file, "rb") as file_stream:
+        content = file_stream.read()
+    digest = hashlib.sha256(content).hexdigest()
+    cache_file = os.path.join(cache_dir, f"{CACHE_PREFIX}{digest}.json") if cache_dir else None
+    compiled = _read_cache(cache_file, digest)
+    if compiled is None:
+        compiled = compile_rule_pack(json.loads(content))
+        compiled["sha256"] = digest
+        _write_cache(cache_file, compiled)
+    return compiled
+
+
+def _read_cache(cache_file, digest):
+    """
+    :return: the cached rule pack, None if the cache is missed or cannot be read, then the rule pack is compiled
+    """
+    if not cache_file or not os.path.isfile(cache_file):
+        return None
+    try:
+        with safe_open(cache_file, "r", encoding="utf-8") as file_stream:
+            compiled = json.load(file_stream)
+    except (OSError, ValueError, FileOpenError) as err:
+        logger.warning(f"cannot read the compiled rule pack cache: {err}")
+        return None
+    if not isinstance(compiled, dict) or compiled.get("format") != COMPILED_FORMAT \
+            or compiled.get("sha256") != digest:
+        return None
+    return compiled
+
+
+def _write_cache(cache_file, compiled):
+    if not cache_file:
+        return
+    # the content is written to a temp file first, so the concurrent jobs never read a partial cache
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with safe_open(temp_file, "w", encoding="utf-8") as file_stream:
+            json.dump(compiled, file_stream, ensure_ascii=False)
+        os.replace(temp_file, cache_file)
+        safe_chmod(cache_file, 0o640)
+    except (OSError, FileOpenError) as err:
+        logger.warning(f"cannot write the compiled rule pack cache: {err}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
@@ -1,10 +1,10 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2022. All rights reserved.
-import json
-import time
+from itertools import islice, count
 
 from ascend_fd.pkg.kg_parse.utils import logger
-from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord
+from ascend_fd.tool import safe_open, safe_chmod, dump_json, COMPACT_SEPARATORS
 from ascend_fd.status import InnerError
 
 
@@ -15,34 +15,12 @@ MAX_EVENT_COUNT = 30
 class BMCLogDataDescriptor:
     VALID_FLAGS = {
         "parse_next",
+        "end_offset",
     }
 
     def __init__(self):
         self.data = dict()
 
-    def __str__(self):
-        return json.dumps(self.data, sort_keys=False, indent=4, separators=(',', ':'), ensure_ascii=False)
-
-    @staticmethod
-    def get_time_stamp(event: dict):
-        struct_time = time.strptime(event["RaiseTime"], "%Y-%m-%d %H:%M:%S")
-        try:
-            time_stamp = time.mktime(struct_time)
-        except OverflowError:
-            time_stamp = 0
-            pass
-        return time_stamp
-
-    @staticmethod
-    def judge_same_event(event: dict, next_event: dict):
-        for item in event:
-            if item in ["RaiseTime", "alarmRaisedTime", "keyinfo"]:
-                continue
-            else:
-                if event[item] != next_event[item]:
-                    return False
-        return True
-
     def clear(self):
         self.data.clear()
 
@@ -61,15 +39,15 @@ class BMCLogDataDescriptor:
 
     # 增加 训练任务异常退出(TheTrainingTaskExitsAbnormally)事件
     def add_atlas_virtual_event(self, event_list: list):
-        raise_time = "false"
+        raise_time = None
         for ename in event_list:
             event_keyname = "%s_list" % ename
             event_keyname_list = self.data.get(event_keyname, None)
             if event_keyname_list:
-                raise_time = event_keyname_list[0].get("RaiseTime", None)
+                raise_time = event_keyname_list[0].timestamp
                 break
         # If no ATLAS-related fault events are found, the virtual_event_list events are not added.
-        if raise_time == "false":
+        if raise_time is None:
             return
         virtual_event_list = ["TheTrainingTaskExitsAbnormally", "RuntimeFaulty", "FailedToRestartTheProcess",
                               "FailedToLoadTheModel"]
@@ -77,16 +55,7 @@ class BMCLogDataDescriptor:
             key_name = "%s_list" % event_name
             if key_name in self.data:
                 continue
-            event_dict = dict()
-            event_dict["keyinfo"] = event_name
-            event_dict["RaiseTime"] = raise_time
-            event_dict["name"] = event_name
-            event_dict["typeName"] = "%s_Alarm" % event_name
-            event_dict["alarmRaisedTime"] = raise_time
-            event_dict["alarmId"] = event_dict.get("typeName")
-            event_dict["alarmName"] = event_dict.get("name")
-            event_dict["alarmLevel"] = "重要"
-            self.data.setdefault(key_name, []).append(event_dict)
+            self.data.setdefault(key_name, []).append(EventRecord(event_name, raise_time, event_name))
 
     def add_not_existed_parts(self, part_list: list):
         for entity_name in part_list:
@@ -121,36 +90,81 @@ class BMCLogDataDescriptor:
                 entity_dict["typeName"] = entity_name
                 self.data.setdefault(entity_keyname, []).append(entity_dict)
 
-    def merge_same_entity(self, entities):
-        if len(entities) == 1:
-            entities[0]["times"] = 1
-            return entities
-
-        entities.sort(key=lambda x: x["RaiseTime"])
-        reduced_entities = []
-
-        pre_event_dict = entities[0]
-        pre_time_stamp = self.get_time_stamp(pre_event_dict)
-        count = 1
-        for index, event_dict in enumerate(entities[1:]):
-            now_time_stamp = self.get_time_stamp(event_dict)
-            timing_difference = now_time_stamp - pre_time_stamp
-            if not self.judge_same_event(pre_event_dict, event_dict) or \
-                    timing_difference > TIME_MAX_DIFF or count >= MAX_EVENT_COUNT:
-                pre_event_dict["times"] = str(count)
-                reduced_entities.append(pre_event_dict)
-                pre_event_dict = event_dict
-                pre_time_stamp = now_time_stamp
-                count = 1
+    @staticmethod
+    def merge_records(records):
+        """
+        merge the same events in one linear scan over the time-sorted records. The same events are merged into
+        the first one of the group, until the event is TIME_MAX_DIFF later than it or the group has MAX_EVENT_COUNT
+        events. The events are the same if their signatures (event type and params) are equal, the signature hashes
+        are computed once and compared first. The merged records in the list are merged by their count
+        and last timestamp.
+        :param records: the EventRecord list of one event type
+        :return: the merged EventRecord list, the "count" is the number of the merged events
+        """
+        if not records:
+            return list()
+        records.sort(key=lambda x: x.timestamp)
+        signature_hashes = [hash(record.signature) for record in records]
+        groups = list()
+        first_record, first_hash = records[0], signature_hashes[0]
+        group_size, last_timestamp = first_record.count, first_record.last_timestamp
+        for record, signature_hash in zip(islice(records, 1, None), islice(signature_hashes, 1, None)):
+            if signature_hash != first_hash or record.signature != first_record.signature or \
+                    record.last_timestamp - first_record.timestamp > TIME_MAX_DIFF or \
+                    group_size + record.count > MAX_EVENT_COUNT:
+                groups.append((first_record, group_size, last_timestamp))
+                first_record, first_hash = record, signature_hash
+                group_size, last_timestamp = record.count, record.last_timestamp
             else:
-                count += 1
-
-            # If it is the last element, it is appended directly into the list.
-            if index == len(entities[1:]) - 1:
-                pre_event_dict["times"] = str(count)
-                reduced_entities.append(pre_event_dict)
+                group_size += record.count
+                last_timestamp = max(last_timestamp, record.last_timestamp)
+        groups.append((first_record, group_size, last_timestamp))
+        return [EventRecord(record.event_type, record.timestamp, record.key_info, record.params, group_size,
+                            last_timestamp) for record, group_size, last_timestamp in groups]
+
+    @classmethod
+    def merge_events(cls, records):
+        """
+        merge the same events of each event type, the merged records are saved in the parse manifest
+        instead of all the events.
+        :param records: the EventRecord list
+        :return: the merged EventRecord list, grouped by the event type
+        """
+        type_records = dict()
+        for record in records:
+            type_records.setdefault(record.event_type, []).append(record)
+        return [merged for type_list in type_records.values() for merged in cls.merge_records(type_list)]
+
+    @classmethod
+    def merge_same_entity(cls, records):
+        """
+        merge the same events of one event type, see merge_records.
+        :param records: the EventRecord list
+        :return: the generator of the merged NAIE event dicts, the "times" is the number of the merged events
+        """
+        if len(records) == 1 and records[0].count == 1:
+            event = records[0].to_naie_dict()
+            event["times"] = 1
+            yield event
+            return
 
-        return reduced_entities
+        for record in cls.merge_records(records):
+            event = record.to_naie_dict()
+            event["times"] = str(record.count)
+            yield event
+
+    def iter_section(self, key_name, serial_numbers):
+        """
+        merge the events of the section one by one, and number them by the serial numbers shared by all sections.
+        :param key_name: the section name, eg. "NotifyWaitExecuteFailed_list"
+        :param serial_numbers: the serial number iterator
+        :return: the generator of the numbered NAIE event dicts
+        """
+        for event in self.merge_same_entity(self.data.get(key_name)):
+            serial_no = "key%d" % next(serial_numbers)
+            event["serialNo"] = serial_no
+            event["_id"] = serial_no
+            yield event
 
 
 class DataDescriptorOfNAIE(BMCLogDataDescriptor):
@@ -172,37 +186,27 @@ class DataDescriptorOfNAIE(BMCLogDataDescriptor):
         super().__init__()
 
     def update_events(self, desc):
-        desc.sort(key=lambda x: x["time"])
-        for item in desc:
-            event = dict()
-            event["keyinfo"] = item["key_info"]
-            event["RaiseTime"] = item["time"]
-            if "param0" in item:
-                event.update(item["param0"])
-            if "param1" in item:
-                event.update(item["param1"])
-            event["name"] = item["event_type"]
-            event["typeName"] = "%s_Alarm" % item["event_type"]
-            event["alarmRaisedTime"] = event.get("RaiseTime")
-            event["alarmId"] = event.get("typeName")
-            event["alarmName"] = event.get("name")
-            event["alarmLevel"] = "重要"
-            key_name = "%s_list" % item.get("event_type")
-            self.data.setdefault(key_name, []).append(event)
-
-    def dump_to_json_file(self, file_path: str):
+        """
+        add the event records into the event type lists. The records are kept until the json file is dumped.
+        :param desc: the EventRecord list
+        """
+        desc.sort(key=lambda x: x.timestamp)
+        for record in desc:
+            self.data.setdefault("%s_list" % record.event_type, []).append(record)
+
+    def dump_to_json_file(self, file_path: str, compact=False):
+        """
+        dump the events to the json file. The event sections are merged and written event by event,
+        then the parts which are not found are written after them.
+        :param file_path: the json file path
+        :param compact: whether to write the json without indent
+        """
         self.add_atlas_virtual_event(self.ATLAS_EVENT_NAMES)
-        count = 1
-        merge_data = dict()
-        for key_name, entities in self.data.items():
-            merge_entities = self.merge_same_entity(entities)
-            for event in merge_entities:
-                event["serialNo"] = "key%d" % count
-                event["_id"] = "key%d" % count
-                count += 1
-            merge_data.update({key_name: merge_entities})
-        self.data = merge_data
+        event_keys = set(self.data)
         self.add_not_existed_parts(self.ENTITY_PART_NAMES)
+        serial_numbers = count(1)
+        sections = {key_name: self.iter_section(key_name, serial_numbers) if key_name in event_keys else entities
+                    for key_name, entities in self.data.items()}
         with safe_open(file_path, "w", encoding="utf-8") as f_dump:
-            f_dump.write(self.__str__())
+            dump_json(sections, f_dump, compact, separators=COMPACT_SEPARATORS)
         safe_chmod(file_path, 0o640)
@@ -3,7 +3,9 @@
 from ascend_fd.pkg.kg_parse.log_parser.format_support import PlogParser, BMCLogFileParser, NpuInfoParser
 from ascend_fd.pkg.kg_parse.log_parser.parser.bmc_log_data_descriptor import DataDescriptorOfNAIE
 from ascend_fd.pkg.kg_parse.utils import logger
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord
 from ascend_fd.status import InnerError
+from ascend_fd.scheduler import run_tasks
 
 
 class BMCLogPackageParser(object):
@@ -14,9 +16,11 @@ class BMCLogPackageParser(object):
         NpuInfoParser.__name__: NpuInfoParser.VALID_PARAMS,
     }
 
-    def __init__(self, log_path_dict):
+    def __init__(self, log_path_dict, manifest=None, incremental=False):
         super(BMCLogPackageParser, self).__init__()
         self.file_dict = log_path_dict
+        self.manifest = manifest
+        self.incremental = incremental
 
         self.parsers = list()
         self.desc = DataDescriptorOfNAIE()
@@ -32,29 +36,103 @@ class BMCLogPackageParser(object):
         self.parsers.append(parser_cls())
 
     def parse(self):
+        run_tasks(self.schedule_parse)
+
+    def schedule_parse(self, scheduler):
+        """
+        add the parse tasks of all the files into the scheduler. The files are parsed in parallel,
+        and the last task updates the descriptor with their results in the parser and file order.
+        :param scheduler: the TaskScheduler
+        :return: the last task
+        """
+        file_tasks = list()
         for parser in self.parsers:
             files = parser.find_log(self.file_dict)
             if not files:
                 logger.warning(f"don't find the origin file for parser {parser.__class__.__name__}")
                 continue
 
-            # NpuInfoParser only parse two file, "npu_info_before.txt" and "npu_info_after.txt"
+            # NpuInfoParser parses the "npu_info_before.txt" and "npu_info_after.txt" of all the workers at once
             if isinstance(parser, NpuInfoParser):
-                res = parser.parse(files)
-                if res:
-                    self.desc.update(res)
-                if not res.get("parse_next", False):
-                    logger.info(f'parsing ends, current parser type:{parser.__class__.__name__}')
-                    break
+                file_tasks.append((parser, None, scheduler.add_task("NpuInfoParser", parser.parse, (files,))))
                 continue
 
             for log_f in files:
-                res = parser.parse(log_f)
-                if res:
-                    self.desc.update(res)
-                if not res.get("parse_next", False):
-                    logger.info(f'parsing ends, current parser type:{parser.__class__.__name__}')
+                file_tasks.append((parser, log_f, self.schedule_from_checkpoint(scheduler, parser, log_f)))
+        return scheduler.add_task("kg_parse merge", self.update_desc, (file_tasks,),
+                                  deps=[task for _, _, task in file_tasks], local=True)
+
+    def update_desc(self, file_tasks):
+        """
+        update the descriptor with the results of the file tasks. If a parser stops the parsing, the results of
+        its next files are dropped, and the NpuInfoParser stops all the next parsers.
+        :param file_tasks: [(parser, log file or None, the done task)]
+        """
+        stopped_parsers = set()
+        for parser, log_f, task in file_tasks:
+            if parser in stopped_parsers:
+                continue
+            res = task.get()
+            if log_f is not None:
+                res = self.update_checkpoint(log_f, res)
+            if res:
+                self.desc.update(res)
+            if not res.get("parse_next", False):
+                logger.info(f'parsing ends, current parser type:{parser.__class__.__name__}')
+                if isinstance(parser, NpuInfoParser):
                     break
+                stopped_parsers.add(parser)
+
+        if self.manifest is not None:
+            self.restore_unselected_events()
+
+    def schedule_from_checkpoint(self, scheduler, parser, log_f):
+        """
+        add the parse task of the file, which parses from the offset recorded in the manifest.
+        """
+        if self.manifest is None:
+            return parser.schedule_parse(scheduler, log_f)
+        return parser.schedule_parse(scheduler, log_f, self.manifest.get_offset(log_f), self.incremental)
+
+    def update_checkpoint(self, log_f, res):
+        """
+        the merged events of the parsed part are restored from the manifest state, then the state is replaced by
+        the merged events of the whole parsed file, so the manifest size is bounded by the distinct events
+        instead of the log volume.
+        """
+        if self.manifest is None:
+            return res
+
+        offset = self.manifest.get_offset(log_f)
+        events = self.load_state_events(self.manifest.get_state(log_f))
+        events.extend(res.get("events", []))
+        merged_events = self.desc.merge_events(events)
+        self.manifest.update(log_f, res.get("end_offset", offset),
+                             {"events": [event.to_list() for event in merged_events]})
+        if events:
+            res["events"] = events
+        return res
+
+    @staticmethod
+    def load_state_events(state):
+        """
+        load the event records saved in the manifest state.
+        """
+        records = (EventRecord.from_state(event) for event in state.get("events", []))
+        return [record for record in records if record]
+
+    def restore_unselected_events(self):
+        """
+        restore the events of the files which were parsed last time but are not selected this time,
+        so the results are merged instead of being overwritten.
+        """
+        selected_files = set()
+        for parser in self.parsers:
+            selected_files.update(parser.find_log(self.file_dict))
+        for log_f, entry in self.manifest.entries.items():
+            events = self.load_state_events(entry.get("state", {}))
+            if log_f not in selected_files and events:
+                self.desc.update({"events": events})
 
     def get_log_data_descriptor(self):
         """return log_data_descriptor instance"""
@@ -5,6 +5,7 @@ import os
 
 from ascend_fd.pkg.kg_parse.utils import logger
 from ascend_fd.status import FileNotExistError
+from ascend_fd.scheduler import run_tasks
 from ascend_fd.pkg.kg_parse.log_parser.parser.bmc_log_package_parser_temp import BMCLogPackageParser
 
 
@@ -12,8 +13,11 @@ class SingleJsonFileProcessing:
     """single json file process class"""
     RESULT_FILE = "ascend-kg-parser.json"
 
-    def __init__(self, log_path):
+    def __init__(self, log_path, manifest=None, incremental=False, compact=False):
         self.log_path = log_path
+        self.manifest = manifest
+        self.incremental = incremental
+        self.compact = compact
 
     def export_json_file(self, result_path):
         """
@@ -21,15 +25,35 @@ class SingleJsonFileProcessing:
         :param result_path: the path to export json result
         :return:
         """
+        run_tasks(self.schedule_export, result_path)
+
+    def schedule_export(self, scheduler, result_path):
+        """
+        add the parse tasks and the export task into the scheduler.
+        :param scheduler: the TaskScheduler
+        :param result_path: the path to export json result
+        :return: the export task
+        """
         if not os.path.isdir(result_path):
             logger.error(f"result path {os.path.basename(result_path)} not found.")
             raise FileNotExistError(f"result path {os.path.basename(result_path)} not found.")
-        package_parser = BMCLogPackageParser(self.log_path)
+        package_parser = BMCLogPackageParser(self.log_path, self.manifest, self.incremental)
         logger.info("____start parse____")
-        package_parser.parse()
+        parse_task = package_parser.schedule_parse(scheduler)
+        json_path = os.path.join(result_path, self.RESULT_FILE)
+        return scheduler.add_task("kg_parse export", self.dump_json_file, (package_parser, json_path),
+                                  deps=[parse_task], local=True)
+
+    def dump_json_file(self, package_parser, json_path):
+        """
+        dump the parsed events into the json file, then save the manifest.
+        :param package_parser: the BMCLogPackageParser whose tasks are done
+        :param json_path: the json file path
+        """
         logger.info("____end parse____")
         desc = package_parser.get_log_data_descriptor()
-        json_path = os.path.join(result_path, self.RESULT_FILE)
         logger.info("json file is %s", json_path)
-        desc.dump_to_json_file(json_path)
+        desc.dump_to_json_file(json_path, self.compact)
         desc.clear()
+        if self.manifest is not None:
+            self.manifest.save()
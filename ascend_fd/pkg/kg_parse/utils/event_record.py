@@ -0,0 +1,119 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import sys
+import time
+import calendar
+
+
+EVENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+ALARM_LEVEL = "重要"
+
+
+def event_time_to_timestamp(event_time):
+    """
+    convert the event time to epoch seconds. The log time is regarded as UTC, so the timestamp order is the same
+    as the time string order, and the time string is restored exactly.
+    :param event_time: "yyyy-mm-dd HH:MM:SS"
+    :return: epoch seconds, None if the time is invalid
+    """
+    try:
+        return calendar.timegm(time.strptime(event_time, EVENT_TIME_FORMAT))
+    except (ValueError, OverflowError):
+        return None
+
+
+def timestamp_to_event_time(timestamp):
+    return time.strftime(EVENT_TIME_FORMAT, time.gmtime(timestamp))
+
+
+class EventRecord:
+    """
+    The compact event record passed from the parse workers to the data descriptor. The event type is interned,
+    the time is an epoch int, and the params are a tuple of (key, value) pairs.
+    The NAIE event dict is only built when the json file is dumped.
+    A merged record stands for "count" same events, from its timestamp to the last timestamp.
+    """
+    __slots__ = ["event_type", "timestamp", "key_info", "params", "count", "last_timestamp"]
+
+    def __init__(self, event_type, timestamp, key_info, params=(), count=1, last_timestamp=None):
+        self.event_type = sys.intern(event_type)
+        self.timestamp = timestamp
+        self.key_info = key_info
+        self.params = tuple(params)
+        self.count = count
+        self.last_timestamp = timestamp if last_timestamp is None else last_timestamp
+
+    def __eq__(self, other):
+        return isinstance(other, EventRecord) and self.to_list() == other.to_list()
+
+    def __hash__(self):
+        return hash((self.event_type, self.timestamp, self.key_info, self.params, self.count))
+
+    def __repr__(self):
+        return f"EventRecord({self.event_type}, {self.raise_time})"
+
+    def __reduce__(self):
+        # pickle the fields only, the records are sent back from the parse workers
+        return EventRecord, (self.event_type, self.timestamp, self.key_info, self.params, self.count,
+                             self.last_timestamp)
+
+    @property
+    def signature(self):
+        """
+        the events of the same signature are the same event, only their time and key info differ.
+        """
+        return self.event_type, self.params
+
+    @property
+    def raise_time(self):
+        return timestamp_to_event_time(self.timestamp)
+
+    @classmethod
+    def from_event_dict(cls, event_dict):
+        """
+        convert the parsed event dict, {"key_info", "time", "event_type", "param0", "param1"}, to the record.
+        :param event_dict: the event dict
+        :return: the record, None if the time is invalid
+        """
+        timestamp = event_time_to_timestamp(event_dict.get("time", ""))
+        if timestamp is None:
+            return None
+        params = dict()
+        params.update(event_dict.get("param0", {}))
+        params.update(event_dict.get("param1", {}))
+        return cls(event_dict.get("event_type"), timestamp, event_dict.get("key_info"), params.items())
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        load the record saved in the manifest state. The state of an earlier version is the event dict,
+        or the list without the count and last timestamp.
+        :param state: [event_type, timestamp, key_info, [[key, value], ...], count, last_timestamp] or the event dict
+        :return: the record, None if the state is invalid
+        """
+        if isinstance(state, dict):
+            return cls.from_event_dict(state)
+        event_type, timestamp, key_info, params = state[:4]
+        return cls(event_type, timestamp, key_info, (tuple(param) for param in params), *state[4:6])
+
+    def to_list(self):
+        return [self.event_type, self.timestamp, self.key_info, [list(param) for param in self.params],
+                self.count, self.last_timestamp]
+
+    def to_naie_dict(self):
+        """
+        :return: the NAIE event dict in the kg parse json file
+        """
+        raise_time = self.raise_time
+        type_name = "%s_Alarm" % self.event_type
+        event = dict()
+        event["keyinfo"] = self.key_info
+        event["RaiseTime"] = raise_time
+        event.update(self.params)
+        event["name"] = self.event_type
+        event["typeName"] = type_name
+        event["alarmRaisedTime"] = raise_time
+        event["alarmId"] = type_name
+        event["alarmName"] = self.event_type
+        event["alarmLevel"] = ALARM_LEVEL
+        return event
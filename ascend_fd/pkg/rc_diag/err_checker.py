@@ -1,33 +1,44 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
-import re
+import sys
 import logging
 from datetime import datetime
 
 from ascend_fd import regular_rule
-from ascend_fd.tool import popen_grep
 from ascend_fd.status import InfoNotFoundError
+from ascend_fd.pkg.rc_diag.heartbeat_graph import HeartbeatGraph
 
 
 rc_logger = logging.getLogger("kg_diag")
 
 
 class Rank:
+    """
+    The rank identified by (worker id, rank id, server id, device id). The slots keep the instance compact
+    in the large clusters, and the server and device ids are interned, so the same ids share one string.
+    The error info is only created for the error ranks.
+    """
+    __slots__ = ["worker_id", "rank_id", "server_id", "device_id", "err_reasons", "err_content"]
+
     def __init__(self, worker_id="-1", rank_id="-1", server_id="-1", device_id="-1"):
-        self.worker_id = worker_id
+        self.worker_id = sys.intern(worker_id)
         self.rank_id = rank_id
-        self.server_id = server_id
-        self.device_id = device_id
+        self.server_id = sys.intern(server_id)
+        self.device_id = sys.intern(device_id)
+
+        self.err_reasons = list()
+        self.err_content = None
 
-        self.origin_err_log = []
-        self.err_content = {}
+    @property
+    def key(self):
+        return self.worker_id, self.rank_id, self.server_id, self.device_id
 
     def __hash__(self):
-        return hash(self.worker_id + self.rank_id + self.server_id + self.device_id)
+        return hash(self.key)
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return hash(self) == hash(other)
+            return self.key == other.key
         return False
 
     def __repr__(self):
@@ -38,17 +49,18 @@ class Rank:
     @property
     def err_time(self):
         max_time = '9999-12-31-23:59:59.999.999'
-        return self.err_content.get("First_err_time", max_time)
+        # the rank whose error logs have no valid time is sorted last
+        return (self.err_content or {}).get("First_err_time") or max_time
 
     @property
     def hccl_count(self):
-        return self.err_content.get("Hccl_count", 0)
+        return (self.err_content or {}).get("Hccl_count", 0)
 
-    def add_err_log(self, log):
-        self.origin_err_log.append(log)
+    def update_err_reasons(self, err_reasons):
+        self.err_reasons = sorted(set(self.err_reasons).union(err_reasons))
 
     def update_err_content(self, err_content):
-        self.err_content.update(err_content)
+        self.err_content = {**(self.err_content or {}), **err_content}
 
 
 class Mode:
@@ -113,7 +125,6 @@ class BaseChecker:
 
 
 class AllRankNoErrChecker(BaseChecker):
-    HEARTBEAT_RE_LENGTH = 3
     name = "All rank have no error"
 
     def check(self, plog_map, mode):
@@ -122,18 +133,18 @@ class AllRankNoErrChecker(BaseChecker):
             self.root_ranks = Rank()
             return
 
-        heartbeat_relation = self._parse_heartbeat_content(plog_map)
-        if len(heartbeat_relation) == self.rank_table.rank_num:
+        heartbeat_graph = self._parse_heartbeat_content(plog_map)
+        if heartbeat_graph.reporter_num() == self.rank_table.rank_num:
             self.description = "No error logs are found on all Ranks. And all ranks have heartbeats."
             self.root_ranks = Rank()
             return
 
-        if heartbeat_relation:
-            heartbeat_relation_list = sorted(heartbeat_relation.values(), key=lambda x: len(x), reverse=True)
-            no_heartbeat_max_set = set(heartbeat_relation_list[0])
-            self.description = f"In the FORCE_KILL mode, heartbeat was lost on rank {str(no_heartbeat_max_set)}"
+        dead_ranks = heartbeat_graph.dead_ranks()
+        if dead_ranks:
+            no_heartbeat_set = set(dead_ranks)
+            self.description = f"In the FORCE_KILL mode, heartbeat was lost on rank {str(no_heartbeat_set)}"
             self.solution = "Please check the training process on the lost heartbeat device."
-            self.root_ranks = no_heartbeat_max_set
+            self.root_ranks = no_heartbeat_set
             return
 
         self.description = "No error logs are found on all Ranks. And all ranks don't have heartbeats."
@@ -141,65 +152,37 @@ class AllRankNoErrChecker(BaseChecker):
 
     def _parse_heartbeat_content(self, plog_map):
         """
-        parse heartbeat info from plog by grep.
-        :param plog_map: the plog file map.
-        :return: heartbeat relation info
+        build the lost heartbeat graph from the plog facts.
+        :param plog_map: the plog facts map.
+        :return: HeartbeatGraph
         """
-        heartbeat_relation = dict()
-        flag = False
-        for plog_file in plog_map.values():
-            heartbeat_grep = popen_grep(regular_rule.HEARTBEAT_INFO, file=plog_file)
-            heartbeat_logs = heartbeat_grep.stdout.readlines()
-            if not heartbeat_logs:
-                continue
-            for heartbeat_log in heartbeat_logs:
-                if re.search(regular_rule.EVENT_HCCL, heartbeat_log):
-                    # According to the regular rules, 3 sets of matching results will be found,
-                    # which are record node, lost heartbeat node, and report node.
-                    # Each set of results includes (ip_addr, device_id)
-                    heartbeat_re = re.findall(regular_rule.HEARTBEAT_RANK, heartbeat_log)
-                    if not heartbeat_re or len(heartbeat_re) != self.HEARTBEAT_RE_LENGTH:
-                        continue
-                    flag = True
-                    live_re, dead_re = heartbeat_re[0], heartbeat_re[1]
-                    # The record node is live server, the lost heartbeat node is dead server.
-                    live_server, live_device = live_re[0], live_re[1]
-                    dead_server, dead_device = dead_re[0], dead_re[1]
-                    live_rank = self.rank_table.get_rank_from_server_device_id(live_server, live_device)
-                    dead_rank = self.rank_table.get_rank_from_server_device_id(dead_server, dead_device)
-                    heartbeat_relation.setdefault(live_rank, list()).append(dead_rank)
-        if not flag:
+        heartbeat_graph = HeartbeatGraph()
+        for plog_facts in plog_map.values():
+            for live_server, live_device, dead_server, dead_device in plog_facts.heartbeats:
+                # The record node is live server, the lost heartbeat node is dead server.
+                live_rank = self.rank_table.get_rank_from_server_device_id(live_server, live_device)
+                dead_rank = self.rank_table.get_rank_from_server_device_id(dead_server, dead_device)
+                heartbeat_graph.add_edge(live_rank, dead_rank)
+        if not heartbeat_graph.edge_num:
             rc_logger.error("no heartbeat error is recorded in the log. "
                             "Or the heartbeat is not enabled for training. Please check.")
             raise InfoNotFoundError("no heartbeat error is recorded in the log. "
                                     "Or the heartbeat is not enabled for training. Please check.")
-        return heartbeat_relation
+        return heartbeat_graph
 
 
 class ErrorInfoChecker(BaseChecker):
-    HCCL_ERR_REASON = ["get socket timeout", "connected p2p timeout", "taskType[Notify Wait]",
-                       "taskType[Reduce Inline]", "taskType[Memcpy]", "Open TsdClient failed"]
+    HCCL_ERR_REASON = regular_rule.HCCL_ERR_REASON
 
     @staticmethod
-    def update_err_content_from_log(rank, error_logs):
-        # The log example:
-        # "[ERROR] XXXX(**,**):20yy-mm-dd-xx:xx:xx.xxx.xxx ********************"
-        first_err_info = error_logs[0].strip()
-
-        # get the first error log's time stamp and remove the separation point of millisecond.
-        times = first_err_info.split()[1].split(")")[1].strip(":")
-        err_time = times[:-4] + times[-3:]  # "20yy-mm-dd-xx:xx:xx.xxx.xxx" -> "20yy-mm-dd-xx:xx:xx.xxxxxx"
-
-        hccl_count = 0
-        for err_info in error_logs:
-            err_info = err_info.strip()
-            if re.search(regular_rule.ERROR_HCCL, err_info):
-                hccl_count += 1
-            rank.add_err_log(err_info)
-        total_err_count = len(error_logs)
-        others_count = total_err_count - hccl_count
-
-        err_content = {'First_err_time': err_time, 'Hccl_count': hccl_count,
+    def update_err_content_from_facts(rank, plog_facts):
+        # The first error time, the error counts and the HCCL error reasons have been summarised
+        # by the rc parse job, the error logs are not retained.
+        rank.update_err_reasons(plog_facts.err_reasons)
+        total_err_count = plog_facts.err_count
+        others_count = total_err_count - plog_facts.hccl_count
+
+        err_content = {'First_err_time': plog_facts.first_err_time, 'Hccl_count': plog_facts.hccl_count,
                        'Others_count': others_count, 'Total_err_count': total_err_count}
         rank.update_err_content(err_content)
 
@@ -219,27 +202,26 @@ class ErrorInfoChecker(BaseChecker):
         last_err_time = self._get_last_hccl_err_time()
         interval_times = (datetime.strptime(last_err_time, '%Y-%m-%d-%H:%M:%S.%f') -
                           datetime.strptime(first_err_time, '%Y-%m-%d-%H:%M:%S.%f')).total_seconds()
-        for reason_index, err_reason in enumerate(self.HCCL_ERR_REASON):
-            for rank in self.rank_table.err_rank:
-                for err_log in rank.origin_err_log:
-                    if err_reason in err_log and 'HCCL' in err_log:
-                        self._check_hccl_error(interval_times, reason_index, rank, mode)
-                        return
+        # index the first rank (in error time order) of each reason, then the reason with the highest priority
+        # (the smallest index in HCCL_ERR_REASON) is resolved by a lookup.
+        reason_rank_index = dict()
+        for rank in self.rank_table.err_rank:
+            for reason_index in rank.err_reasons:
+                reason_rank_index.setdefault(reason_index, rank)
+        if reason_rank_index:
+            reason_index = min(reason_rank_index)
+            self._check_hccl_error(interval_times, reason_index, reason_rank_index.get(reason_index), mode)
 
     def _parse_err_content(self, plog_map):
         """
-        get rank error content.
-        [rank_id, origin error log list, error info dict]
+        get rank error content from the plog facts.
         """
         for rank in self.rank_table.err_rank:
-            plog_file = plog_map.get(rank, None)
-            if not plog_file:
-                continue
-            err_grep = popen_grep(regular_rule.ERROR, file=plog_file)
-            error_logs = err_grep.stdout.readlines()
-            if not error_logs:
+            plog_facts = plog_map.get(rank, None)
+            if not plog_facts or not plog_facts.err_count:
                 continue
-            self.update_err_content_from_log(rank, error_logs)
+            self.update_err_content_from_facts(rank, plog_facts)
+        # the sort is stable, the ranks with the same error time keep the load order of worker id and file name
         self.rank_table.err_rank.sort(key=lambda x: x.err_time)
 
     def _get_last_hccl_err_time(self):
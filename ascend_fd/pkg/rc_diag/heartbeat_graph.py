@@ -0,0 +1,135 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
+from array import array
+
+
+class HeartbeatGraph:
+    """
+    The lost heartbeat graph. Each rank has a compact integer id, and each lost heartbeat record is an edge
+    from the live rank (the record node) to the dead rank (the lost heartbeat node). The edges are stored in arrays.
+    A dead rank stops reporting, so the ranks which explain all the lost heartbeats are the reported ranks
+    in the sink strongly connected components, which do not report any rank outside themselves.
+    All the analysis is linear in the number of ranks and edges.
+    """
+    def __init__(self):
+        self.ranks = list()
+        self.rank_ids = dict()
+        self.edge_src = array('l')
+        self.edge_dst = array('l')
+
+    @property
+    def rank_num(self):
+        return len(self.ranks)
+
+    @property
+    def edge_num(self):
+        return len(self.edge_src)
+
+    def get_rank_id(self, rank):
+        rank_id = self.rank_ids.get(rank)
+        if rank_id is None:
+            rank_id = len(self.ranks)
+            self.rank_ids[rank] = rank_id
+            self.ranks.append(rank)
+        return rank_id
+
+    def add_edge(self, live_rank, dead_rank):
+        self.edge_src.append(self.get_rank_id(live_rank))
+        self.edge_dst.append(self.get_rank_id(dead_rank))
+
+    def reporter_num(self):
+        """
+        :return: the number of the ranks which record the lost heartbeat
+        """
+        return len(set(self.edge_src))
+
+    def in_degree(self):
+        in_degree = array('l', bytes(self.edge_dst.itemsize * self.rank_num))
+        for dst in self.edge_dst:
+            in_degree[dst] += 1
+        return in_degree
+
+    def adjacency(self):
+        """
+        build the compressed adjacency arrays by the counting sort of the edges.
+        :return: (offsets, targets), the targets of rank u are targets[offsets[u]:offsets[u + 1]]
+        """
+        offsets = array('l', bytes(self.edge_src.itemsize * (self.rank_num + 1)))
+        for src in self.edge_src:
+            offsets[src + 1] += 1
+        for rank_id in range(self.rank_num):
+            offsets[rank_id + 1] += offsets[rank_id]
+        targets = array('l', bytes(self.edge_dst.itemsize * self.edge_num))
+        position = array('l', offsets)
+        for src, dst in zip(self.edge_src, self.edge_dst):
+            targets[position[src]] = dst
+            position[src] += 1
+        return offsets, targets
+
+    def strongly_connected_components(self):
+        """
+        the iterative Tarjan algorithm, so the recursion limit is not reached in the large clusters.
+        :return: (component id array of each rank, component number)
+        """
+        offsets, targets = self.adjacency()
+        unvisited = -1
+        index = array('l', [unvisited]) * self.rank_num
+        low_link = array('l', [0]) * self.rank_num
+        component = array('l', [unvisited]) * self.rank_num
+        on_stack = bytearray(self.rank_num)
+        stack = list()
+        next_index = 0
+        component_num = 0
+
+        for root in range(self.rank_num):
+            if index[root] != unvisited:
+                continue
+            # the call stack of (rank id, next edge position)
+            call_stack = [(root, offsets[root])]
+            index[root] = low_link[root] = next_index
+            next_index += 1
+            stack.append(root)
+            on_stack[root] = 1
+            while call_stack:
+                node, edge_pos = call_stack[-1]
+                if edge_pos < offsets[node + 1]:
+                    call_stack[-1] = (node, edge_pos + 1)
+                    target = targets[edge_pos]
+                    if index[target] == unvisited:
+                        index[target] = low_link[target] = next_index
+                        next_index += 1
+                        stack.append(target)
+                        on_stack[target] = 1
+                        call_stack.append((target, offsets[target]))
+                    elif on_stack[target]:
+                        low_link[node] = min(low_link[node], index[target])
+                    continue
+
+                call_stack.pop()
+                if call_stack:
+                    parent = call_stack[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+                if low_link[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = component_num
+                        if member == node:
+                            break
+                    component_num += 1
+        return component, component_num
+
+    def dead_ranks(self):
+        """
+        find the smallest set of dead ranks which explains the lost heartbeats:
+        the ranks reported lost in the sink components of the condensation graph.
+        :return: the dead rank list, in the order of the rank id
+        """
+        component, component_num = self.strongly_connected_components()
+        has_out_edge = bytearray(component_num)
+        for src, dst in zip(self.edge_src, self.edge_dst):
+            if component[src] != component[dst]:
+                has_out_edge[component[src]] = 1
+        in_degree = self.in_degree()
+        return [self.ranks[rank_id] for rank_id in range(self.rank_num)
+                if in_degree[rank_id] and not has_out_edge[component[rank_id]]]
@@ -0,0 +1,95 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
+import logging
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+
+rc_logger = logging.getLogger("kg_diag")
+ERR_TIME_FORMAT = '%Y-%m-%d-%H:%M:%S.%f'
+# the ranks which report the error within this window after the first error are the early error ranks
+EARLY_WINDOW_US = 1000 * 1000
+HISTOGRAM_BUCKET_NUM = 10
+OUTLIER_IQR_FACTOR = 1.5
+MAX_OUTPUT_RANK_NUM = 20
+US_PER_MS = 1000
+
+
+def err_time_to_us(err_time):
+    """
+    convert the first error time to epoch microseconds. The log time is regarded as UTC.
+    :param err_time: "20yy-mm-dd-xx:xx:xx.xxxxxx"
+    :return: epoch microseconds
+    """
+    log_time = datetime.strptime(err_time, ERR_TIME_FORMAT).replace(tzinfo=timezone.utc)
+    return int(log_time.timestamp()) * 1000000 + log_time.microsecond
+
+
+def analyze_propagation(plog_map):
+    """
+    analyze how the error spread across the ranks by their first error time.
+    The times are loaded into an int64 array as epoch microseconds relative to the first error,
+    then the propagation order, the per-server first error deltas, the time histogram and the outliers
+    are computed over the sorted array.
+    The rank whose error time is invalid is left out of the analysis.
+    :param plog_map: the plog facts map, {rank: PlogFacts}
+    :return: the analysis dict, None if no rank has error time
+    """
+    err_ranks = list()
+    for rank, facts in plog_map.items():
+        if not facts.first_err_time:
+            continue
+        try:
+            err_ranks.append((err_time_to_us(facts.first_err_time), rank, facts.first_err_time))
+        except (ValueError, TypeError):
+            rc_logger.warning(f"the first error time {facts.first_err_time} of {rank} is invalid, "
+                              f"it is not used in the propagation analysis.")
+    if not err_ranks:
+        return None
+    err_ranks.sort(key=lambda item: item[0])
+    first_time = err_ranks[0][0]
+    deltas = array('q', (err_time - first_time for err_time, _, _ in err_ranks))
+    ranks = [rank for _, rank, _ in err_ranks]
+    span = deltas[-1]
+
+    server_deltas = dict()
+    for delta, rank in zip(deltas, ranks):
+        # the deltas are sorted, so the first one of each server is its first error
+        server_deltas.setdefault(rank.server_id, delta)
+
+    early_num = bisect_right(deltas, EARLY_WINDOW_US)
+    return {
+        "first_error_time": err_ranks[0][2],
+        "error_rank_num": len(ranks),
+        "time_span_ms": span / US_PER_MS,
+        "propagation_order": [repr(rank) for rank in ranks[:MAX_OUTPUT_RANK_NUM]],
+        "early_error_ranks": [repr(rank) for rank in ranks[:min(early_num, MAX_OUTPUT_RANK_NUM)]],
+        "early_error_rank_num": early_num,
+        "server_first_error_delta_ms": {server_id: delta / US_PER_MS for server_id, delta in server_deltas.items()},
+        "error_time_histogram": _histogram(deltas, span),
+        "outlier_ranks": [repr(ranks[index]) for index in _outlier_index(deltas)][:MAX_OUTPUT_RANK_NUM],
+    }
+
+
+def _histogram(deltas, span):
+    """
+    count the sorted deltas in HISTOGRAM_BUCKET_NUM buckets of the same width.
+    """
+    bucket_width = span // HISTOGRAM_BUCKET_NUM + 1
+    counts = array('q', bytes(8 * HISTOGRAM_BUCKET_NUM))
+    for bucket in range(HISTOGRAM_BUCKET_NUM):
+        counts[bucket] = bisect_right(deltas, (bucket + 1) * bucket_width - 1) - \
+                         bisect_right(deltas, bucket * bucket_width - 1)
+    return {"bucket_width_ms": bucket_width / US_PER_MS, "counts": counts.tolist()}
+
+
+def _outlier_index(deltas):
+    """
+    the ranks which report the error much later than the others, their deltas are larger than Q3 + 1.5 * IQR.
+    """
+    if len(deltas) < 4:
+        return []
+    q1, q3 = deltas[len(deltas) // 4], deltas[len(deltas) * 3 // 4]
+    upper = q3 + OUTLIER_IQR_FACTOR * (q3 - q1)
+    return range(bisect_right(deltas, upper), len(deltas))
@@ -1,6 +1,7 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
 import logging
+import multiprocessing
 import os
 import re
 import json
@@ -8,10 +9,13 @@ import json
 from ascend_fd.status import FileNotExistError, InfoNotFoundError, InfoIncorrectError
 from ascend_fd.pkg.rc_diag.err_checker import (AllRankNoErrChecker, LostLogChecker, SingleRankChecker,
                                                ErrorInfoChecker, NoErrInNFKChecker, Mode, Rank)
-from ascend_fd.tool import safe_open, popen_grep, safe_chmod
+from ascend_fd.pkg.rc_diag.propagation import analyze_propagation
+from ascend_fd.pkg.rc_parse.plog_record import PlogFacts, RECORD_SUFFIX
+from ascend_fd.tool import safe_open, safe_chmod, dump_json
 from ascend_fd import regular_rule
 
 rc_logger = logging.getLogger("kg_diag")
+MAX_PROCESS_NUM = 32
 
 
 class RankTable:
@@ -44,11 +48,10 @@ class RankTable:
 
     def add_rank(self, rank):
         """
-        rank map: {rank_id: rank}
-        server device map: {"server_id-device_id": rank}
-        :return:
+        rank map: {int(rank_id): rank}
+        server device map: {(server_id, device_id): rank}, the ids are interned by the Rank
         """
-        self.rank_map.update({rank.rank_id: rank})
+        self.rank_map.update({int(rank.rank_id): rank})
         self.server_device_map.update({(rank.server_id, rank.device_id): rank})
 
     def get_rank_from_server_device_id(self, server_id, device_id):
@@ -84,37 +87,21 @@ class RCDiagWorker:
 
         self.rank_pid_map = dict()
         self.plog_map = dict()
+        self.worker_summary = dict()
 
     @staticmethod
-    def get_rank_info_from_plog(worker_id, plog_file):
+    def load_plog_facts(plog_file, facts_dict=None):
         """
-        get a Rank (worker id, rank id, server id and device id) and rank num from plog files by grep.
+        load the plog facts from the per-worker summary or the record file saved by the rc parse job.
+        So the fields have been extracted and the text does not need to be scanned again.
         """
-        rc_logger.info(f"get the rank info from plog file {os.path.basename(plog_file)} by grep trace log.")
-        rank_num = -1
-        trace_grep = popen_grep(regular_rule.TRACE_HCCL, file=plog_file)
-        rank_grep = popen_grep(regular_rule.RANK_INFO, stdin=trace_grep.stdout)
-        rank_logs = rank_grep.stdout.readlines()
-        if not rank_logs:
-            rc_logger.info(f"cannot get rank info by grep trace log. "
-                           f"Get the rank info from plog file {os.path.basename(plog_file)} by grep error log.")
-            error_grep = popen_grep(regular_rule.ERROR_HCCL, file=plog_file)
-            rank_grep = popen_grep(regular_rule.RANK_INFO, stdin=error_grep.stdout)
-            rank_logs = rank_grep.stdout.readlines()
-            if not rank_logs:
-                return rank_num, Rank()
-
-        for rank_log in rank_logs:
-            info_re = re.search(regular_rule.RANKNUM_AND_ID_RE, rank_log)
-            if info_re:
-                rank_num = int(info_re[1])
-                rank_id = info_re[2]
-                server_id, device_id = "0.0.0.0", "-1"
-                ser_dev_re = re.search(regular_rule.SERVER_AND_DEVICE_RE, rank_log)
-                if ser_dev_re:
-                    server_id, device_id = ser_dev_re[1], ser_dev_re[2]
-                return rank_num, Rank(worker_id, rank_id, server_id, device_id)
-        return rank_num, Rank()
+        if facts_dict:
+            return PlogFacts.from_dict(plog_file, facts_dict)
+        record_file = f"{os.path.splitext(plog_file)[0]}{RECORD_SUFFIX}"
+        if os.path.isfile(record_file):
+            return PlogFacts.from_record_file(plog_file, record_file)
+        rc_logger.info(f"the record file of {os.path.basename(plog_file)} is not found, scan the plog file once.")
+        return PlogFacts.from_text_file(plog_file)
 
     def start_job(self):
         """
@@ -124,6 +111,7 @@ class RCDiagWorker:
         err_checker = self.generate_checker()
         err_checker.check(self.plog_map, self.mode)
         result, worker_list = err_checker.format_output()
+        result["error_propagation"] = analyze_propagation(self.plog_map)
         return {"Ascend-RC-Worker-Rank-Analyze Result": result}, worker_list
 
     def generate_checker(self):
@@ -141,11 +129,43 @@ class RCDiagWorker:
             return NoErrInNFKChecker(self.rank_table)
         return ErrorInfoChecker(self.rank_table)
 
+    @staticmethod
+    def load_all_plog_facts(plog_tasks):
+        """
+        load the facts of all the plog files. The facts in the summary are merged in memory, and the other files are
+        scanned on a bounded process pool. The pool is not used when the current process is a daemon.
+        :param plog_tasks: [(worker_id, plog_file, facts_dict), ...]
+        :return: the facts list in the same order as plog_tasks
+        """
+        facts_list = [PlogFacts.from_dict(plog_file, facts_dict) if facts_dict else None
+                      for _, plog_file, facts_dict in plog_tasks]
+        scan_index = [index for index, facts in enumerate(facts_list) if facts is None]
+        process_num = min(len(scan_index), os.cpu_count() or 1, MAX_PROCESS_NUM)
+        if process_num <= 1 or multiprocessing.current_process().daemon:
+            scan_facts = [RCDiagWorker.load_plog_facts(plog_tasks[index][1]) for index in scan_index]
+        else:
+            rc_logger.info(f"start {process_num} processes to load the facts of {len(scan_index)} plog files.")
+            with multiprocessing.Pool(process_num) as pool:
+                scan_facts = pool.map(RCDiagWorker.load_plog_facts, [plog_tasks[index][1] for index in scan_index])
+        for index, facts in zip(scan_index, scan_facts):
+            facts_list[index] = facts
+        return facts_list
+
     def init_plog_file(self):
+        """
+        load the facts of all the plog files concurrently, then reduce them into the rank table one by one
+        in the order of worker id and file name. So the result and the consistency checks are deterministic.
+        """
         plog_files = self.get_plog_parser_files()
-        for worker_id, plog_list in plog_files.items():
-            for plog in plog_list:
-                self.add_plog_path(worker_id, plog)
+        plog_tasks = list()
+        for worker_id in sorted(plog_files, key=int):
+            summary = self.worker_summary.get(worker_id, {})
+            for plog in sorted(plog_files.get(worker_id), key=os.path.basename):
+                plog_tasks.append((worker_id, plog, summary.get(os.path.basename(plog))))
+
+        facts_list = self.load_all_plog_facts(plog_tasks)
+        for (worker_id, plog, _), facts in zip(plog_tasks, facts_list):
+            self.add_plog_facts(worker_id, plog, facts)
 
     def get_plog_parser_files(self):
         plog_files = dict()
@@ -157,32 +177,18 @@ class RCDiagWorker:
                 raise FileNotExistError("worker dir path incorrect. Please check input path.")
             worker_id = worker_re[1]
             plog_files.update({worker_id: parse_data_dict.get('plog_parser_path', [])})
+            summary_path = parse_data_dict.get('rc_summary_path', "")
+            if summary_path:
+                with safe_open(summary_path, "r", encoding="utf-8") as file_stream:
+                    self.worker_summary.update({worker_id: json.load(file_stream)})
         if not plog_files:
             rc_logger.error("no plog file that meets the path specifications is found.")
             raise FileNotExistError("no plog file that meets the path specifications is found.")
         return plog_files
 
-    def get_timeout_param(self, plog_file):
-        """
-        get the timeout param from plog files by grep.
-        """
-        category = ['CONNECT_TIMEOUT', 'NOTIFY_TIMEOUT']
-        timeout_content = ["HCCL_CONNECT_TIMEOUT is set", "ExecTimeOut is set"]
-
-        for index, op in enumerate(timeout_content):
-            event_grep = popen_grep(regular_rule.EVENT_HCCL, file=plog_file)
-            op_grep = popen_grep(op, stdin=event_grep.stdout)
-            timeout_logs = op_grep.stdout.readlines()
-            if not timeout_logs:
-                continue
-            for timeout_log in timeout_logs:
-                timeout_re = re.search(regular_rule.TIME_OUT_RE, timeout_log)
-                if timeout_re:
-                    self.rank_table.update_timeout(category[index], int(timeout_re[1]))
-                    break
-
-    def add_plog_path(self, worker_id, plog_file):
-        self.get_timeout_param(plog_file)
+    def add_plog_facts(self, worker_id, plog_file, facts):
+        for key, timeout_value in facts.timeouts.items():
+            self.rank_table.update_timeout(key, timeout_value)
 
         pid_re = re.match(regular_rule.PLOG_PARSE_RE, os.path.basename(plog_file))
         if not pid_re:
@@ -193,7 +199,7 @@ class RCDiagWorker:
         pid = pid_re[1]
         is_error = (pid_re[2] == "1")
 
-        rank_num, rank = self.get_rank_info_from_plog(worker_id, plog_file)
+        rank_num = facts.rank_num
         if rank_num == -1:
             rc_logger.warning(f"cannot get rank info from {os.path.basename(plog_file)} file.")
             return
@@ -205,6 +211,7 @@ class RCDiagWorker:
 
         self.rank_table.rank_num = rank_num
 
+        rank = Rank(worker_id, *facts.rank_info)
         if self.rank_pid_map.get(rank) and pid != self.rank_pid_map.get(rank):
             rc_logger.error("the input file path may contain logs of more than one training session. "
                             "Please check whether the plog file is correct.")
@@ -217,7 +224,7 @@ class RCDiagWorker:
             self.rank_table.add_err_rank(rank)
         else:
             self.rank_table.add_no_err_rank(rank)
-        self.plog_map.update({rank: plog_file})
+        self.plog_map.update({rank: facts})
 
 
 def start_rc_diag_job(output_path, cfg):
@@ -227,6 +234,6 @@ def start_rc_diag_job(output_path, cfg):
 
     rc_out_file = os.path.join(output_path, "rc_diag_report.json")
     with safe_open(rc_out_file, 'w+', encoding='utf8') as file_stream:
-        file_stream.write(json.dumps(rc_result, ensure_ascii=False, indent=4))
+        dump_json(rc_result, file_stream, cfg.compact)
     safe_chmod(rc_out_file, 0o640)
     return rc_result, worker_list
@@ -1,3 +1,3 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
-from ascend_fd.pkg.rc_parse.rc_parse_job import start_rc_parse_job
+from ascend_fd.pkg.rc_parse.rc_parse_job import start_rc_parse_job, schedule_rc_parse_job
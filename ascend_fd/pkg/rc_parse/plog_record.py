@@ -0,0 +1,302 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
+import json
+import re
+import struct
+
+from ascend_fd import regular_rule
+from ascend_fd.tool import safe_open, parse_timestamp, KeywordMatcher
+from ascend_fd.status import InfoIncorrectError
+
+
+# The structured intermediate file is saved next to the plog-parser file, "plog-parser-{pid}-{0|1}.rec".
+# File layout: RECORD_MAGIC + records. Each record is a fixed head and a json payload:
+# head: payload length(uint32), category(uint8), level(uint8), flags(uint16), timestamp in epoch microseconds(int64)
+RECORD_MAGIC = b"AFDREC\x01"
+RECORD_HEAD = struct.Struct("<IBBHq")
+RECORD_SUFFIX = ".rec"
+# the per-worker summary file of the plog facts, {plog_parser_file_name: PlogFacts dict}
+RC_SUMMARY_FILE = "rc-parse-summary.json"
+
+CATEGORY_CODE = {"trace": 0, "event": 1, "error": 2}
+LEVEL_CODE = {"": 0, "DEBUG": 1, "INFO": 2, "WARNING": 3, "ERROR": 4, "EVENT": 5, "TRACE": 6}
+LEVEL_NAME = {code: name for name, code in LEVEL_CODE.items()}
+
+FLAG_TRACE_HCCL = 1
+FLAG_EVENT_HCCL = 2
+FLAG_ERROR_HCCL = 4
+FLAG_ERROR = 8
+FLAG_RANK_INFO = 16
+
+FLAG_KEYWORDS = [
+    (FLAG_TRACE_HCCL, "[TRACE] HCCL"),
+    (FLAG_EVENT_HCCL, "[EVENT] HCCL"),
+    (FLAG_ERROR_HCCL, "[ERROR] HCCL"),
+    (FLAG_ERROR, regular_rule.ERROR),
+    (FLAG_RANK_INFO, ", rank["),
+]
+TIMEOUT_KEYWORDS = {
+    "CONNECT_TIMEOUT": "HCCL_CONNECT_TIMEOUT is set",
+    "NOTIFY_TIMEOUT": "ExecTimeOut is set",
+}
+HEARTBEAT_RE_LENGTH = 3
+HCCL_REASON_MATCHER = KeywordMatcher(regular_rule.HCCL_ERR_REASON)
+DEFAULT_SERVER_AND_DEVICE = ("0.0.0.0", "-1")
+
+
+class PlogRecord:
+    """
+    The structured record of one plog-parser line with the pre-extracted fields.
+    fields may contain:
+        rank: [rank_num, rank_id, server_id, device_id]
+        timeouts: {"CONNECT_TIMEOUT": int, "NOTIFY_TIMEOUT": int}
+        heartbeat: [live_server, live_device, dead_server, dead_device]
+        err_time: the error time of the error lines, see get_err_time
+        reasons: the indexes of regular_rule.HCCL_ERR_REASON found in the HCCL error lines
+    """
+    def __init__(self, category=0, level=0, flags=0, timestamp=0, module="", fields=None):
+        self.category = category
+        self.level = level
+        self.flags = flags
+        self.timestamp = timestamp
+        self.module = module
+        self.fields = fields or dict()
+
+    def has_flag(self, flag):
+        return bool(self.flags & flag)
+
+    def to_bytes(self):
+        payload = dict(self.fields)
+        payload["module"] = self.module
+        payload = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        return RECORD_HEAD.pack(len(payload), self.category, self.level, self.flags, self.timestamp) + payload
+
+    @classmethod
+    def from_bytes(cls, head, payload):
+        _, category, level, flags, timestamp = RECORD_HEAD.unpack(head)
+        fields = json.loads(payload)
+        module = fields.pop("module", "")
+        return cls(category, level, flags, timestamp, module, fields)
+
+
+def get_err_time(err_info):
+    """
+    get the error log's time stamp and remove the separation point of millisecond.
+    The log example: "[ERROR] XXXX(**,**):20yy-mm-dd-xx:xx:xx.xxx.xxx ********************"
+    :param err_info: the stripped error log
+    :return: "20yy-mm-dd-xx:xx:xx.xxxxxx", None if the log has no valid time
+    """
+    if not parse_timestamp(err_info):
+        return None
+    index = err_info.find("):")
+    times = err_info[index + 2:index + 29]
+    return times[:-4] + times[-3:]
+
+
+def extract_record(category, line):
+    """
+    extract the structured record from one plog line.
+    :param category: the PARSE_RULE category of the line
+    :param line: the plog line
+    :return: PlogRecord
+    """
+    flags = 0
+    for flag, keyword in FLAG_KEYWORDS:
+        if keyword in line:
+            flags |= flag
+
+    level, module = "", ""
+    if line.startswith("["):
+        level, _, rest = line[1:].partition("]")
+        module = rest.strip().split("(", 1)[0]
+    fields = dict()
+
+    if flags & FLAG_RANK_INFO and flags & (FLAG_TRACE_HCCL | FLAG_ERROR_HCCL):
+        info_re = re.search(regular_rule.RANKNUM_AND_ID_RE, line)
+        if info_re:
+            ser_dev_re = re.search(regular_rule.SERVER_AND_DEVICE_RE, line)
+            server_id, device_id = (ser_dev_re[1], ser_dev_re[2]) if ser_dev_re else DEFAULT_SERVER_AND_DEVICE
+            fields["rank"] = [int(info_re[1]), info_re[2], server_id, device_id]
+
+    if flags & FLAG_EVENT_HCCL:
+        for key, keyword in TIMEOUT_KEYWORDS.items():
+            if keyword not in line:
+                continue
+            timeout_re = re.search(regular_rule.TIME_OUT_RE, line)
+            if timeout_re:
+                fields.setdefault("timeouts", {})[key] = int(timeout_re[1])
+        if regular_rule.HEARTBEAT_INFO in line:
+            # According to the regular rules, 3 sets of matching results will be found,
+            # which are record node, lost heartbeat node, and report node.
+            heartbeat_re = re.findall(regular_rule.HEARTBEAT_RANK, line)
+            if len(heartbeat_re) == HEARTBEAT_RE_LENGTH:
+                fields["heartbeat"] = [heartbeat_re[0][0], heartbeat_re[0][1], heartbeat_re[1][0], heartbeat_re[1][1]]
+
+    if flags & FLAG_ERROR:
+        err_log = line.strip()
+        err_time = get_err_time(err_log)
+        if err_time:
+            fields["err_time"] = err_time
+        reasons = sorted(HCCL_REASON_MATCHER.search_all(err_log)) if "HCCL" in err_log else None
+        if reasons:
+            fields["reasons"] = reasons
+    return PlogRecord(CATEGORY_CODE.get(category, 0), LEVEL_CODE.get(level, 0), flags,
+                      parse_timestamp(line), module, fields)
+
+
+class PlogRecordWriter:
+    """
+    Write the structured records to the intermediate file, and fold them into the plog facts at the same time.
+    """
+    def __init__(self, record_file, facts=None):
+        self.facts = facts or PlogFacts()
+        self.stream = safe_open(record_file, "ab")
+        if not self.stream.tell():
+            self.stream.write(RECORD_MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, category, lines):
+        """
+        extract and write the records of the lines.
+        :param category: the PARSE_RULE category of the lines
+        :param lines: the plog lines in bytes
+        """
+        for line in lines:
+            record = extract_record(category, line.decode("utf-8", errors="replace"))
+            self.facts.add_record(record)
+            self.stream.write(record.to_bytes())
+
+    def close(self):
+        self.stream.close()
+
+
+def read_plog_records(record_file):
+    """
+    read the structured records from the intermediate file.
+    :param record_file: the intermediate file path
+    :return: the PlogRecord generator
+    """
+    with safe_open(record_file, "rb") as file_stream:
+        if file_stream.read(len(RECORD_MAGIC)) != RECORD_MAGIC:
+            raise InfoIncorrectError(f"the {record_file} is not a plog record file.")
+        while True:
+            head = file_stream.read(RECORD_HEAD.size)
+            if len(head) < RECORD_HEAD.size:
+                return
+            payload_length = RECORD_HEAD.unpack(head)[0]
+            yield PlogRecord.from_bytes(head, file_stream.read(payload_length))
+
+
+class PlogFacts:
+    """
+    The facts of one plog-parser file which are used by the RC diag job.
+    The facts are folded from the records in file order, the same as grep the plog-parser file:
+    1. rank info: the first trace HCCL log with rank info, or the first error HCCL log if no trace log has rank info;
+    2. timeouts: the first "[EVENT] HCCL" log of each timeout parameter;
+    3. error info: the first valid error time, the error counts and the HCCL error reasons,
+       of the logs contain "ERROR";
+    4. heartbeats: the "[EVENT] HCCL" logs with "error status".
+    The error logs are not retained, neither the first log of each reason nor any sample logs, because the RC report
+    only uses the error time, the counts and the reasons. So the facts stay small however many error logs
+    there are, and they are saved in the per-worker summary file by the rc parse job.
+    """
+    FIELDS = ["trace_rank_found", "trace_rank", "error_rank", "timeouts", "first_err_time",
+              "err_count", "hccl_count", "err_reasons", "heartbeats"]
+
+    def __init__(self, plog_file=""):
+        self.plog_file = plog_file
+        self.trace_rank_found = False
+        self.trace_rank = None
+        self.error_rank = None
+        self.timeouts = dict()
+        self.first_err_time = None
+        self.err_count = 0
+        self.hccl_count = 0
+        # the sorted indexes of regular_rule.HCCL_ERR_REASON found in the HCCL error logs
+        self.err_reasons = list()
+        self.heartbeats = list()
+
+    @property
+    def rank_num(self):
+        rank = self.trace_rank if self.trace_rank_found else self.error_rank
+        return rank[0] if rank else -1
+
+    @property
+    def rank_info(self):
+        """
+        :return: (rank_id, server_id, device_id), None if the rank info is not found
+        """
+        rank = self.trace_rank if self.trace_rank_found else self.error_rank
+        return tuple(rank[1:]) if rank else None
+
+    @classmethod
+    def from_record_file(cls, plog_file, record_file):
+        facts = cls(plog_file)
+        for record in read_plog_records(record_file):
+            facts.add_record(record)
+        return facts
+
+    @classmethod
+    def from_text_file(cls, plog_file):
+        """
+        scan the plog-parser text file once in process, and fold every line into the facts.
+        The lines are split by "\n" only, the same as grep.
+        """
+        facts = cls(plog_file)
+        with safe_open(plog_file, "rb") as file_stream:
+            for line in file_stream:
+                facts.add_record(extract_record("", line.decode("utf-8", errors="replace")))
+        return facts
+
+    @classmethod
+    def from_dict(cls, plog_file, facts_dict):
+        facts = cls(plog_file)
+        for field in cls.FIELDS:
+            if field in facts_dict:
+                setattr(facts, field, facts_dict.get(field))
+        facts.heartbeats = [tuple(heartbeat) for heartbeat in facts.heartbeats]
+        return facts
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def add_record(self, record):
+        rank = record.fields.get("rank")
+        if record.has_flag(FLAG_RANK_INFO):
+            if record.has_flag(FLAG_TRACE_HCCL):
+                self.trace_rank_found = True
+                self.trace_rank = self.trace_rank or rank
+            if record.has_flag(FLAG_ERROR_HCCL):
+                self.error_rank = self.error_rank or rank
+
+        for key, timeout in record.fields.get("timeouts", {}).items():
+            self.timeouts.setdefault(key, timeout)
+
+        if record.has_flag(FLAG_ERROR):
+            self.add_err_log(record.fields.get("err_time"), record.fields.get("reasons", []),
+                             record.has_flag(FLAG_ERROR_HCCL))
+
+        heartbeat = record.fields.get("heartbeat")
+        if heartbeat:
+            self.heartbeats.append(tuple(heartbeat))
+
+    def add_err_log(self, err_time, reasons, is_hccl):
+        """
+        add one error log to the error info.
+        :param err_time: the error time of the log, None if the log has no valid time
+        :param reasons: the indexes of regular_rule.HCCL_ERR_REASON found in the log
+        :param is_hccl: whether the log is a "[ERROR] HCCL" log
+        """
+        if self.first_err_time is None:
+            # the error log without a valid time, eg. a traceback line, is counted but has no time
+            self.first_err_time = err_time
+        self.err_count += 1
+        if is_hccl:
+            self.hccl_count += 1
+        if reasons:
+            self.err_reasons = sorted(set(self.err_reasons).union(reasons))
@@ -1,102 +1,270 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. ALL rights reserved.
+import json
 import logging
 import os
 import re
 
-from ascend_fd.tool import safe_open, safe_chmod, popen_grep
-from ascend_fd.status import FileNotExistError, InnerError
+from ascend_fd.tool import safe_open, safe_chmod
+from ascend_fd.manifest import ParseManifest
+from ascend_fd.scheduler import run_tasks
+from ascend_fd.archive import open_log
+from ascend_fd.selector import select_plog_files
+from ascend_fd.status import FileNotExistError
 from ascend_fd.regular_rule import PLOG_ORIGIN_RE
+from ascend_fd.pkg.rc_parse.plog_record import PlogRecordWriter, PlogFacts, RECORD_SUFFIX, RC_SUMMARY_FILE
 
 
 rc_logger = logging.getLogger("rc_parse")
+# the plog file is filtered in binary mode, so the rules are plain keywords instead of grep regular expressions.
 PARSE_RULE = {
-    "trace": "\\[TRACE\\] HCCL",
-    "event": "\\[EVENT\\] HCCL",
-    "error": "\\[ERROR\\]"
+    "trace": b"[TRACE] HCCL",
+    "event": b"[EVENT] HCCL",
+    "error": b"[ERROR]"
 }
 CATEGORY = ["trace", "event", "error"]
-PID_DEBUG_MAX_PLOG_NUM = 3
-PID_RUN_MAX_PLOG_NUM = 2
 
 
 def start_rc_parse_job(output_path, cfg):
     """
-    start rc parse job.
+    start rc parse job on its own task scheduler.
     :param output_path: the parsed data output path
     :param cfg: parse config
     """
+    run_tasks(schedule_rc_parse_job, output_path, cfg)
+
+
+def schedule_rc_parse_job(scheduler, output_path, cfg):
+    """
+    add the rc parse tasks into the scheduler. Each PID owns its output file, so the plog files of each PID are
+    filtered by one pool task. The last task renames the output files and saves the summary and the manifest,
+    the manifest is only kept for the incremental parse.
+    :param scheduler: the TaskScheduler
+    :param output_path: the parsed data output path
+    :param cfg: parse config
+    :return: the last task
+    """
     plog_files_dict = cfg.plog_path
 
     plog_files = list()
     for plog_list in plog_files_dict.values():
-        debug_plog_heap, run_plog_heap = plog_list
-        if len(debug_plog_heap) > PID_DEBUG_MAX_PLOG_NUM:
-            debug_plog_heap = debug_plog_heap[:1] + debug_plog_heap[-2:]
-        if len(run_plog_heap) > PID_RUN_MAX_PLOG_NUM:
-            run_plog_heap = run_plog_heap[-2:]
-        plog_files.extend(debug_plog_heap)
-        plog_files.extend(run_plog_heap)
+        # select the plog files by the log time window before the failure, instead of the file name order.
+        # The first debug plog file is always kept for the rank info.
+        debug_plog_files, run_plog_files = select_plog_files(plog_list, keep_first_debug=True, logger=rc_logger)
+        plog_files.extend(debug_plog_files)
+        plog_files.extend(run_plog_files)
 
     if not plog_files:
         rc_logger.error("no plog file that meets the path specifications is found.")
         raise FileNotExistError("no plog file that meets the path specifications is found.")
 
-    pid_write_flag = dict()
-    pid_error_flag = dict()
+    pid_plog_files = dict()
     for file in plog_files:
-        file_name = os.path.basename(file)
-        pid_re = re.match(PLOG_ORIGIN_RE, file_name)
+        pid_re = re.match(PLOG_ORIGIN_RE, os.path.basename(file))
         if not pid_re:
             continue
-        pid = pid_re[1]
-        out_file = os.path.join(output_path, f"plog-parser-{pid}.log")
-
-        is_write = False
-        for cate in CATEGORY:
-            rc_logger.info(f"start grep {cate} information in file {file_name}.")
-            is_write, is_error = get_info_from_file(cate, file, out_file)
-            if is_write:
-                pid_write_flag.update({pid: out_file})
-            if is_error:
-                pid_error_flag.update({pid: pid_error_flag.get(pid, 0) + 1})
-        if is_write:
-            rc_logger.info(f"the {file_name} parsing result is saved in dir {os.path.basename(output_path)}.")
-        else:
-            rc_logger.info(f"the {file_name} does not have effective results.")
+        pid_plog_files.setdefault(pid_re[1], []).append(file)
+
+    manifest = ParseManifest(output_path, "rc_parse") if cfg.incremental else None
+    offsets = {file: manifest.get_offset(file) for file in plog_files} if manifest else dict()
+    summary = load_rc_summary(output_path)
+
+    # each pool task only gets the offsets and the summary entries of its own PID
+    pid_tasks = [scheduler.add_task(f"rc_parse pid {pid}", parse_pid_plog_files,
+                                    (output_path, pid, files, {file: offsets.get(file, 0) for file in files},
+                                     cfg.incremental, get_pid_summary(summary, pid)))
+                 for pid, files in pid_plog_files.items()]
+    return scheduler.add_task("rc_parse save", save_rc_parse_results, (output_path, pid_tasks, manifest, summary),
+                              deps=pid_tasks, local=True)
+
+
+def save_rc_parse_results(output_path, pid_tasks, manifest, summary):
+    """
+    rename the output files of the PIDs by their error flag, then save the summary and the manifest.
+    :param output_path: the parsed data output path
+    :param pid_tasks: the done tasks of parse_pid_plog_files
+    :param manifest: the rc parse manifest, None if the parse is not incremental
+    :param summary: the summary of the plog facts parsed before, {plog_parser_file_name: PlogFacts dict}
+    """
+    pid_write_flag = dict()
+    pid_error_flag = dict()
+    pid_facts = dict()
+    for task in pid_tasks:
+        pid, out_file, error_num, end_offsets, facts = task.get()
+        if out_file:
+            pid_write_flag.update({pid: out_file})
+        if error_num:
+            pid_error_flag.update({pid: error_num})
+        if facts:
+            pid_facts.update({pid: facts})
+        for file, end_offset in end_offsets.items():
+            if manifest is not None:
+                manifest.update(file, end_offset)
 
     for key, src_file in pid_write_flag.items():
-        if pid_error_flag.get(key, 0) > 0:
-            dst_file = os.path.join(output_path, f"plog-parser-{key}-1.log")
-        else:
-            dst_file = os.path.join(output_path, f"plog-parser-{key}-0.log")
+        error_flag = 1 if pid_error_flag.get(key, 0) > 0 else 0
+        dst_file = os.path.join(output_path, f"plog-parser-{key}-{error_flag}.log")
+        for flag in ("0", "1"):
+            summary.pop(f"plog-parser-{key}-{flag}.log", None)
+        if key in pid_facts:
+            summary.update({os.path.basename(dst_file): pid_facts.get(key)})
         os.rename(src_file, dst_file)
         safe_chmod(dst_file, 0o640)
+        # the structured records of the same lines, which are loaded by the rc diag job without text scanning.
+        if os.path.exists(get_record_file(src_file)):
+            dst_record_file = get_record_file(dst_file)
+            os.rename(get_record_file(src_file), dst_record_file)
+            safe_chmod(dst_record_file, 0o640)
+    save_rc_summary(output_path, summary)
+    if manifest is not None:
+        manifest.save()
     rc_logger.info("logs are printed and copied to the specified path.")
 
 
-def get_info_from_file(cate, in_file, out_file):
+def get_pid_summary(summary, pid):
+    """
+    :param summary: the summary dict, {plog_parser_file_name: PlogFacts dict}
+    :param pid: the PID
+    :return: the summary entries of the parsed results of the PID
+    """
+    pid_summary = dict()
+    for error_flag in ("0", "1"):
+        file_name = f"plog-parser-{pid}-{error_flag}.log"
+        if file_name in summary:
+            pid_summary[file_name] = summary.get(file_name)
+    return pid_summary
+
+
+def load_rc_summary(output_path):
+    """
+    load the per-worker summary of the plog facts, which exists if the worker dir is parsed incrementally.
+    :param output_path: the parsed data output path
+    :return: the summary dict, {plog_parser_file_name: PlogFacts dict}
+    """
+    summary_file = os.path.join(output_path, RC_SUMMARY_FILE)
+    if not os.path.isfile(summary_file):
+        return dict()
+    with safe_open(summary_file, "r", encoding="utf-8") as file_stream:
+        return json.load(file_stream)
+
+
+def save_rc_summary(output_path, summary):
+    """
+    save the per-worker summary of the plog facts. The rc diag job merges the summaries instead of scanning the files.
+    :param output_path: the parsed data output path
+    :param summary: the summary dict, {plog_parser_file_name: PlogFacts dict}
+    """
+    summary_file = os.path.join(output_path, RC_SUMMARY_FILE)
+    with safe_open(summary_file, "w", encoding="utf-8") as file_stream:
+        json.dump(summary, file_stream, ensure_ascii=False)
+    safe_chmod(summary_file, 0o640)
+
+
+def get_record_file(plog_parser_file):
+    """
+    get the structured record file path of the plog-parser file.
+    :param plog_parser_file: the plog-parser file path, "plog-parser-{pid}[-{error_flag}].log"
+    :return: the record file path, "plog-parser-{pid}[-{error_flag}].rec"
+    """
+    return f"{os.path.splitext(plog_parser_file)[0]}{RECORD_SUFFIX}"
+
+
+def parse_pid_plog_files(output_path, pid, files, offsets, complete_lines=False, summary=None):
+    """
+    filter all the plog files of one PID into its own output file and record file.
+    If the PID already has a parsed result (incremental parse), the new lines are appended to it.
+    :param output_path: the parsed data output path
+    :param pid: the PID
+    :param files: the plog files of the PID
+    :param offsets: the offset from which each plog file is parsed, {plog_file: offset}
+    :param complete_lines: whether only the complete lines are parsed
+    :param summary: the summary of the plog facts of the PID parsed before, see get_pid_summary
+    :return: (pid, out_file, error_num, {plog_file: end_offset}, facts dict),
+        out_file is empty if no effective result is found, facts is None if the record file is not written
     """
-    use grep to filter the corresponding content from origin plog file.
-    :param cate: grep rule
+    out_file = os.path.join(output_path, f"plog-parser-{pid}.log")
+    record_file = get_record_file(out_file)
+    write_num = 0
+    error_num = 0
+    # the parsed result of an earlier version has no record file, then the record file is not written,
+    # otherwise it would only contain the new lines. The rc diag job falls back to scan the text file.
+    is_record = True
+    facts = PlogFacts()
+    for error_flag in ("0", "1"):
+        parsed_file = os.path.join(output_path, f"plog-parser-{pid}-{error_flag}.log")
+        if os.path.exists(parsed_file):
+            os.rename(parsed_file, out_file)
+            write_num += 1
+            error_num += int(error_flag)
+            if os.path.exists(get_record_file(parsed_file)):
+                os.rename(get_record_file(parsed_file), record_file)
+                facts_dict = (summary or {}).get(os.path.basename(parsed_file))
+                facts = PlogFacts.from_dict(out_file, facts_dict) if facts_dict \
+                    else PlogFacts.from_record_file(out_file, record_file)
+            else:
+                is_record = False
+
+    end_offsets = dict()
+    record_writer = PlogRecordWriter(record_file, facts) if is_record else None
+    try:
+        with safe_open(out_file, "ab") as out_stream:
+            for file in files:
+                file_name = os.path.basename(file)
+                rc_logger.info(f"start filter information in file {file_name}.")
+                is_write, is_error, end_offset = filter_plog_file(file, out_stream, offsets.get(file, 0),
+                                                                  complete_lines, record_writer)
+                end_offsets.update({file: end_offset})
+                if is_write:
+                    write_num += 1
+                    rc_logger.info(f"the {file_name} parsing result is saved in dir {os.path.basename(output_path)}.")
+                else:
+                    rc_logger.info(f"the {file_name} does not have effective results.")
+                if is_error:
+                    error_num += 1
+    finally:
+        if record_writer:
+            record_writer.close()
+    if not write_num:
+        os.remove(out_file)
+        if record_writer:
+            os.remove(record_file)
+        return pid, "", error_num, end_offsets, None
+    return pid, out_file, error_num, end_offsets, facts.to_dict() if record_writer else None
+
+
+def filter_plog_file(in_file, out_stream, offset=0, complete_lines=False, record_writer=None):
+    """
+    read the origin plog file once and classify each line against all the PARSE_RULE categories together.
+    The matched lines are written to the output stream grouped in CATEGORY order, the same as grep one by one.
     :param in_file: the filtered file
-    :param out_file: the output file
+    :param out_stream: the output file stream opened in binary mode
+    :param offset: the offset from which the file is filtered
+    :param complete_lines: whether to stop at the last complete line, the rest is left for the next parse
+    :param record_writer: the PlogRecordWriter to save the structured records of the written lines
+    :return: (is_write, is_error, end_offset)
     """
+    matched_lines = {cate: [] for cate in CATEGORY}
+    rules = [(PARSE_RULE.get(cate), matched_lines.get(cate)) for cate in CATEGORY]
+    end_offset = offset
+    with open_log(in_file) as in_stream:
+        in_stream.seek(offset)
+        for line in in_stream:
+            if complete_lines and not line.endswith(b"\n"):
+                break
+            end_offset += len(line)
+            for rule, lines in rules:
+                if rule in line:
+                    lines.append(line)
+
     is_write = False
-    is_error = False
-    rule = PARSE_RULE.get(cate, None)
-    if not rule:
-        rc_logger.error(f"{cate} doesn't exist in PARSE_RULE")
-        raise InnerError(f"{cate} doesn't exist in PARSE_RULE")
-    grep = popen_grep(rule, file=in_file)
-    logs = grep.stdout.readlines()
-    if not logs:
-        return is_write, is_error
-    for line in logs:
+    for cate in CATEGORY:
+        lines = matched_lines.get(cate)
+        if not lines:
+            continue
         is_write = True
-        with safe_open(out_file, "a+") as out:
-            out.write(line)
-    if cate == "error":
-        is_error = True
-
-    return is_write, is_error
+        if not lines[-1].endswith(b"\n"):
+            lines[-1] += b"\n"
+        out_stream.writelines(lines)
+        if record_writer:
+            record_writer.write(cate, lines)
+    return is_write, bool(matched_lines.get("error")), end_offset
@@ -8,7 +8,7 @@ MODEL_ARTS_WORKER_RE = r"modelarts-job.*?-worker-(\d+).log$"
 
 # Rc job
 # parse
-PLOG_ORIGIN_RE = r"plog-(\d+)_(\d+).log$"
+PLOG_ORIGIN_RE = r"plog-(\d+)_(\d+).log(\.gz)?$"
 # diag
 PLOG_PARSE_RE = r"plog-parser-(\d+)-(\d+).log$"
 RANKNUM_AND_ID_RE = r"rankNum\[(\d+)\], rank\[(\d+)\]"
@@ -22,6 +22,8 @@ ERROR_HCCP = r"\[ERROR\] HCCP"
 EVENT_HCCL = r"\[EVENT\] HCCL"
 HEARTBEAT_INFO = "error status"
 HEARTBEAT_RANK = r"rank \[\[(\d+.\d+.\d+.\d+)]\[(\d+)\]\]"
+HCCL_ERR_REASON = ["get socket timeout", "connected p2p timeout", "taskType[Notify Wait]",
+                   "taskType[Reduce Inline]", "taskType[Memcpy]", "Open TsdClient failed"]
 
 
 # Kg job
@@ -0,0 +1,171 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import os
+import queue
+import logging
+import multiprocessing
+from collections import deque
+
+scheduler_logger = logging.getLogger("scheduler")
+MAX_PROCESS_NUM = 32
+
+
+class Task:
+    """
+    One node of the task DAG. The task runs after all its dependencies are done. A pool task runs on the worker
+    pool, so its function and args must be picklable. A local task runs in the main process, it usually merges
+    the results of its dependencies, which are read by their get().
+    """
+    def __init__(self, name, func, args=(), deps=(), local=False):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.deps = list(deps)
+        self.local = local
+        self.dependents = list()
+        self.waiting = 0
+        self.done = False
+        self.result = None
+        self.error = None
+
+    def __repr__(self):
+        return f"Task({self.name})"
+
+    @classmethod
+    def failed(cls, name, error):
+        """
+        :return: the done task of the error, which is used when the tasks of a job cannot be added
+        """
+        task = cls(name, None)
+        task.done = True
+        task.error = error
+        return task
+
+    def get(self):
+        """
+        :return: the result of the done task, the error of the task or its failed dependency is raised
+        """
+        if not self.done:
+            raise RuntimeError(f"the task {self.name} is not done.")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TaskScheduler:
+    """
+    Run the task DAG of all the parse jobs on one process pool, so the RC and KG tasks share the cores
+    for the whole parse. The ready pool tasks are submitted at once, the local tasks run in the main process
+    when their dependencies are done. If a task fails, its dependents fail with the same error without running.
+    The pool is not used when there is at most one process or the current process is a daemon,
+    which cannot have children, then all the tasks run in the main process in the order they are added.
+    """
+    def __init__(self, process_num=None):
+        self.process_num = process_num or min(os.cpu_count() or 1, MAX_PROCESS_NUM)
+        self.tasks = list()
+        self.pool = None
+        self._done_queue = queue.SimpleQueue()
+
+    def add_task(self, name, func, args=(), deps=(), local=False):
+        """
+        :param name: the task name, which is logged when the task fails
+        :param func: the task function
+        :param args: the args of the function
+        :param deps: the tasks which must be done before the task
+        :param local: whether the task runs in the main process
+        :return: the task
+        """
+        task = Task(name, func, args, deps, local)
+        self.tasks.append(task)
+        return task
+
+    def run(self):
+        """
+        run all the added tasks until they are done. The tasks are added after their dependencies,
+        so the adding order is a topological order of the DAG.
+        """
+        pending = [task for task in self.tasks if not task.done]
+        self.tasks = list()
+        process_num = min(self.process_num, sum(not task.local for task in pending))
+        if process_num <= 1 or multiprocessing.current_process().daemon:
+            for task in pending:
+                self._finish(task, *self._call(task))
+            return
+
+        ready = deque()
+        for task in pending:
+            task.waiting = 0
+            for dep in task.deps:
+                if not dep.done:
+                    dep.dependents.append(task)
+                    task.waiting += 1
+            if not task.waiting:
+                ready.append(task)
+        scheduler_logger.info(f"start {process_num} processes to run {len(pending)} tasks.")
+        with multiprocessing.Pool(process_num) as pool:
+            self.pool = pool
+            try:
+                self._run_pool(ready, len(pending))
+            finally:
+                self.pool = None
+
+    def _run_pool(self, ready, task_num):
+        done_num = 0
+        while done_num < task_num:
+            while ready:
+                task = ready.popleft()
+                if task.local or self._failed_dep(task):
+                    ready.extend(self._finish(task, *self._call(task)))
+                    done_num += 1
+                    continue
+                self.pool.apply_async(task.func, task.args,
+                                      callback=lambda result, _task=task: self._done_queue.put((_task, result, None)),
+                                      error_callback=lambda err, _task=task: self._done_queue.put((_task, None, err)))
+            if done_num < task_num:
+                ready.extend(self._finish(*self._done_queue.get()))
+                done_num += 1
+
+    @staticmethod
+    def _failed_dep(task):
+        return next((dep for dep in task.deps if dep.error is not None), None)
+
+    def _call(self, task):
+        """
+        :return: (result, error) of the task, the task is not run if one of its dependencies failed
+        """
+        failed_dep = self._failed_dep(task)
+        if failed_dep is not None:
+            return None, failed_dep.error
+        try:
+            return task.func(*task.args), None
+        except Exception as err:
+            return None, err
+
+    def _finish(self, task, result, error):
+        """
+        :return: the dependents which are ready after the task is done
+        """
+        task.done = True
+        task.result = result
+        task.error = error
+        if error is not None and self._failed_dep(task) is None:
+            scheduler_logger.error(f"the task {task.name} failed. {error}")
+        released = list()
+        for dependent in task.dependents:
+            dependent.waiting -= 1
+            if not dependent.waiting:
+                released.append(dependent)
+        task.dependents = list()
+        return released
+
+
+def run_tasks(schedule, *args):
+    """
+    add the tasks of one job into its own scheduler and run them.
+    :param schedule: the function which adds the tasks of the job, schedule(scheduler, *args) returns the last task
+    :return: the result of the last task
+    """
+    scheduler = TaskScheduler()
+    task = schedule(scheduler, *args)
+    scheduler.run()
+    return task.get()
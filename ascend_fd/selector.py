@@ -0,0 +1,113 @@
+# -*- coding:utf-8 -*-
+# Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
+import os
+import logging
+from functools import lru_cache
+
+from ascend_fd.tool import parse_timestamp
+from ascend_fd.archive import open_log, split_path, is_gzip_log
+
+
+selector_logger = logging.getLogger("selector")
+
+HEAD_READ_SIZE = 4 * 1024
+TAIL_READ_SIZE = 64 * 1024
+TAIL_MAX_READ_SIZE = 1024 * 1024
+# the window before the failure time, in microseconds. It covers the default NOTIFY_TIMEOUT (600s),
+# so the error lines reported by the ranks which wait for the failed rank are kept too.
+PLOG_TIME_WINDOW = 15 * 60 * 1000000
+# the max plog files of one PID selected in the window, the newest ones are kept when the logs rotate fast
+PID_MAX_DEBUG_PLOG_NUM = 8
+PID_MAX_RUN_PLOG_NUM = 4
+# the max plog files whose time range is cached
+MAX_CACHED_PLOG_NUM = 4096
+
+
+def get_plog_time_range(plog_file):
+    """
+    get the first and last log time of the plog file. Only the file head and tail are read.
+    The archive member and gzip file are read from the head only, because seeking back to their tail
+    decompresses the stream from the start.
+    The result is cached, because the rc and kg parse jobs select the same plog files. The cache is keyed by
+    the size and mtime of the file (or its archive) too, so the file which has grown or rotated is read again.
+    :param plog_file: the plog file path
+    :return: (first_time, last_time) in epoch microseconds, 0 if the time is not found
+    """
+    file_info = os.stat(split_path(plog_file)[0])
+    return _read_plog_time_range(plog_file, file_info.st_size, file_info.st_mtime_ns)
+
+
+@lru_cache(maxsize=MAX_CACHED_PLOG_NUM)
+def _read_plog_time_range(plog_file, file_size, _mtime_ns):
+    """
+    :param file_size: the size of the file, or of its archive which is not used
+    :param _mtime_ns: the mtime of the file or its archive, which is only a part of the cache key
+    """
+    with open_log(plog_file) as file_stream:
+        first_time = _find_timestamp(file_stream.read(HEAD_READ_SIZE).splitlines())
+        if split_path(plog_file)[1] or is_gzip_log(plog_file):
+            return first_time, 0
+
+        last_time = 0
+        read_size = TAIL_READ_SIZE
+        while not last_time:
+            offset = max(file_size - read_size, 0)
+            file_stream.seek(offset)
+            lines = file_stream.read(file_size - offset).splitlines()
+            if offset:
+                # the first line may be incomplete
+                lines = lines[1:]
+            last_time = _find_timestamp(reversed(lines))
+            if not offset or read_size >= TAIL_MAX_READ_SIZE:
+                break
+            read_size *= 2
+    return first_time, last_time
+
+
+def select_plog_files(plog_list, keep_first_debug=True, logger=selector_logger):
+    """
+    select the plog files of one PID which overlap the window before the failure time.
+    The failure time is the last log time of the PID, because the process stops logging after the failure.
+    If the last time of a file cannot be read, the file is kept, and its first time is used as the lower bound
+    of the failure time. If no time can be read, the plog files are selected by the file name order instead.
+    At most PID_MAX_DEBUG_PLOG_NUM debug and PID_MAX_RUN_PLOG_NUM run files in the window are selected,
+    the newest ones in the file name order.
+    :param plog_list: [debug plog files, run plog files] of the PID
+    :param keep_first_debug: whether to keep the first debug plog file, which holds the rank info
+    :param logger: the job logger
+    :return: [selected debug plog files, selected run plog files], each in the file name order
+    """
+    debug_files, run_files = sorted(plog_list[0]), sorted(plog_list[1])
+    time_ranges = dict()
+    for plog_file in debug_files + run_files:
+        try:
+            time_ranges[plog_file] = get_plog_time_range(plog_file)
+        except (OSError, EOFError, ValueError) as err:
+            logger.warning(f"cannot read the log time of {plog_file}: {err}")
+            time_ranges[plog_file] = (0, 0)
+
+    failure_time = max((max(time_range) for time_range in time_ranges.values()), default=0)
+    if not failure_time:
+        logger.info("cannot read the log time of the plog files, select them by the file name order.")
+        return [debug_files[:1] + debug_files[1:][-2:] if keep_first_debug else debug_files[-2:], run_files[-2:]]
+
+    window_start = failure_time - PLOG_TIME_WINDOW
+
+    def in_window(plog_file):
+        _, last_time = time_ranges.get(plog_file)
+        # the file overlaps the window if it is still logging after the window start
+        return not last_time or last_time >= window_start
+
+    selected_debug = [plog_file for plog_file in debug_files if in_window(plog_file)][-PID_MAX_DEBUG_PLOG_NUM:]
+    if keep_first_debug and debug_files and debug_files[0] not in selected_debug:
+        selected_debug.insert(0, debug_files[0])
+    selected_run = [plog_file for plog_file in run_files if in_window(plog_file)][-PID_MAX_RUN_PLOG_NUM:]
+    return [selected_debug, selected_run]
+
+
+def _find_timestamp(lines):
+    for line in lines:
+        timestamp = parse_timestamp(line.decode("utf-8", errors="replace"))
+        if timestamp:
+            return timestamp
+    return 0
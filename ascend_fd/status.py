@@ -53,6 +53,11 @@ class ParamError(BaseError):
     description = "ParamError."
 
 
+class TaskTimeoutError(BaseError):
+    code = 509
+    description = "Task timeout."
+
+
 class SuccessRet:
     code = 200
     description = "Successful operation."
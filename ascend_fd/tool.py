@@ -1,13 +1,20 @@
 # -*- coding:utf-8 -*-
 # Copyright(C) Huawei Technologies Co.,Ltd. 2023. All rights reserved.
 import os
-import subprocess
+import re
+import json
+import types
+from datetime import datetime, timezone
 
 from ascend_fd.status import FileNotExistError, FileOpenError
 
 VERSION_FILE_READ_LIMIT = 100
 MAX_SIZE = 512 * 1024 * 1024
 MB_SHIFT = 20
+# the dir of the compiled rule packs and other caches, the cache is only enabled when the environment variable is set
+CACHE_DIR_ENV = "ASCEND_FD_CACHE_DIR"
+JSON_INDENT = 4
+COMPACT_SEPARATORS = (',', ':')
 
 
 def path_check(input_path, output_path):
@@ -55,20 +62,112 @@ def safe_chmod(file, mode):
         os.fchmod(file_stream.fileno(), mode)
 
 
-def popen_grep(rule, file=None, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE):
+def get_cache_dir():
     """
-    use subprocess.popen to perform grep operations. file and stdin param must exist one.
-    :param rule: grep rule
-    :param file: the file
-    :param stdin: the popen stdin
-    :param stdout: the popen stdout, default PIPE
-    :param stderr: the popen stderr, default PIPE
-    :return: popen instance
+    get the cache dir set by ASCEND_FD_CACHE_DIR, it is created if it does not exist.
+    :return: the cache dir path, None if the cache is not enabled or the dir cannot be created
     """
-    cmd_list = ["/usr/bin/grep", rule]
-    if file:
-        with safe_open(file) as file_stream:
-            return subprocess.Popen(cmd_list, shell=False, stdin=file_stream,
-                                    stdout=stdout, stderr=stderr, encoding="utf-8")
-    return subprocess.Popen(cmd_list, shell=False, stdin=stdin,
-                            stdout=stdout, stderr=stderr, encoding="utf-8")
+    cache_dir = os.getenv(CACHE_DIR_ENV)
+    if not cache_dir:
+        return None
+    try:
+        os.makedirs(cache_dir, 0o700, exist_ok=True)
+    except OSError:
+        return None
+    return cache_dir
+
+
+def dump_json(obj, file_stream, compact=False, separators=None, stream_depth=2):
+    """
+    write the obj to the file stream as json, the same text as json.dumps. The dicts, lists and generators
+    in the top stream_depth levels are written item by item, and each item below is dumped alone,
+    so the whole json text is never built in memory. The generators are written as lists.
+    :param obj: the json obj
+    :param file_stream: the text file stream
+    :param compact: whether to write the json without indent
+    :param separators: the (item separator, key separator), default as json.dumps
+    :param stream_depth: the levels which are written item by item
+    """
+    indent = None if compact else JSON_INDENT
+    if separators is None:
+        separators = COMPACT_SEPARATORS if compact else (',', ': ')
+    _write_json(obj, file_stream, indent, separators, 0, stream_depth)
+
+
+def _write_json(obj, file_stream, indent, separators, level, stream_depth):
+    is_dict = isinstance(obj, dict)
+    if level >= stream_depth or not (is_dict or isinstance(obj, (list, tuple, types.GeneratorType))):
+        text = json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators)
+        file_stream.write(text.replace("\n", "\n" + " " * indent * level) if indent and level else text)
+        return
+
+    item_separator, key_separator = separators
+    if indent is None:
+        item_prefix = end_prefix = ""
+    else:
+        item_prefix = "\n" + " " * indent * (level + 1)
+        end_prefix = "\n" + " " * indent * level
+    file_stream.write("{" if is_dict else "[")
+    is_empty = True
+    for item in (obj.items() if is_dict else obj):
+        file_stream.write(item_prefix if is_empty else item_separator + item_prefix)
+        is_empty = False
+        if is_dict:
+            key, item = item
+            file_stream.write(json.dumps(key, ensure_ascii=False) + key_separator)
+        _write_json(item, file_stream, indent, separators, level + 1, stream_depth)
+    if not is_empty:
+        file_stream.write(end_prefix)
+    file_stream.write("}" if is_dict else "]")
+
+
+def parse_timestamp(line):
+    """
+    parse the log time to epoch microseconds. The log time is regarded as UTC.
+    Log format, eg. "[ERROR] HCCL(10972,python3):2023-01-31-03:00:11.356.298 ..."
+    :param line: the plog line
+    :return: the epoch microseconds, 0 if the time cannot be parsed
+    """
+    index = line.find("):")
+    if index == -1:
+        return 0
+    times = line[index + 2:index + 29]
+    try:
+        log_time = datetime(int(times[0:4]), int(times[5:7]), int(times[8:10]), int(times[11:13]),
+                            int(times[14:16]), int(times[17:19]), int(times[20:23] + times[24:27]),
+                            tzinfo=timezone.utc)
+    except ValueError:
+        return 0
+    return int(log_time.timestamp()) * 1000000 + log_time.microsecond
+
+
+class KeywordMatcher:
+    """
+    Find which of the keywords occur in a text by one pass of a combined regular expression,
+    instead of one substring test for each keyword.
+    The lookahead alternation matches at every position, so overlapping keywords are all found. At one position
+    only the longest keyword matches, so the keywords which are its prefixes are added by the prefix closure.
+    """
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        ordered_keywords = sorted(set(self.keywords), key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in ordered_keywords) + "))") \
+            if ordered_keywords else None
+        self.closure = {
+            keyword: frozenset(index for index, other in enumerate(self.keywords) if keyword.startswith(other))
+            for keyword in ordered_keywords
+        }
+
+    def search_all(self, text):
+        """
+        :param text: the text
+        :return: the set of the indexes of the keywords found in the text
+        """
+        found = set()
+        if not self.pattern:
+            return found
+        for match in self.pattern.finditer(text):
+            found.update(self.closure.get(match[1]))
+            if len(found) == len(self.keywords):
+                break
+        return found
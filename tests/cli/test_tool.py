@@ -1,6 +1,8 @@
 # coding: UTF-8
 # Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import io
 import os
+import json
 import shutil
 import unittest
 from ascend_fd import tool
@@ -48,3 +50,45 @@ class PathCheckTestCase(unittest.TestCase):
             shutil.rmtree(self.input_path)
         if os.path.exists(self.output_path):
             shutil.rmtree(self.output_path)
+
+
+class KeywordMatcherTestCase(unittest.TestCase):
+
+    def test_search_all(self):
+        matcher = tool.KeywordMatcher(["socket timeout", "get socket timeout", "taskType[Memcpy]", "get"])
+        self.assertEqual({0, 1, 3}, matcher.search_all("[ERROR] HCCL: get socket timeout"))
+        self.assertEqual({2}, matcher.search_all("taskType[Memcpy] failed"))
+        self.assertEqual(set(), matcher.search_all("no keyword"))
+
+    def test_empty_keywords(self):
+        self.assertEqual(set(), tool.KeywordMatcher([]).search_all("text"))
+
+
+class DumpJsonTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data = {
+            "NPU_list": [{"npu_id": "NPU1-NPU8", "name": "NPU"}],
+            "Empty_list": [],
+            "result": {"root_cause": "故障", "ranks": [[1, 2], []], "detail": {}},
+            "times": 1,
+        }
+
+    def dump(self, obj, **kwargs):
+        file_stream = io.StringIO()
+        tool.dump_json(obj, file_stream, **kwargs)
+        return file_stream.getvalue()
+
+    def test_same_as_json_dumps(self):
+        for stream_depth in range(4):
+            self.assertEqual(json.dumps(self.data, ensure_ascii=False, indent=4),
+                             self.dump(self.data, stream_depth=stream_depth))
+            self.assertEqual(json.dumps(self.data, ensure_ascii=False, indent=4, separators=(',', ':')),
+                             self.dump(self.data, separators=(',', ':'), stream_depth=stream_depth))
+            self.assertEqual(json.dumps(self.data, ensure_ascii=False, separators=(',', ':')),
+                             self.dump(self.data, compact=True, stream_depth=stream_depth))
+
+    def test_generator(self):
+        sections = {key: (item for item in value) if isinstance(value, list) else value
+                    for key, value in self.data.items()}
+        self.assertEqual(json.dumps(self.data, ensure_ascii=False, indent=4), self.dump(sections))
@@ -0,0 +1,24 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import unittest
+
+from ascend_fd.pkg.rc_diag.heartbeat_graph import HeartbeatGraph
+
+
+class HeartbeatGraphTestCase(unittest.TestCase):
+
+    def test_dead_ranks(self):
+        graph = HeartbeatGraph()
+        for live_rank, dead_rank in [("r0", "r1"), ("r2", "r1"), ("r3", "r4"), ("r4", "r3"), ("r5", "r0")]:
+            graph.add_edge(live_rank, dead_rank)
+        self.assertEqual(5, graph.reporter_num())
+        self.assertEqual(["r1", "r3", "r4"], graph.dead_ranks())
+
+    def test_long_chain(self):
+        graph = HeartbeatGraph()
+        rank_num = 20000
+        for rank_id in range(rank_num - 1):
+            graph.add_edge(rank_id, rank_id + 1)
+        _, component_num = graph.strongly_connected_components()
+        self.assertEqual(rank_num, component_num)
+        self.assertEqual([rank_num - 1], graph.dead_ranks())
@@ -0,0 +1,177 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import sys
+import json
+import time
+import shutil
+import unittest
+import subprocess
+from unittest import mock
+
+from ascend_fd.pkg.kg_diag import kg_diag_job
+from ascend_fd.pkg.kg_diag.result_cache import KgResultCache
+from ascend_fd.status import InfoNotFoundError
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+# the stub engine prints the root cause in the input json of each input. The batch engine names the input of
+# each result and drops the "BatchFailed" input of a batch, the single engine only handles the first input.
+# The engine exits with an error for the "Failed" input, and hangs for the "Hang" input.
+STUB_ENGINE = """
+import json
+import sys
+import tarfile
+import time
+
+if sys.argv[1] == "failed":
+    sys.exit("load knowledge repository failed")
+input_zips = sys.argv[3:4] if sys.argv[1] == "single" else sys.argv[3:]
+for input_zip in input_zips:
+    with tarfile.open(input_zip) as tar_file:
+        root_cause = json.load(tar_file.extractfile("ascend-kg-parser.json")).get("root_cause")
+    if root_cause == "Failed":
+        sys.exit("analyze failed")
+    if root_cause == "Hang":
+        time.sleep(60)
+    if root_cause == "BatchFailed" and len(input_zips) > 1:
+        continue
+    result = {"analyze_success": True, "engine_ver": "v1.0.0", "root_cause_en_US": root_cause,
+              "rlt_graph": json.dumps({"root": root_cause})}
+    if sys.argv[1] == "batch":
+        result["input"] = input_zip
+    print("load schema takes 1 ms")
+    print(json.dumps(result))
+"""
+
+
+class KgDiagBatchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "kg_diag_dir")
+        self.write_workers({"0": "RuntimeTaskException_Alarm", "1": "GERunModelFail_Alarm",
+                            "2": "NotifyWaitExecuteFailed_Alarm"})
+        self.stub_engine = os.path.join(self.temp_dir, "stub_engine.py")
+        with open(self.stub_engine, "w") as file_stream:
+            file_stream.write(STUB_ENGINE)
+
+    def write_workers(self, root_causes):
+        self.root_causes = root_causes
+        self.parsed_data = dict()
+        for worker_id, root_cause in self.root_causes.items():
+            worker_dir = os.path.join(self.temp_dir, f"worker-{worker_id}")
+            os.makedirs(worker_dir, exist_ok=True)
+            kg_parse_path = os.path.join(worker_dir, "ascend-kg-parser.json")
+            with open(kg_parse_path, "w") as file_stream:
+                json.dump({"root_cause": root_cause}, file_stream)
+            self.parsed_data[f"worker-{worker_id}"] = {"kg_parse_path": kg_parse_path}
+
+    def diag(self, mode, result_cache=None):
+        engine_cmd = [sys.executable, self.stub_engine, mode, "knowledge-repository"]
+        batch_env = {kg_diag_job.KG_BATCH_ENV: "1" if mode == "batch" else ""}
+        with mock.patch.object(kg_diag_job, "get_kg_engine_cmd", return_value=engine_cmd), \
+                mock.patch.dict(os.environ, batch_env), mock.patch("subprocess.Popen", wraps=subprocess.Popen) as run:
+            results = kg_diag_job.batch_kg_diag_job(list(self.root_causes), self.parsed_data, result_cache)
+        return results, run.call_count
+
+    def check_results(self, results):
+        self.assertEqual([f"worker-{worker_id}" for worker_id in self.root_causes],
+                         [list(result_json)[0] for result_json, _ in results])
+        for (result_json, relation_json), (worker_id, root_cause) in zip(results, self.root_causes.items()):
+            self.assertEqual(root_cause, result_json.get(f"worker-{worker_id}").get("root_cause_en_US"))
+            self.assertEqual({"root": root_cause}, relation_json.get(f"worker-{worker_id}").get("rlt_graph"))
+        for worker_id in self.root_causes:
+            self.assertFalse(os.path.exists(os.path.join(self.temp_dir, f"worker-{worker_id}",
+                                                         "ascend-kg-parser.tar.gz")))
+
+    def test_batch(self):
+        results, engine_num = self.diag("batch")
+        self.assertEqual(1, engine_num)
+        self.check_results(results)
+
+    def test_single_input_engine(self):
+        # the batch mode is not enabled, so each worker is diagnosed alone without a batch run
+        results, engine_num = self.diag("single")
+        self.assertEqual(len(self.root_causes), engine_num)
+        self.check_results(results)
+
+    def test_batch_not_supported(self):
+        # the unnamed result of the batch is not matched, so all the workers are diagnosed alone
+        with mock.patch.object(kg_diag_job, "kg_engine_batch_enabled", return_value=True):
+            results, engine_num = self.diag("single")
+        self.assertEqual(len(self.root_causes) + 1, engine_num)
+        self.check_results(results)
+
+    def test_batch_input_failed(self):
+        self.write_workers({"0": "GERunModelFail_Alarm", "1": "BatchFailed", "2": "NotifyWaitExecuteFailed_Alarm"})
+        results, engine_num = self.diag("batch")
+        self.assertEqual(2, engine_num)
+        self.check_results(results)
+
+    def test_engine_failed(self):
+        self.assertRaises(InfoNotFoundError, self.diag, "failed")
+
+    def test_engine_timeout(self):
+        self.write_workers({"0": "GERunModelFail_Alarm", "1": "Hang", "2": "NotifyWaitExecuteFailed_Alarm"})
+        with mock.patch.object(kg_diag_job, "KG_DIAG_TIMEOUT", 3):
+            results, engine_num = self.diag("single")
+        self.assertEqual(3, engine_num)
+        self.assertEqual([True, False, True],
+                         [list(result_json.values())[0].get("analyze_success") for result_json, _ in results])
+        self.assertIn("3 seconds", results[1][0].get("worker-1").get("error_info"))
+
+    def test_batch_timeout(self):
+        # the deadline is shared by the diag job, no engine is started after the batch engine reaches it
+        self.write_workers({"0": "GERunModelFail_Alarm", "1": "Hang", "2": "NotifyWaitExecuteFailed_Alarm"})
+        start_time = time.monotonic()
+        with mock.patch.object(kg_diag_job, "KG_DIAG_TIMEOUT", 1):
+            results, engine_num = self.diag("batch")
+        self.assertLess(time.monotonic() - start_time, 10)
+        self.assertEqual(1, engine_num)
+        self.assertEqual([False, False, False],
+                         [list(result_json.values())[0].get("analyze_success") for result_json, _ in results])
+
+    def test_engine_failed_kill_running(self):
+        self.write_workers({"0": "Hang", "1": "Failed"})
+        start_time = time.monotonic()
+        self.assertRaises(InfoNotFoundError, self.diag, "single")
+        self.assertLess(time.monotonic() - start_time, 30)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "worker-0", "ascend-kg-parser.tar.gz")))
+
+    def test_result_cache(self):
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        os.makedirs(cache_dir)
+        result_cache = KgResultCache(cache_dir, "engine-v1")
+        _, engine_num = self.diag("batch", result_cache)
+        self.assertEqual(1, engine_num)
+        results, engine_num = self.diag("failed", result_cache)
+        self.assertEqual(0, engine_num)
+        self.check_results(results)
+
+        self.write_workers({"0": "RuntimeTaskException_Alarm", "1": "GERunModelFail_Alarm", "2": "Other_Alarm"})
+        results, engine_num = self.diag("single", result_cache)
+        self.assertEqual(1, engine_num)
+        self.check_results(results)
+        _, engine_num = self.diag("batch", KgResultCache(cache_dir, "engine-v2"))
+        self.assertEqual(1, engine_num)
+
+    def test_result_cache_eviction(self):
+        cache_dir = os.path.join(self.temp_dir, "cache")
+        os.makedirs(cache_dir)
+        result_cache = KgResultCache(cache_dir, "engine-v1")
+        keys = [f"{index}" * 64 for index in range(4)]
+        for index, key in enumerate(keys[:3]):
+            result_cache.put(key, json.dumps({"analyze_success": True, "root_cause_en_US": key}))
+            os.utime(result_cache.get_cache_file(key), (index, index))
+        result_cache.put("f" * 64, json.dumps({"analyze_success": False}))
+        self.assertFalse(os.path.exists(result_cache.get_cache_file("f" * 64)))
+
+        result_cache.max_size = sum(os.path.getsize(result_cache.get_cache_file(key)) for key in keys[:3])
+        self.assertIsNotNone(result_cache.get(keys[0]))
+        result_cache.put(keys[3], json.dumps({"analyze_success": True, "root_cause_en_US": keys[3]}))
+        self.assertEqual([True, False, True, True],
+                         [os.path.exists(result_cache.get_cache_file(key)) for key in keys])
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
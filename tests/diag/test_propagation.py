@@ -0,0 +1,47 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import unittest
+
+from ascend_fd.pkg.rc_diag.err_checker import Rank
+from ascend_fd.pkg.rc_diag.propagation import analyze_propagation
+from ascend_fd.pkg.rc_parse.plog_record import PlogFacts
+
+
+def make_facts(first_err_time):
+    facts = PlogFacts()
+    facts.first_err_time = first_err_time
+    return facts
+
+
+class PropagationTestCase(unittest.TestCase):
+
+    def test_analyze_propagation(self):
+        plog_map = {
+            Rank("0", "0", "1.1.1.1", "0"): make_facts("2023-01-31-03:00:10.500000"),
+            Rank("0", "1", "1.1.1.1", "1"): make_facts("2023-01-31-03:00:10.000000"),
+            Rank("1", "2", "2.2.2.2", "0"): make_facts("2023-01-31-03:00:12.000000"),
+            Rank("1", "3", "2.2.2.2", "1"): make_facts("2023-01-31-03:00:12.100000"),
+            Rank("1", "4", "2.2.2.2", "2"): make_facts("2023-01-31-03:01:00.000000"),
+            Rank("1", "5", "2.2.2.2", "3"): make_facts(None),
+        }
+        result = analyze_propagation(plog_map)
+        self.assertEqual("2023-01-31-03:00:10.000000", result.get("first_error_time"))
+        self.assertEqual(5, result.get("error_rank_num"))
+        self.assertEqual(["Rank 1", "Rank 0", "Rank 2", "Rank 3", "Rank 4"], result.get("propagation_order"))
+        self.assertEqual(["Rank 1", "Rank 0"], result.get("early_error_ranks"))
+        self.assertEqual({"1.1.1.1": 0.0, "2.2.2.2": 2000.0}, result.get("server_first_error_delta_ms"))
+        self.assertEqual(5, sum(result.get("error_time_histogram").get("counts")))
+        self.assertEqual(["Rank 4"], result.get("outlier_ranks"))
+
+    def test_invalid_error_time(self):
+        plog_map = {
+            Rank("0", "0", "1.1.1.1", "0"): make_facts("garage"),
+            Rank("0", "1", "1.1.1.1", "1"): make_facts("2023-01-31-03:00:10.000000"),
+        }
+        result = analyze_propagation(plog_map)
+        self.assertEqual(1, result.get("error_rank_num"))
+        self.assertEqual(["Rank 1"], result.get("propagation_order"))
+        self.assertIsNone(analyze_propagation({Rank(): make_facts("garage")}))
+
+    def test_no_error_time(self):
+        self.assertIsNone(analyze_propagation({Rank(): make_facts(None)}))
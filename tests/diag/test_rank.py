@@ -0,0 +1,23 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import unittest
+
+from ascend_fd.pkg.rc_diag.err_checker import Rank
+from ascend_fd.pkg.rc_diag.rc_diag_job import RankTable
+
+
+class RankTestCase(unittest.TestCase):
+
+    def test_rank_eq(self):
+        self.assertNotEqual(Rank("1", "23", "0.0.0.0", "1"), Rank("12", "3", "0.0.0.0", "1"))
+        self.assertEqual(Rank("1", "2", "1.1.1.1", "3"), Rank("1", "2", "1.1.1.1", "3"))
+        self.assertEqual(2, len({Rank("1", "23"), Rank("12", "3")}))
+
+    def test_rank_table_lookup(self):
+        rank_table = RankTable()
+        for rank_id in range(16):
+            rank_table.add_rank(Rank("0", str(rank_id), "1.1.1.1", str(rank_id)))
+        self.assertEqual("Rank 5", repr(rank_table.rank_map.get(5)))
+        self.assertEqual(16, len(rank_table.rank_map))
+        self.assertEqual("Rank 7", repr(rank_table.get_rank_from_server_device_id("1.1.1.1", "7")))
+        self.assertEqual("Unknown Rank", repr(rank_table.get_rank_from_server_device_id("2.2.2.2", "7")))
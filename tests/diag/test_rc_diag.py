@@ -0,0 +1,79 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import json
+import shutil
+import unittest
+import multiprocessing
+from unittest import mock
+
+from ascend_fd.controller.controller import DiagCFG
+from ascend_fd.pkg.rc_diag.rc_diag_job import RCDiagWorker
+from ascend_fd.pkg.rc_parse.plog_record import PlogFacts, RC_SUMMARY_FILE
+from ascend_fd.status import InfoIncorrectError
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+TRACE_LINE = "[TRACE] HCCL({pid},python3):2023-01-31-02:48:31.328.022 [hcom.cc:196] hcom init by file succeess, " \
+             "rankNum[{rank_num}], rank[{rank}],server[{server}], device[{device}]\n"
+ERROR_LINE = "[ERROR] HCCL({pid},python3):2023-01-31-03:00:{err_time} [exchanger_network.cc:237] " \
+             "client : device[{device}] rank[{rank}] get socket timeout, total[4] remain[4]\n"
+# the first error time of each rank, the ranks 5 and 6 report the error at the same time
+ERR_TIMES = ["11.356.298", "05.901.087", "09.760.898", "11.454.732", "14.192.200", "09.957.706", "09.957.706",
+             "07.855.495"]
+
+
+class RCDiagLoadTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "rc_diag_dir")
+        self.write_workers()
+
+    def write_workers(self, rank_nums=None):
+        # worker-0 has ranks 0-3, worker-1 has ranks 4-7 and the per-worker summary
+        self.parse_data = dict()
+        for rank, err_time in enumerate(ERR_TIMES):
+            worker_id, pid = rank // 4, 11000 + rank
+            worker_dir = os.path.join(self.temp_dir, f"worker-{worker_id}")
+            os.makedirs(worker_dir, exist_ok=True)
+            plog_file = os.path.join(worker_dir, f"plog-parser-{pid}-1.log")
+            server = "1.1.1.1" if worker_id == 0 else "2.2.2.2"
+            fields = {"pid": pid, "rank": rank, "server": server, "device": rank % 4, "err_time": err_time,
+                      "rank_num": (rank_nums or {}).get(rank, 8)}
+            with open(plog_file, "w") as file_stream:
+                file_stream.write(TRACE_LINE.format(**fields) + ERROR_LINE.format(**fields))
+            worker_data = self.parse_data.setdefault(f"worker-{worker_id}", {"plog_parser_path": []})
+            worker_data["plog_parser_path"].append(plog_file)
+        summary_file = os.path.join(self.temp_dir, "worker-1", RC_SUMMARY_FILE)
+        with open(summary_file, "w") as file_stream:
+            json.dump({os.path.basename(plog_file): PlogFacts.from_text_file(plog_file).to_dict()
+                       for plog_file in self.parse_data["worker-1"]["plog_parser_path"]}, file_stream)
+        self.parse_data["worker-1"]["rc_summary_path"] = summary_file
+
+    def diag(self, cpu_count):
+        with mock.patch("os.cpu_count", return_value=cpu_count), \
+                mock.patch("multiprocessing.Pool", wraps=multiprocessing.Pool) as pool:
+            worker = RCDiagWorker(DiagCFG(0, self.parse_data))
+            result, worker_list = worker.start_job()
+        return result, worker_list, [repr(rank) for rank in worker.rank_table.err_rank], pool.call_count
+
+    def test_pool_equal_to_in_process(self):
+        result, worker_list, err_ranks, pool_num = self.diag(1)
+        self.assertEqual(0, pool_num)
+        # the ranks 5 and 6 have the same error time, they are in the order of worker id and file name
+        self.assertEqual(["Rank 1", "Rank 7", "Rank 2", "Rank 5", "Rank 6", "Rank 0", "Rank 3", "Rank 4"], err_ranks)
+
+        # the file order of the input does not change the result
+        for worker_data in self.parse_data.values():
+            worker_data["plog_parser_path"].reverse()
+        self.assertEqual((result, worker_list, err_ranks, 1), self.diag(4))
+
+    def test_consistency_check(self):
+        self.write_workers(rank_nums={6: 16})
+        for cpu_count in (1, 4):
+            with self.assertRaisesRegex(InfoIncorrectError, "rank_num"):
+                self.diag(cpu_count)
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
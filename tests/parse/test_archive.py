@@ -0,0 +1,86 @@
+# coding: UTF-8
+# Copyright (c) 2023. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import gzip
+import shutil
+import tarfile
+import zipfile
+import unittest
+from unittest import mock
+
+from ascend_fd import archive
+from ascend_fd.status import FileOpenError
+from ascend_fd.archive import walk_logs, open_log, log_stat, log_exists, close_archives, ARCHIVE_SEP
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+PLOG_MEMBERS = {
+    "process_log/debug/plog/plog-1_1.log": b"[ERROR] HCCL(1,python3):2023-01-31-03:00:11.356.298 first\n",
+    "process_log/debug/plog/plog-2_1.log": b"[TRACE] HCCL(2,python3):2023-01-31-03:00:11.356.298 second\n",
+}
+
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "archive_dir")
+        self.src_dir = os.path.join(self.temp_dir, "src")
+        for member_name, content in PLOG_MEMBERS.items():
+            member_path = os.path.join(self.src_dir, member_name)
+            os.makedirs(os.path.dirname(member_path), exist_ok=True)
+            with open(member_path, "wb") as file_stream:
+                file_stream.write(content)
+
+    def check_archive(self, archive_path):
+        file_paths = sorted(walk_logs(archive_path))
+        self.assertEqual([f"{archive_path}{ARCHIVE_SEP}{name}" for name in sorted(PLOG_MEMBERS)], file_paths)
+        # read the members in reverse order to check the shared archive stream can be repositioned
+        for file_path in reversed(file_paths):
+            content = PLOG_MEMBERS.get(file_path.split(ARCHIVE_SEP)[1])
+            self.assertTrue(log_exists(file_path))
+            self.assertEqual(len(content), log_stat(file_path).st_size)
+            with open_log(file_path) as file_stream:
+                self.assertEqual(content, file_stream.read())
+            with open_log(file_path) as file_stream:
+                file_stream.seek(8)
+                self.assertEqual(content[8:], file_stream.readline())
+        close_archives()
+
+    def test_tar_gz(self):
+        archive_path = os.path.join(self.temp_dir, "bundle.tar.gz")
+        with tarfile.open(archive_path, "w:gz") as tar_file:
+            tar_file.add(os.path.join(self.src_dir, "process_log"), arcname="process_log")
+        self.check_archive(archive_path)
+
+    def test_zip(self):
+        archive_path = os.path.join(self.temp_dir, "bundle.zip")
+        with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for member_name in PLOG_MEMBERS:
+                zip_file.write(os.path.join(self.src_dir, member_name), arcname=member_name)
+        self.check_archive(archive_path)
+
+    def test_gzip_plog(self):
+        member_name = "process_log/debug/plog/plog-1_1.log"
+        gzip_path = os.path.join(self.src_dir, f"{member_name}.gz")
+        with gzip.open(gzip_path, "wb") as file_stream:
+            file_stream.write(PLOG_MEMBERS.get(member_name))
+        self.assertIn(gzip_path, list(walk_logs(self.src_dir)))
+        self.assertEqual(len(PLOG_MEMBERS.get(member_name)), log_stat(gzip_path).st_size)
+        with open_log(gzip_path) as file_stream:
+            self.assertEqual(PLOG_MEMBERS.get(member_name), file_stream.read())
+
+    def test_gzip_plog_max_size(self):
+        # the decompressed size is counted while reading, the size in the gzip trailer is not trusted
+        gzip_path = os.path.join(self.temp_dir, "plog-1_1.log.gz")
+        with gzip.open(gzip_path, "wb") as file_stream:
+            file_stream.write(b"[INFO] line\n" * 10000)
+        with mock.patch.object(archive, "MAX_SIZE", 50000):
+            self.assertRaises(FileOpenError, log_stat, gzip_path)
+            with open_log(gzip_path) as file_stream:
+                self.assertEqual(b"[INFO] line\n", file_stream.readline())
+                self.assertRaises(FileOpenError, file_stream.read)
+            with open_log(gzip_path) as file_stream:
+                self.assertRaises(FileOpenError, file_stream.seek, 60000)
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
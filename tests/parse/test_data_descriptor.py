@@ -0,0 +1,43 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import unittest
+
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord
+from ascend_fd.pkg.kg_parse.log_parser.parser.bmc_log_data_descriptor import (BMCLogDataDescriptor, TIME_MAX_DIFF,
+                                                                               MAX_EVENT_COUNT)
+
+START_TIME = 1675134000
+
+
+def notify_wait_record(offset, params=()):
+    return EventRecord("NotifyWaitExecuteFailed", START_TIME + offset, f"key info {offset}", params)
+
+
+class DataDescriptorMergeTestCase(unittest.TestCase):
+    def test_merge_single(self):
+        events = list(BMCLogDataDescriptor.merge_same_entity([notify_wait_record(0)]))
+        self.assertEqual(1, events[0].get("times"))
+
+    def test_merge_window(self):
+        records = [notify_wait_record(offset) for offset in range(MAX_EVENT_COUNT + 5)]
+        records.append(notify_wait_record(MAX_EVENT_COUNT + TIME_MAX_DIFF + 1))
+        records.reverse()
+        events = list(BMCLogDataDescriptor.merge_same_entity(records))
+        self.assertEqual([str(MAX_EVENT_COUNT), "5", "1"], [event.get("times") for event in events])
+        self.assertEqual("key info 0", events[0].get("keyinfo"))
+
+    def test_merge_merged_records(self):
+        records = [notify_wait_record(offset) for offset in range(MAX_EVENT_COUNT + 5)]
+        merged = BMCLogDataDescriptor.merge_events(list(records))
+        self.assertEqual([MAX_EVENT_COUNT, 5], [record.count for record in merged])
+        self.assertEqual(START_TIME + MAX_EVENT_COUNT - 1, merged[0].last_timestamp)
+
+        new_records = [notify_wait_record(MAX_EVENT_COUNT + 5 + offset) for offset in range(10)]
+        self.assertEqual(list(BMCLogDataDescriptor.merge_same_entity(records + new_records)),
+                         list(BMCLogDataDescriptor.merge_same_entity(merged + new_records)))
+
+    def test_merge_signature(self):
+        records = [notify_wait_record(0), notify_wait_record(1, (("module", "HCCL"),)), notify_wait_record(2)]
+        events = list(BMCLogDataDescriptor.merge_same_entity(records))
+        self.assertEqual(["1", "1", "1"], [event.get("times") for event in events])
+        self.assertEqual("HCCL", events[1].get("module"))
@@ -0,0 +1,36 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import json
+import pickle
+import unittest
+
+from ascend_fd.pkg.kg_parse.utils.event_record import EventRecord, event_time_to_timestamp
+
+EVENT_DICT = {"key_info": "[ERROR] RUNTIME(1,python3):2023-02-08-14:03:57.123.456 Run model fail",
+              "time": "2023-02-08 14:03:57", "event_type": "GERunModelFail", "param0": {"module": "GE"}}
+
+
+class EventRecordTestCase(unittest.TestCase):
+    def test_naie_dict(self):
+        record = EventRecord.from_event_dict(EVENT_DICT)
+        self.assertEqual({
+            "keyinfo": EVENT_DICT.get("key_info"), "RaiseTime": "2023-02-08 14:03:57", "module": "GE",
+            "name": "GERunModelFail", "typeName": "GERunModelFail_Alarm", "alarmRaisedTime": "2023-02-08 14:03:57",
+            "alarmId": "GERunModelFail_Alarm", "alarmName": "GERunModelFail", "alarmLevel": "重要"
+        }, record.to_naie_dict())
+
+    def test_state_round_trip(self):
+        record = EventRecord.from_event_dict(EVENT_DICT)
+        self.assertEqual(record, EventRecord.from_state(json.loads(json.dumps(record.to_list()))))
+        self.assertEqual(record, EventRecord.from_state(EVENT_DICT))
+        self.assertEqual(record, pickle.loads(pickle.dumps(record)))
+
+        merged = EventRecord(record.event_type, record.timestamp, record.key_info, record.params, 3,
+                             record.timestamp + 10)
+        self.assertEqual(merged, EventRecord.from_state(json.loads(json.dumps(merged.to_list()))))
+        self.assertEqual(merged, pickle.loads(pickle.dumps(merged)))
+        self.assertEqual(record, EventRecord.from_state(record.to_list()[:4]))
+
+    def test_invalid_time(self):
+        self.assertIsNone(event_time_to_timestamp("2023-02-08-14"))
+        self.assertIsNone(EventRecord.from_event_dict(dict(EVENT_DICT, time="14:03:57")))
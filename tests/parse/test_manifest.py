@@ -0,0 +1,45 @@
+# coding: UTF-8
+# Copyright (c) 2023. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import shutil
+import unittest
+
+from ascend_fd.manifest import ParseManifest
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+
+class ParseManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "manifest_dir")
+        self.plog_file = os.path.join(self.temp_dir, "plog-12345_67890.log")
+        if not os.path.exists(self.temp_dir):
+            os.makedirs(self.temp_dir)
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.write("line one\n")
+
+    def test_resume_from_offset(self):
+        manifest = ParseManifest(self.temp_dir, "rc_parse")
+        self.assertEqual(0, manifest.get_offset(self.plog_file))
+        manifest.update(self.plog_file, 9, {"events": [1]})
+        manifest.save()
+        self.assertTrue(ParseManifest.exists(self.temp_dir))
+
+        manifest = ParseManifest(self.temp_dir, "rc_parse")
+        with open(self.plog_file, "a") as file_stream:
+            file_stream.write("line two\n")
+        self.assertEqual(9, manifest.get_offset(self.plog_file))
+        self.assertEqual({"events": [1]}, manifest.get_state(self.plog_file))
+
+    def test_truncated_file_parsed_again(self):
+        manifest = ParseManifest(self.temp_dir, "rc_parse")
+        manifest.update(self.plog_file, 9, {"events": [1]})
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.write("new\n")
+        self.assertEqual(0, manifest.get_offset(self.plog_file))
+        self.assertEqual({}, manifest.get_state(self.plog_file))
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
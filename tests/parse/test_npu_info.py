@@ -0,0 +1,57 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import shutil
+import unittest
+
+from ascend_fd.pkg.kg_parse.log_parser.format_support.npu_info_parser import NpuInfoParser, read_stat_blocks
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+
+def npu_info(counters):
+    blocks = [f"/usr/local/Ascend/driver/tools/hccn_tool -i {npu_id} -ip -g\nipaddr:10.10.0.1{npu_id}\n"
+              for npu_id in range(len(counters))]
+    blocks += [f"/usr/local/Ascend/driver/tools/hccn_tool -i {npu_id} -stat -g\npacket statistics:\n"
+               f"roce_rx_err_pkt_num:{rx_num}\nroce_tx_err_pkt_num:{tx_num}\nroce_unexpected_ack_num:{ack_num}\n"
+               for npu_id, (rx_num, tx_num, ack_num) in enumerate(counters)]
+    return "\n".join(blocks)
+
+
+class NpuInfoParserTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "npu_info_dir")
+        self.files = list()
+        worker_counters = {
+            "worker-0": ([(0, 0, 0), (1, 1, 1)], [(2, 0, 5), (1, 3, 1)]),
+            "worker-1": ([(0, 0, 0), (0, 0, 0)], [(0, 0, 0), (4, 4, 0)]),
+        }
+        for worker_dir, (before, after) in worker_counters.items():
+            os.makedirs(os.path.join(self.temp_dir, worker_dir), exist_ok=True)
+            for name, counters in (("npu_info_before.txt", before), ("npu_info_after.txt", after)):
+                file_path = os.path.join(self.temp_dir, worker_dir, name)
+                with open(file_path, "w") as file_stream:
+                    file_stream.write(npu_info(counters))
+                self.files.append(file_path)
+        # the worker without the after file is skipped
+        os.makedirs(os.path.join(self.temp_dir, "worker-2"), exist_ok=True)
+        self.files.append(os.path.join(self.temp_dir, "worker-2", "npu_info_before.txt"))
+
+    def test_read_stat_blocks(self):
+        blocks = list(read_stat_blocks(self.files[1]))
+        self.assertEqual([0, 1], [npu_id for npu_id, _, _ in blocks])
+        self.assertEqual({"roce_rx_err_pkt_num": 2, "roce_tx_err_pkt_num": 0, "roce_unexpected_ack_num": 5},
+                         blocks[0][2])
+
+    def test_parse_all_workers(self):
+        events = NpuInfoParser.parse(self.files).get("events")
+        self.assertEqual([("NpuRxErrIncreased", "/usr/local/Ascend/driver/tools/hccn_tool -i 0 -stat -g"),
+                          ("NpuTxErrIncreased", "/usr/local/Ascend/driver/tools/hccn_tool -i 1 -stat -g"),
+                          ("NpuRxErrIncreased", "/usr/local/Ascend/driver/tools/hccn_tool -i 1 -stat -g"),
+                          ("NpuTxErrIncreased", "/usr/local/Ascend/driver/tools/hccn_tool -i 1 -stat -g")],
+                         [(record.event_type, record.key_info) for record in events])
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
@@ -0,0 +1,106 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import gzip
+import shutil
+import unittest
+import multiprocessing
+from unittest import mock
+
+from ascend_fd.scheduler import TaskScheduler
+from ascend_fd.pkg.kg_parse.log_parser.format_support import plog_parser
+from ascend_fd.pkg.kg_parse.log_parser.format_support.plog_parser import PlogParser
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+PLOG_PATH = "/log/plog/plog-123_456.log"
+HEAD = "[ERROR] {}(1,python3):2023-02-08-14:03:57.123.456 [a.cc:1] "
+
+PLOG_LINES = [
+    HEAD.format("RUNTIME") + "ReportExceptProc:task exception\n",
+    HEAD.format("RUNTIME") + "device(3) aicore error, error code = 0x800000\n",
+    HEAD.format("RUNTIME") + "device aicore error without code\n",
+    HEAD.format("GE") + "Model stream sync failed, Stream Synchronize failed\n",
+    HEAD.format("HCCL") + "Notify wait execute failed, Task run failed, Notify Wait\n",
+    HEAD.format("HCCL") + "Task run failed, Notify Wait\x00\n",
+    HEAD.format("RUNTIME") + "failed halResourceIdAlloc\n",
+    HEAD.format("RUNTIME") + "halResourceIdAlloc failed\n",
+    HEAD.format("GE") + "ModelExecute: Execute model failed, Run model fail\n",
+    "no time line\n",
+]
+
+
+def reference_parse(lines, file_path):
+    # the parser-major loop, which the single pass must be equal to
+    parser_results = []
+    matched = [False for _ in range(len(lines))]
+    for line_parser in PlogParser.load_line_rules():
+        for index, line in enumerate(lines):
+            if matched[index]:
+                continue
+            record = line_parser.parse(line.strip().replace('\00', ''), file_path)
+            if record:
+                matched[index] = True
+                parser_results.append(record)
+    return parser_results
+
+
+class PlogParserTestCase(unittest.TestCase):
+    def test_single_pass_equal_to_parser_order(self):
+        results = PlogParser().handle_parse(PLOG_LINES, PLOG_PATH)
+        self.assertEqual(reference_parse(PLOG_LINES, PLOG_PATH), results)
+        self.assertEqual(["RuntimeTaskException", "RuntimeAicoreError", "RuntimeStreamSyncFailed",
+                          "GERunModelFail", "FailedToApplyForResources",
+                          "NotifyWaitExecuteFailed", "TaskRunFailed"],
+                         [record.event_type for record in results])
+        self.assertEqual("2023-02-08 14:03:57", results[0].raise_time)
+
+    def test_file_filter(self):
+        self.assertEqual([], PlogParser().handle_parse(PLOG_LINES, "/log/device/device-0.log"))
+
+
+class PlogParserChunkTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "plog_parser_dir")
+        if not os.path.exists(self.temp_dir):
+            os.makedirs(self.temp_dir)
+        self.plog_file = os.path.join(self.temp_dir, "plog-123_456.log")
+        self.lines = [f"[INFO] HCCL(1,python3):2023-02-08-14:03:57.123.456 [a.cc:1] info {index}\n"
+                      for index in range(200)] + PLOG_LINES * 20
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.writelines(self.lines)
+            file_stream.write(HEAD.format("RUNTIME") + "Program register failed")
+        with open(self.plog_file, "rb") as file_stream, gzip.open(self.plog_file + ".gz", "wb") as gzip_stream:
+            gzip_stream.write(file_stream.read())
+        self.chunk_size = plog_parser.CHUNK_SIZE
+        plog_parser.CHUNK_SIZE = 1000
+
+    def test_chunk_parse(self):
+        parser = PlogParser()
+        expected = PlogParser.handle_parse(self.lines, self.plog_file)
+        for file_path in (self.plog_file, self.plog_file + ".gz"):
+            with mock.patch("multiprocessing.Pool") as pool:
+                res = parser.parse(file_path, complete_lines=True)
+            # the standalone parse runs in the current process, no pool is started for one file
+            pool.assert_not_called()
+            self.assertEqual(expected, res.get("events"))
+            self.assertEqual(len("".join(self.lines)), res.get("end_offset"))
+            res = parser.parse(file_path, offset=res.get("end_offset"))
+            self.assertEqual(["RegisteredResourcesExceedsTheMaximum"],
+                             [record.event_type for record in res.get("events")])
+
+    def test_chunk_parse_in_pool(self):
+        scheduler = TaskScheduler(process_num=2)
+        tasks = [PlogParser().schedule_parse(scheduler, file_path, complete_lines=True)
+                 for file_path in (self.plog_file, self.plog_file + ".gz")]
+        with mock.patch("multiprocessing.Pool", wraps=multiprocessing.Pool) as pool:
+            scheduler.run()
+        pool.assert_called_once_with(2)
+        for task in tasks:
+            self.assertEqual(PlogParser.handle_parse(self.lines, self.plog_file), task.get().get("events"))
+
+    def tearDown(self) -> None:
+        plog_parser.CHUNK_SIZE = self.chunk_size
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
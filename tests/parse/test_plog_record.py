@@ -0,0 +1,106 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import json
+import shutil
+import unittest
+
+from ascend_fd.pkg.rc_parse.rc_parse_job import filter_plog_file, get_pid_summary
+from ascend_fd.tool import parse_timestamp
+from ascend_fd.pkg.rc_parse.plog_record import (PlogRecordWriter, PlogFacts, read_plog_records,
+                                                extract_record, FLAG_ERROR, FLAG_ERROR_HCCL)
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+PLOG_LINES = [
+    "[ERROR] HCCL(1,python3):2023-01-31-03:00:11.356.298 [a.cc:1] get socket timeout\n",
+    "[EVENT] HCCL(1,python3):2023-01-31-03:00:10.000.001 [b.cc:2] HCCL_CONNECT_TIMEOUT is set, timeOut[300]\n",
+    "[EVENT] HCCL(1,python3):2023-01-31-03:00:10.000.002 [b.cc:3] ExecTimeOut is set, timeOut[900]\n",
+    "[EVENT] HCCL(1,python3):2023-01-31-03:00:10.000.003 [c.cc:4] error status, rank [[1.1.1.1][0]] "
+    "lost rank [[2.2.2.2][1]] report rank [[1.1.1.1][0]]\n",
+    "[TRACE] HCCL(1,python3):2023-01-31-03:00:09.000.000 [d.cc:5] rankNum[8], rank[3],server[1.1.1.1], device[3]\n",
+    "[ERROR] RUNTIME(1,python3):2023-01-31-03:00:12.000.000 [e.cc:6] other error\n",
+]
+
+
+class PlogRecordTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "rc_record_dir")
+        self.plog_file = os.path.join(self.temp_dir, "plog-12345_67890.log")
+        self.out_file = os.path.join(self.temp_dir, "plog-parser-12345.log")
+        self.record_file = os.path.join(self.temp_dir, "plog-parser-12345.rec")
+        if not os.path.exists(self.temp_dir):
+            os.makedirs(self.temp_dir)
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.writelines(PLOG_LINES)
+        with open(self.out_file, "wb") as out_stream, PlogRecordWriter(self.record_file) as record_writer:
+            filter_plog_file(self.plog_file, out_stream, record_writer=record_writer)
+
+    def test_record_per_written_line(self):
+        records = list(read_plog_records(self.record_file))
+        with open(self.out_file, "r") as file_stream:
+            self.assertEqual(len(file_stream.readlines()), len(records))
+        self.assertEqual(parse_timestamp(PLOG_LINES[4]), records[0].timestamp)
+        self.assertEqual("HCCL", records[0].module)
+        self.assertTrue(records[-1].has_flag(FLAG_ERROR))
+        self.assertFalse(records[-1].has_flag(FLAG_ERROR_HCCL))
+
+    def test_plog_facts(self):
+        facts = PlogFacts.from_record_file(self.out_file, self.record_file)
+        self.assertEqual(8, facts.rank_num)
+        self.assertEqual(("3", "1.1.1.1", "3"), facts.rank_info)
+        self.assertEqual({"CONNECT_TIMEOUT": 300, "NOTIFY_TIMEOUT": 900}, facts.timeouts)
+        self.assertEqual([("1.1.1.1", "0", "2.2.2.2", "1")], facts.heartbeats)
+        self.assertEqual(2, facts.err_count)
+        self.assertEqual(1, facts.hccl_count)
+        self.assertEqual([0], facts.err_reasons)
+        self.assertEqual("2023-01-31-03:00:11.356298", facts.first_err_time)
+
+    def test_plog_facts_bounded_err_logs(self):
+        facts = PlogFacts()
+        for index in range(1000):
+            record = extract_record("error", f"[ERROR] HCCL(1,python3):2023-01-31-03:00:11.356.298 [a.cc:1] "
+                                             f"get socket timeout {index}\n")
+            self.assertNotIn("text", record.fields)
+            facts.add_record(record)
+        self.assertEqual(1000, facts.err_count)
+        self.assertEqual([0], facts.err_reasons)
+        self.assertEqual(["err_time", "reasons"], sorted(record.fields))
+        self.assertEqual(facts.to_dict(), PlogFacts.from_dict("", facts.to_dict()).to_dict())
+
+    def test_plog_facts_invalid_err_time(self):
+        lines = ["Traceback line [ERROR] something went wrong\n",
+                 "[ERROR] HCCL(1,python3):garbage here\n"]
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.writelines(lines)
+        facts = PlogFacts.from_text_file(self.plog_file)
+        self.assertEqual(2, facts.err_count)
+        self.assertIsNone(facts.first_err_time)
+
+        with open(self.plog_file, "a") as file_stream:
+            file_stream.write(PLOG_LINES[0])
+        facts = PlogFacts.from_text_file(self.plog_file)
+        self.assertEqual(3, facts.err_count)
+        self.assertEqual("2023-01-31-03:00:11.356298", facts.first_err_time)
+
+    def test_plog_facts_from_text(self):
+        facts = PlogFacts.from_record_file(self.out_file, self.record_file)
+        self.assertEqual(facts.to_dict(), PlogFacts.from_text_file(self.out_file).to_dict())
+
+    def test_plog_facts_dict(self):
+        facts = PlogFacts.from_record_file(self.out_file, self.record_file)
+        loaded_facts = PlogFacts.from_dict(self.out_file, json.loads(json.dumps(facts.to_dict())))
+        self.assertEqual(facts.to_dict(), loaded_facts.to_dict())
+        self.assertEqual(facts.rank_info, loaded_facts.rank_info)
+
+    def test_pid_summary(self):
+        facts_dict = PlogFacts.from_record_file(self.out_file, self.record_file).to_dict()
+        summary = {"plog-parser-12345-1.log": facts_dict, "plog-parser-123-0.log": facts_dict,
+                   "plog-parser-1234-1.log": facts_dict}
+        self.assertEqual({"plog-parser-12345-1.log": facts_dict}, get_pid_summary(summary, "12345"))
+        self.assertEqual({}, get_pid_summary(summary, "1"))
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
@@ -6,6 +6,7 @@ import unittest
 import pytest
 
 from ascend_fd.pkg.rc_parse import start_rc_parse_job
+from ascend_fd.pkg.rc_parse.rc_parse_job import filter_plog_file
 
 from ascend_fd.status import FileNotExistError
 
@@ -40,3 +41,40 @@ class RCParseTestCase(unittest.TestCase):
     def tearDown(self) -> None:
         if os.path.exists(self.temp_dir):
             shutil.rmtree(self.temp_dir)
+
+
+class PlogFilterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "rc_filter_dir")
+        self.plog_file = os.path.join(self.temp_dir, "plog-12345_67890.log")
+        self.out_file = os.path.join(self.temp_dir, "plog-parser-12345.log")
+        if not os.path.exists(self.temp_dir):
+            os.makedirs(self.temp_dir)
+
+    def test_filter_group_by_category(self):
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.write("[ERROR] HCCL(1,python3):2023-01-31-03:00:11.356.298 get socket timeout\n"
+                              "[INFO] GE(1,python3):2023-01-31-03:00:11.356.299 noise\n"
+                              "[EVENT] HCCL(1,python3):2023-01-31-03:00:11.356.300 event\n"
+                              "[TRACE] HCCL(1,python3):2023-01-31-03:00:11.356.301 trace [ERROR]")
+        with open(self.out_file, "wb") as out_stream:
+            is_write, is_error, _ = filter_plog_file(self.plog_file, out_stream)
+        self.assertTrue(is_write)
+        self.assertTrue(is_error)
+        with open(self.out_file, "r") as file_stream:
+            lines = file_stream.readlines()
+        self.assertEqual(4, len(lines))
+        self.assertTrue(lines[0].startswith("[TRACE]"))
+        self.assertTrue(lines[1].startswith("[EVENT]"))
+        self.assertTrue(lines[2].startswith("[ERROR]"))
+        self.assertEqual(lines[0], lines[3])
+
+    def test_filter_no_effective_line(self):
+        with open(self.plog_file, "w") as file_stream:
+            file_stream.write("[INFO] GE(1,python3):2023-01-31-03:00:11.356.299 noise\n")
+        with open(self.out_file, "wb") as out_stream:
+            self.assertEqual((False, False, 55), filter_plog_file(self.plog_file, out_stream))
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
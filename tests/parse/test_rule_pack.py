@@ -0,0 +1,92 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import json
+import shutil
+import unittest
+from unittest import mock
+
+from ascend_fd.tool import get_cache_dir, CACHE_DIR_ENV
+from ascend_fd.status import InfoIncorrectError, FileOpenError
+from ascend_fd.pkg.kg_parse.log_parser.format_support.rule_pack import compile_rule_pack, load_rule_pack
+from ascend_fd.pkg.kg_parse.log_parser.format_support.plog_parser import PlogParser
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+RULE_PACK = {
+    "version": "1.0",
+    "rules": [
+        {"name": "TaskRunFailed", "keywords": ["Task run failed", "Notify Wait"],
+         "regex": ".*?Task run failed.*?Notify Wait.*?", "file_filter": "plog"},
+        {"name": "NotifyWaitFailed", "keywords": ["Notify Wait"], "regex": "Notify Wait", "module": "HCCL"},
+    ]
+}
+
+
+class RulePackTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "rule_pack_dir")
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.rule_file = os.path.join(self.temp_dir, "rules.json")
+        with open(self.rule_file, "w") as file_stream:
+            json.dump(RULE_PACK, file_stream)
+
+    def test_compile(self):
+        compiled = compile_rule_pack(RULE_PACK)
+        self.assertEqual(["Task run failed", "Notify Wait"], compiled.get("keywords"))
+        self.assertEqual([[0, 1], [1]], [rule.get("keyword_ids") for rule in compiled.get("rules")])
+
+    def test_compile_incorrect_pack(self):
+        with self.assertRaises(InfoIncorrectError):
+            compile_rule_pack(dict(RULE_PACK, version="2.0"))
+        with self.assertRaises(InfoIncorrectError):
+            compile_rule_pack({"version": "1.0", "rules": [{"name": "Bad", "keywords": ["a"], "regex": "(a"}]})
+
+    def test_load_from_cache(self):
+        compiled = load_rule_pack(self.rule_file, self.cache_dir)
+        cache_files = os.listdir(self.cache_dir)
+        self.assertEqual(1, len(cache_files))
+        cache_file = os.path.join(self.cache_dir, cache_files[0])
+        self.assertIn(compiled.get("sha256"), cache_file)
+
+        # the cache is used instead of compiling again
+        with open(cache_file, "w") as file_stream:
+            json.dump(dict(compiled, keywords=["cached"]), file_stream)
+        self.assertEqual(["cached"], load_rule_pack(self.rule_file, self.cache_dir).get("keywords"))
+
+        # the broken cache is compiled again
+        with open(cache_file, "w") as file_stream:
+            file_stream.write("{")
+        self.assertEqual(compiled, load_rule_pack(self.rule_file, self.cache_dir))
+
+    def test_load_from_invalid_cache_file(self):
+        compiled = load_rule_pack(self.rule_file, self.cache_dir)
+        cache_file = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        # the cache file which cannot be opened safely, eg. a symbolic link, is compiled again
+        os.rename(cache_file, self.rule_file + ".cache")
+        os.symlink(self.rule_file + ".cache", cache_file)
+        self.assertEqual(compiled, load_rule_pack(self.rule_file, self.cache_dir))
+        self.assertFalse(os.path.islink(cache_file))
+
+        other_cache_dir = os.path.join(self.temp_dir, "other")
+        os.makedirs(other_cache_dir)
+        with mock.patch("ascend_fd.pkg.kg_parse.log_parser.format_support.rule_pack.safe_chmod",
+                        side_effect=FileOpenError("the size is too large.")) as chmod:
+            self.assertEqual(compiled, load_rule_pack(self.rule_file, other_cache_dir))
+        chmod.assert_called_once()
+
+    def test_plog_rules_cache_dir(self):
+        with mock.patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+            self.assertIsNone(get_cache_dir())
+        with mock.patch.dict(os.environ, {CACHE_DIR_ENV: self.cache_dir}), \
+                mock.patch.object(PlogParser, "LINE_PARSERS", None), \
+                mock.patch.object(PlogParser, "LINE_MATCHER", None):
+            line_parsers = PlogParser.load_line_rules()
+            self.assertIs(line_parsers, PlogParser.load_line_rules())
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
@@ -0,0 +1,42 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import operator
+import unittest
+
+from ascend_fd.scheduler import TaskScheduler, Task, run_tasks
+from ascend_fd.status import FileNotExistError
+
+
+def fail(description):
+    raise FileNotExistError(description)
+
+
+def add_tasks(scheduler):
+    chunk_tasks = [scheduler.add_task(f"chunk {index}", operator.mul, (index, index)) for index in range(6)]
+    return scheduler.add_task("merge", lambda: [task.get() for task in chunk_tasks], deps=chunk_tasks, local=True)
+
+
+class TaskSchedulerTestCase(unittest.TestCase):
+    def test_run_local(self):
+        self.assertEqual([0, 1, 4, 9, 16, 25], run_tasks(add_tasks))
+
+    def test_run_pool(self):
+        for process_num in (1, 2):
+            scheduler = TaskScheduler(process_num)
+            merge_task = add_tasks(scheduler)
+            scheduler.run()
+            self.assertEqual([0, 1, 4, 9, 16, 25], merge_task.get())
+
+    def test_failed_dependency(self):
+        for process_num in (1, 2):
+            scheduler = TaskScheduler(process_num)
+            failed_task = scheduler.add_task("failed", fail, ("no file",))
+            other_task = scheduler.add_task("other", operator.add, (1, 2))
+            dependent = scheduler.add_task("dependent", operator.add, (3, 4), deps=[failed_task, other_task])
+            last_task = scheduler.add_task("last", operator.neg, (1,), deps=[dependent], local=True)
+            scheduler.run()
+            self.assertEqual(3, other_task.get())
+            self.assertRaisesRegex(FileNotExistError, "no file", last_task.get)
+
+    def test_failed_task(self):
+        self.assertRaises(FileNotExistError, Task.failed("job", FileNotExistError()).get)
@@ -0,0 +1,70 @@
+# coding: UTF-8
+# Copyright (c) 2022. Huawei Technologies Co., Ltd. ALL rights reserved.
+import os
+import gzip
+import shutil
+import unittest
+from unittest import mock
+
+from ascend_fd import selector
+from ascend_fd.selector import get_plog_time_range, select_plog_files
+
+TEST_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+DT_DIR = os.path.join(TEST_DIR, "dt_dir")
+
+
+def plog_line(log_time):
+    return f"[INFO] HCCL(1,python3):2023-01-31-{log_time}.000.000 [a.cc:1] info\n"
+
+
+class PlogSelectorTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = os.path.join(DT_DIR, "selector_dir")
+        if not os.path.exists(self.temp_dir):
+            os.makedirs(self.temp_dir)
+        # plog files of one PID: 01:00-01:10, 02:00-02:10, 02:10-02:50, 02:50-03:00
+        self.plog_files = list()
+        for index, (start, end) in enumerate([("01:00:00", "01:10:00"), ("02:00:00", "02:10:00"),
+                                              ("02:10:00", "02:50:00"), ("02:50:00", "03:00:00")]):
+            plog_file = os.path.join(self.temp_dir, f"plog-1_2023013101000{index}.log")
+            with open(plog_file, "w") as file_stream:
+                file_stream.write(plog_line(start) + "no time line\n" * 100 + plog_line(end) + "no time tail")
+            self.plog_files.append(plog_file)
+
+    def test_time_range(self):
+        first_time, last_time = get_plog_time_range(self.plog_files[0])
+        self.assertEqual(10 * 60 * 1000000, last_time - first_time)
+
+    def test_time_range_of_grown_file(self):
+        first_time, last_time = get_plog_time_range(self.plog_files[0])
+        with open(self.plog_files[0], "a") as file_stream:
+            file_stream.write("\n" + plog_line("01:20:00"))
+        self.assertEqual((first_time, last_time + 10 * 60 * 1000000), get_plog_time_range(self.plog_files[0]))
+
+    def test_select_window(self):
+        debug_files, run_files = select_plog_files([self.plog_files, []])
+        self.assertEqual([self.plog_files[0], self.plog_files[2], self.plog_files[3]], debug_files)
+        self.assertEqual([], run_files)
+
+    def test_select_window_without_first_debug(self):
+        debug_files, _ = select_plog_files([self.plog_files, []], keep_first_debug=False)
+        self.assertEqual(self.plog_files[2:], debug_files)
+
+    def test_select_max_files(self):
+        with mock.patch.object(selector, "PID_MAX_DEBUG_PLOG_NUM", 1), \
+                mock.patch.object(selector, "PID_MAX_RUN_PLOG_NUM", 1):
+            debug_files, run_files = select_plog_files([self.plog_files, self.plog_files[1:]])
+        self.assertEqual([self.plog_files[0], self.plog_files[3]], debug_files)
+        self.assertEqual([self.plog_files[3]], run_files)
+
+    def test_gzip_time_range_from_head(self):
+        gzip_file = os.path.join(self.temp_dir, "plog-1_20230131010009.log.gz")
+        with open(self.plog_files[0], "rb") as file_stream, gzip.open(gzip_file, "wb") as gzip_stream:
+            gzip_stream.write(file_stream.read())
+        first_time, last_time = get_plog_time_range(gzip_file)
+        self.assertEqual(get_plog_time_range(self.plog_files[0])[0], first_time)
+        self.assertEqual(0, last_time)
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)